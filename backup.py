@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+NanoStore Bot - Online Backup
+Run this file to snapshot the database into data/backups (safe while the bot runs)
+"""
+
+import sys
+import os
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from database.backup import main
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,28 @@
 """Configuration module."""
 from .config import (
-    BOT_TOKEN, ADMIN_ID, LOG_CHANNEL_ID, PROOFS_CHANNEL_ID, DB_PATH,
-    LOG_TO_CHANNEL, LOG_LEVEL, LOG_CHANNEL_LEVEL, FULL_VERBOSE_TO_CHANNEL
+    BOT_TOKEN, ADMIN_ID, LOG_CHANNEL_ID, PROOFS_CHANNEL_ID, DB_PATH, DB_READ_POOL_SIZE,
+    DB_BACKEND, DATABASE_URL, DB_PG_POOL_SIZE,
+    SETTINGS_CACHE_TTL, CATALOG_CACHE_TTL, SCREEN_CACHE_SIZE, WRITE_BATCH_WINDOW_MS, WRITE_BATCH_MAX,
+    DB_PROFILE, DB_SLOW_QUERY_MS,
+    ARCHIVE_DB_PATH, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_INTERVAL_HOURS,
+    BACKUP_DIR, BACKUP_KEEP, BACKUP_INTERVAL_HOURS,
+    BROADCAST_CONCURRENCY,
+    RATE_LIMIT_GLOBAL, RATE_LIMIT_CHAT, RATE_LIMIT_GROUP, FORCE_JOIN_CACHE_TTL,
+    MAINTENANCE_HOUR, MAINTENANCE_VACUUM_PAGES,
+    LOG_TO_CHANNEL, LOG_LEVEL, LOG_CHANNEL_LEVEL, FULL_VERBOSE_TO_CHANNEL,
+    LOG_CHANNEL_QUEUE_SIZE, LOG_CHANNEL_DROP_POLICY,
 )
 
 __all__ = [
-    'BOT_TOKEN', 'ADMIN_ID', 'LOG_CHANNEL_ID', 'PROOFS_CHANNEL_ID', 'DB_PATH',
-    'LOG_TO_CHANNEL', 'LOG_LEVEL', 'LOG_CHANNEL_LEVEL', 'FULL_VERBOSE_TO_CHANNEL'
+    'BOT_TOKEN', 'ADMIN_ID', 'LOG_CHANNEL_ID', 'PROOFS_CHANNEL_ID', 'DB_PATH', 'DB_READ_POOL_SIZE',
+    'DB_BACKEND', 'DATABASE_URL', 'DB_PG_POOL_SIZE',
+    'SETTINGS_CACHE_TTL', 'CATALOG_CACHE_TTL', 'SCREEN_CACHE_SIZE', 'WRITE_BATCH_WINDOW_MS', 'WRITE_BATCH_MAX',
+    'DB_PROFILE', 'DB_SLOW_QUERY_MS',
+    'ARCHIVE_DB_PATH', 'ARCHIVE_AFTER_DAYS', 'ARCHIVE_BATCH_SIZE', 'ARCHIVE_INTERVAL_HOURS',
+    'BACKUP_DIR', 'BACKUP_KEEP', 'BACKUP_INTERVAL_HOURS',
+    'BROADCAST_CONCURRENCY',
+    'RATE_LIMIT_GLOBAL', 'RATE_LIMIT_CHAT', 'RATE_LIMIT_GROUP', 'FORCE_JOIN_CACHE_TTL',
+    'MAINTENANCE_HOUR', 'MAINTENANCE_VACUUM_PAGES',
+    'LOG_TO_CHANNEL', 'LOG_LEVEL', 'LOG_CHANNEL_LEVEL', 'FULL_VERBOSE_TO_CHANNEL',
+    'LOG_CHANNEL_QUEUE_SIZE', 'LOG_CHANNEL_DROP_POLICY',
 ]
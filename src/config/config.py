@@ -38,9 +38,160 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
 LOG_CHANNEL_LEVEL = os.getenv("LOG_CHANNEL_LEVEL", "INFO").upper()
 FULL_VERBOSE_TO_CHANNEL = os.getenv("FULL_VERBOSE_TO_CHANNEL", "false").lower() == "true"
 
+# Log-channel streaming: records held while waiting to be sent, and which to
+# discard when that fills up ("oldest" or "newest")
+try:
+    LOG_CHANNEL_QUEUE_SIZE = max(1, int(os.getenv("LOG_CHANNEL_QUEUE_SIZE", "1000")))
+except ValueError:
+    logger.error(f"Invalid LOG_CHANNEL_QUEUE_SIZE: {os.getenv('LOG_CHANNEL_QUEUE_SIZE')}")
+    LOG_CHANNEL_QUEUE_SIZE = 1000
+LOG_CHANNEL_DROP_POLICY = os.getenv("LOG_CHANNEL_DROP_POLICY", "oldest").lower()
+if LOG_CHANNEL_DROP_POLICY not in ("oldest", "newest"):
+    logger.error(f"Invalid LOG_CHANNEL_DROP_POLICY: {LOG_CHANNEL_DROP_POLICY}")
+    LOG_CHANNEL_DROP_POLICY = "oldest"
+
 # Database Configuration
 DB_PATH = str(root_dir / "data" / "nanostore.db")
 
+# Storage backend: "sqlite" (default, DB_PATH) or "postgres" (DATABASE_URL, needs asyncpg)
+DB_BACKEND = os.getenv("DB_BACKEND", "sqlite").lower()
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+
+# Max pooled Postgres connections (readers + writer + transactions)
+try:
+    DB_PG_POOL_SIZE = max(2, int(os.getenv("DB_PG_POOL_SIZE", "10")))
+except ValueError:
+    logger.error(f"Invalid DB_PG_POOL_SIZE: {os.getenv('DB_PG_POOL_SIZE')}")
+    DB_PG_POOL_SIZE = 10
+
+# Cold storage for old action_logs / points_history rows
+ARCHIVE_DB_PATH = str(root_dir / "data" / "nanostore_archive.db")
+
+# Compressed online snapshots (see backup.py / the backup job)
+BACKUP_DIR = str(root_dir / "data" / "backups")
+
+# Read-only connections kept open for SELECT queries (0 = share the writer)
+try:
+    DB_READ_POOL_SIZE = max(0, int(os.getenv("DB_READ_POOL_SIZE", "4")))
+except ValueError:
+    logger.error(f"Invalid DB_READ_POOL_SIZE: {os.getenv('DB_READ_POOL_SIZE')}")
+    DB_READ_POOL_SIZE = 4
+
+# Seconds between checks for settings changed by another process (0 = never)
+try:
+    SETTINGS_CACHE_TTL = max(0.0, float(os.getenv("SETTINGS_CACHE_TTL", "30")))
+except ValueError:
+    logger.error(f"Invalid SETTINGS_CACHE_TTL: {os.getenv('SETTINGS_CACHE_TTL')}")
+    SETTINGS_CACHE_TTL = 30.0
+
+# Seconds between checks for catalog / force-join channel changes made by
+# another worker (0 = never)
+try:
+    CATALOG_CACHE_TTL = max(0.0, float(os.getenv("CATALOG_CACHE_TTL", "5")))
+except ValueError:
+    logger.error(f"Invalid CATALOG_CACHE_TTL: {os.getenv('CATALOG_CACHE_TTL')}")
+    CATALOG_CACHE_TTL = 5.0
+
+# Rendered catalog screens kept in memory (0 = render every time)
+try:
+    SCREEN_CACHE_SIZE = max(0, int(os.getenv("SCREEN_CACHE_SIZE", "512")))
+except ValueError:
+    logger.error(f"Invalid SCREEN_CACHE_SIZE: {os.getenv('SCREEN_CACHE_SIZE')}")
+    SCREEN_CACHE_SIZE = 512
+
+# Group commit for small writes: flush after this many ms or statements
+# (WRITE_BATCH_MAX = 0 commits every write on its own)
+try:
+    WRITE_BATCH_WINDOW_MS = max(0.0, float(os.getenv("WRITE_BATCH_WINDOW_MS", "5")))
+except ValueError:
+    logger.error(f"Invalid WRITE_BATCH_WINDOW_MS: {os.getenv('WRITE_BATCH_WINDOW_MS')}")
+    WRITE_BATCH_WINDOW_MS = 5.0
+
+try:
+    WRITE_BATCH_MAX = max(0, int(os.getenv("WRITE_BATCH_MAX", "100")))
+except ValueError:
+    logger.error(f"Invalid WRITE_BATCH_MAX: {os.getenv('WRITE_BATCH_MAX')}")
+    WRITE_BATCH_MAX = 100
+
+# Query timing: per-function percentiles and a slow-query log (off by default)
+DB_PROFILE = os.getenv("DB_PROFILE", "false").lower() == "true"
+try:
+    DB_SLOW_QUERY_MS = max(0.0, float(os.getenv("DB_SLOW_QUERY_MS", "100")))
+except ValueError:
+    logger.error(f"Invalid DB_SLOW_QUERY_MS: {os.getenv('DB_SLOW_QUERY_MS')}")
+    DB_SLOW_QUERY_MS = 100.0
+
+# Archive job: rows older than ARCHIVE_AFTER_DAYS move to ARCHIVE_DB_PATH in
+# chunks of ARCHIVE_BATCH_SIZE, once every ARCHIVE_INTERVAL_HOURS (0 = off)
+try:
+    ARCHIVE_AFTER_DAYS = max(1, int(os.getenv("ARCHIVE_AFTER_DAYS", "90")))
+except ValueError:
+    logger.error(f"Invalid ARCHIVE_AFTER_DAYS: {os.getenv('ARCHIVE_AFTER_DAYS')}")
+    ARCHIVE_AFTER_DAYS = 90
+
+try:
+    ARCHIVE_BATCH_SIZE = max(1, int(os.getenv("ARCHIVE_BATCH_SIZE", "500")))
+except ValueError:
+    logger.error(f"Invalid ARCHIVE_BATCH_SIZE: {os.getenv('ARCHIVE_BATCH_SIZE')}")
+    ARCHIVE_BATCH_SIZE = 500
+
+try:
+    ARCHIVE_INTERVAL_HOURS = max(0.0, float(os.getenv("ARCHIVE_INTERVAL_HOURS", "24")))
+except ValueError:
+    logger.error(f"Invalid ARCHIVE_INTERVAL_HOURS: {os.getenv('ARCHIVE_INTERVAL_HOURS')}")
+    ARCHIVE_INTERVAL_HOURS = 24.0
+
+# Backup job: keep the newest BACKUP_KEEP snapshots, one every BACKUP_INTERVAL_HOURS (0 = off)
+try:
+    BACKUP_KEEP = max(1, int(os.getenv("BACKUP_KEEP", "7")))
+except ValueError:
+    logger.error(f"Invalid BACKUP_KEEP: {os.getenv('BACKUP_KEEP')}")
+    BACKUP_KEEP = 7
+
+try:
+    BACKUP_INTERVAL_HOURS = max(0.0, float(os.getenv("BACKUP_INTERVAL_HOURS", "24")))
+except ValueError:
+    logger.error(f"Invalid BACKUP_INTERVAL_HOURS: {os.getenv('BACKUP_INTERVAL_HOURS')}")
+    BACKUP_INTERVAL_HOURS = 24.0
+
+# Broadcasts: parallel sends in flight (pacing is up to the outbound rate limiter)
+try:
+    BROADCAST_CONCURRENCY = max(1, int(os.getenv("BROADCAST_CONCURRENCY", "8")))
+except ValueError:
+    logger.error(f"Invalid BROADCAST_CONCURRENCY: {os.getenv('BROADCAST_CONCURRENCY')}")
+    BROADCAST_CONCURRENCY = 8
+
+# Outbound Telegram limits (all bot requests): messages/second overall and
+# per private chat, messages/minute per group or channel
+try:
+    RATE_LIMIT_GLOBAL = max(1.0, float(os.getenv("RATE_LIMIT_GLOBAL", "30")))
+    RATE_LIMIT_CHAT = max(0.1, float(os.getenv("RATE_LIMIT_CHAT", "1")))
+    RATE_LIMIT_GROUP = max(1.0, float(os.getenv("RATE_LIMIT_GROUP", "20")))
+except ValueError:
+    logger.error("Invalid RATE_LIMIT_GLOBAL / RATE_LIMIT_CHAT / RATE_LIMIT_GROUP")
+    RATE_LIMIT_GLOBAL, RATE_LIMIT_CHAT, RATE_LIMIT_GROUP = 30.0, 1.0, 20.0
+
+# Seconds a force-join membership result is trusted before asking Telegram again
+try:
+    FORCE_JOIN_CACHE_TTL = max(0, int(os.getenv("FORCE_JOIN_CACHE_TTL", "300")))
+except ValueError:
+    logger.error(f"Invalid FORCE_JOIN_CACHE_TTL: {os.getenv('FORCE_JOIN_CACHE_TTL')}")
+    FORCE_JOIN_CACHE_TTL = 300
+
+# Maintenance job (checkpoint, ANALYZE, incremental vacuum): daily at this
+# UTC hour (-1 = off); MAINTENANCE_VACUUM_PAGES caps pages freed per run (0 = all)
+try:
+    MAINTENANCE_HOUR = min(23, max(-1, int(os.getenv("MAINTENANCE_HOUR", "4"))))
+except ValueError:
+    logger.error(f"Invalid MAINTENANCE_HOUR: {os.getenv('MAINTENANCE_HOUR')}")
+    MAINTENANCE_HOUR = 4
+
+try:
+    MAINTENANCE_VACUUM_PAGES = max(0, int(os.getenv("MAINTENANCE_VACUUM_PAGES", "0")))
+except ValueError:
+    logger.error(f"Invalid MAINTENANCE_VACUUM_PAGES: {os.getenv('MAINTENANCE_VACUUM_PAGES')}")
+    MAINTENANCE_VACUUM_PAGES = 0
+
 # Validate required settings
 if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN not set in .env file")
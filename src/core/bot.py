@@ -10,6 +10,7 @@ from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
+    ChatMemberHandler,
     MessageHandler,
     filters,
     ContextTypes,
@@ -17,7 +18,9 @@ from telegram.ext import (
 
 from config import (
     BOT_TOKEN, ADMIN_ID, LOG_CHANNEL_ID,
-    LOG_TO_CHANNEL, LOG_LEVEL, LOG_CHANNEL_LEVEL, FULL_VERBOSE_TO_CHANNEL
+    LOG_TO_CHANNEL, LOG_LEVEL, LOG_CHANNEL_LEVEL, FULL_VERBOSE_TO_CHANNEL,
+    RATE_LIMIT_GLOBAL, RATE_LIMIT_CHAT, RATE_LIMIT_GROUP,
+    LOG_CHANNEL_QUEUE_SIZE, LOG_CHANNEL_DROP_POLICY,
 )
 from utils.telegram_logger import setup_telegram_logging
 from utils.activity_logger import (
@@ -25,9 +28,12 @@ from utils.activity_logger import (
     log_error_context, log_handler_execution
 )
 from utils.channel_logger import ChannelActivityLogger, set_channel_logger
-from middleware import enforce_membership
+from utils.rate_limiter import OutboundRateLimiter, Priority
+from middleware import enforce_membership, chat_member_handler
 from middleware.maintenance import check_maintenance
-from database import init_db
+from database import init_db, close_db
+from core.jobs import schedule_jobs
+from core.broadcast import resume_broadcasts, shutdown_broadcasts
 from handlers.start import (
     start_handler,
     main_menu_handler,
@@ -112,6 +118,9 @@ from handlers.admin import (
     admin_handler,
     back_admin_handler,
     admin_dashboard_handler,
+    admin_rebuild_stats_handler,
+    admin_dbstats_handler,
+    admin_sendstats_handler,
     admin_cats_handler,
     admin_cat_add_handler,
     admin_cat_detail_handler,
@@ -170,6 +179,7 @@ from handlers.admin import (
     admin_bulk_stock_handler,
     admin_broadcast_handler,
     admin_broadcast_confirm_handler,
+    admin_broadcast_stop_handler,
     admin_text_router,
     admin_photo_router,
 )
@@ -196,11 +206,13 @@ async def post_init(application: Application) -> None:
     from utils import send_restart_notification
     
     await init_db()
+    schedule_jobs(application)
+    await resume_broadcasts(application)
     
     # Start Telegram log handler if enabled
     telegram_handler = application.bot_data.get('telegram_log_handler')
     if telegram_handler:
-        telegram_handler.start()
+        telegram_handler.start(application.bot)
         log_activity("SYSTEM", "Telegram log channel streaming started")
     
     # Initialize Channel Activity Logger
@@ -211,6 +223,7 @@ async def post_init(application: Application) -> None:
     )
     set_channel_logger(channel_logger)
     application.bot_data['channel_logger'] = channel_logger
+    channel_logger.start()
     
     # Send bot startup notification to channel
     await channel_logger.log_bot_startup()
@@ -269,6 +282,28 @@ async def post_init(application: Application) -> None:
     )
 
 
+async def post_stop(application: Application) -> None:
+    """
+    Stop broadcasts and flush queued channel log events and log records
+    while the bot can still send.
+    """
+    # Before Application.shutdown() closes the bot's client: recipients not
+    # reached yet must stay pending, not be saved as failed sends
+    await shutdown_broadcasts()
+    channel_logger = application.bot_data.get('channel_logger')
+    if channel_logger:
+        await channel_logger.stop()
+    telegram_handler = application.bot_data.get('telegram_log_handler')
+    if telegram_handler:
+        await telegram_handler.flush_and_stop()
+
+
+async def post_shutdown(application: Application) -> None:
+    """Close database connections after the application stops."""
+    await close_db()
+    logger.info("Database connections closed")
+
+
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Global error handler — log and notify admin."""
     logger.error("Exception while handling an update:", exc_info=context.error)
@@ -322,6 +357,7 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
                 chat_id=LOG_CHANNEL_ID,
                 text=error_text,
                 parse_mode="HTML",
+                rate_limit_args=Priority.LOG,
             )
         except Exception as e:
             logger.error("Failed to send error to log channel: %s", e)
@@ -534,6 +570,10 @@ def register_handlers(app: Application) -> None:
     async def global_middleware(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Check maintenance mode and membership before processing."""
         try:
+            # Channel membership changes aren't user actions
+            if update.chat_member or update.my_chat_member:
+                return
+
             # Skip middleware for /start command (let it handle membership internally)
             if update.message and update.message.text and update.message.text.startswith('/start'):
                 return
@@ -549,6 +589,7 @@ def register_handlers(app: Application) -> None:
         except Exception as e:
             logger.warning(f"Global middleware error: {e}")
     
+    app.add_handler(ChatMemberHandler(chat_member_handler, ChatMemberHandler.CHAT_MEMBER), group=-4)
     app.add_handler(TypeHandler(Update, session_timeout_middleware), group=-3)
     app.add_handler(TypeHandler(Update, global_middleware), group=-2)
     app.add_handler(TypeHandler(Update, logging_middleware), group=-1)
@@ -556,6 +597,9 @@ def register_handlers(app: Application) -> None:
     # ======== COMMANDS ========
     app.add_handler(CommandHandler("start", start_handler))
     app.add_handler(CommandHandler("test_channel", test_channel_handler))
+    app.add_handler(CommandHandler("rebuild_stats", admin_rebuild_stats_handler))
+    app.add_handler(CommandHandler("dbstats", admin_dbstats_handler))
+    app.add_handler(CommandHandler("sendstats", admin_sendstats_handler))
 
     # ======== CALLBACK QUERIES ========
 
@@ -567,7 +611,7 @@ def register_handlers(app: Application) -> None:
 
     # ---- Catalog ----
     app.add_handler(CallbackQueryHandler(shop_handler, pattern=r"^shop$"))
-    app.add_handler(CallbackQueryHandler(stock_overview_handler, pattern=r"^stock_overview$"))
+    app.add_handler(CallbackQueryHandler(stock_overview_handler, pattern=r"^stock_overview(:\d+)?$"))
     app.add_handler(CallbackQueryHandler(category_page_handler, pattern=r"^cat:\d+:p:\d+$"))
     app.add_handler(CallbackQueryHandler(category_handler, pattern=r"^cat:\d+$"))
     app.add_handler(CallbackQueryHandler(product_faq_handler, pattern=r"^prod_faq:\d+$"))
@@ -606,7 +650,7 @@ def register_handlers(app: Application) -> None:
     app.add_handler(CallbackQueryHandler(pay_method_handler, pattern=r"^pay_method:\d+:\d+$"))
     app.add_handler(CallbackQueryHandler(pay_handler, pattern=r"^pay:\d+$"))
     app.add_handler(CallbackQueryHandler(my_orders_handler, pattern=r"^my_orders$"))
-    app.add_handler(CallbackQueryHandler(orders_page_handler, pattern=r"^orders_p:\d+$"))
+    app.add_handler(CallbackQueryHandler(orders_page_handler, pattern=r"^orders_p:\S+$"))
     app.add_handler(CallbackQueryHandler(order_detail_handler, pattern=r"^order:\d+$"))
 
     # ---- Support / Tickets (User) ----
@@ -622,7 +666,7 @@ def register_handlers(app: Application) -> None:
     app.add_handler(CallbackQueryHandler(wallet_amt_preset_handler, pattern=r"^wallet_amt:\d+"))
     app.add_handler(CallbackQueryHandler(wallet_amt_custom_handler, pattern=r"^wallet_amt_custom$"))
     app.add_handler(CallbackQueryHandler(wallet_pay_method_handler, pattern=r"^wallet_pay:\d+$"))
-    app.add_handler(CallbackQueryHandler(wallet_history_handler, pattern=r"^wallet_history$"))
+    app.add_handler(CallbackQueryHandler(wallet_history_handler, pattern=r"^wallet_history(:\S+)?$"))
 
     # ---- Admin Panel ----
     app.add_handler(CallbackQueryHandler(admin_handler, pattern=r"^admin$"))
@@ -648,16 +692,16 @@ def register_handlers(app: Application) -> None:
     app.add_handler(CallbackQueryHandler(admin_prod_media_add_handler, pattern=r"^adm_prod_media_add:\d+:\w+$"))
     app.add_handler(CallbackQueryHandler(admin_prod_media_add_handler, pattern=r"^adm_prod_media_add:\d+$"))
     app.add_handler(CallbackQueryHandler(admin_prod_media_del_handler, pattern=r"^adm_prod_media_del:\d+:\d+$"))
-    app.add_handler(CallbackQueryHandler(admin_prods_handler, pattern=r"^adm_prods:\d+$"))
+    app.add_handler(CallbackQueryHandler(admin_prods_handler, pattern=r"^adm_prods:\d+(:[np]\d+)?$"))
     app.add_handler(CallbackQueryHandler(admin_prod_detail_handler, pattern=r"^adm_prod:\d+$"))
 
     # ---- Admin: Orders ----
-    app.add_handler(CallbackQueryHandler(admin_orders_handler, pattern=r"^adm_orders$"))
+    app.add_handler(CallbackQueryHandler(admin_orders_handler, pattern=r"^adm_orders(:\S+)?$"))
     app.add_handler(CallbackQueryHandler(admin_order_status_handler, pattern=r"^adm_ord_st:\d+:\w+$"))
     app.add_handler(CallbackQueryHandler(admin_order_detail_handler, pattern=r"^adm_ord:\d+$"))
 
     # ---- Admin: Users ----
-    app.add_handler(CallbackQueryHandler(admin_users_handler, pattern=r"^adm_users$"))
+    app.add_handler(CallbackQueryHandler(admin_users_handler, pattern=r"^adm_users(:\S+)?$"))
     app.add_handler(CallbackQueryHandler(admin_ban_handler, pattern=r"^adm_ban:\d+$"))
     app.add_handler(CallbackQueryHandler(admin_unban_handler, pattern=r"^adm_unban:\d+$"))
     app.add_handler(CallbackQueryHandler(admin_user_detail_handler, pattern=r"^adm_user:\d+$"))
@@ -711,10 +755,11 @@ def register_handlers(app: Application) -> None:
     # ---- Admin: Broadcast ----
     app.add_handler(CallbackQueryHandler(admin_broadcast_handler, pattern=r"^adm_broadcast$"))
     app.add_handler(CallbackQueryHandler(admin_broadcast_confirm_handler, pattern=r"^adm_broadcast_go"))
+    app.add_handler(CallbackQueryHandler(admin_broadcast_stop_handler, pattern=r"^adm_broadcast_stop:\d+$"))
 
     # ---- Admin: Tickets ----
     app.add_handler(CallbackQueryHandler(admin_tickets_handler, pattern=r"^adm_tickets$"))
-    app.add_handler(CallbackQueryHandler(admin_tickets_all_handler, pattern=r"^adm_tickets_all$"))
+    app.add_handler(CallbackQueryHandler(admin_tickets_all_handler, pattern=r"^adm_tickets_all(:\S+)?$"))
     app.add_handler(CallbackQueryHandler(admin_ticket_close_handler, pattern=r"^adm_ticket_close:\d+$"))
     app.add_handler(CallbackQueryHandler(admin_ticket_reopen_handler, pattern=r"^adm_ticket_reopen:\d+$"))
     app.add_handler(CallbackQueryHandler(admin_ticket_detail_handler, pattern=r"^adm_ticket:\d+$"))
@@ -745,12 +790,13 @@ def main() -> None:
     
     # Setup logging FIRST (before any other imports that use logging)
     telegram_handler = setup_telegram_logging(
-        bot_token=BOT_TOKEN,
         channel_id=LOG_CHANNEL_ID,
         enabled=LOG_TO_CHANNEL,
         channel_level=LOG_CHANNEL_LEVEL,
         file_level=LOG_LEVEL,
         full_verbose=FULL_VERBOSE_TO_CHANNEL,
+        queue_size=LOG_CHANNEL_QUEUE_SIZE,
+        drop_policy=LOG_CHANNEL_DROP_POLICY,
     )
 
     if not BOT_TOKEN:
@@ -770,6 +816,9 @@ def main() -> None:
         Application.builder()
         .token(BOT_TOKEN)
         .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .rate_limiter(OutboundRateLimiter(RATE_LIMIT_GLOBAL, RATE_LIMIT_CHAT, RATE_LIMIT_GROUP))
         .build()
     )
     
@@ -0,0 +1,268 @@
+"""NanoStore broadcast engine — sends a broadcast in the background.
+
+A broadcast snapshots its recipients into broadcast_recipients when it is
+created and then runs as an asyncio task, independent of the callback that
+started it:
+
+- BROADCAST_CONCURRENCY workers send in parallel. Pacing is left to the
+  bot's OutboundRateLimiter: sends go out at Priority.BULK, behind
+  interactive replies and log messages, under the global rate limit.
+- The limiter pauses every send for a flood-wait and retries once; if
+  RetryAfter still comes through, the same recipient is sent again.
+  Forbidden (bot blocked, account deleted) marks the user blocked, so
+  later broadcasts skip them.
+- Outcomes are written back in batches. Recipients still 'pending' after a
+  restart are picked up again by resume_broadcasts() from post_init.
+- The admin's message is edited with live progress and a stop button.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+from telegram.ext import Application
+
+from config import ADMIN_ID, BROADCAST_CONCURRENCY
+from database import (
+    add_action_log, create_broadcast, finish_broadcast, get_broadcast,
+    get_broadcast_pending, get_running_broadcasts, record_broadcast_results,
+)
+from utils import Priority, admin_broadcast_progress_kb, back_kb, separator
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress edits (and result flushes) on the admin's message
+PROGRESS_INTERVAL: float = 5.0
+
+# Flush results to the database once this many are buffered
+FLUSH_SIZE: int = 200
+
+# Recipients read from the database per chunk
+CHUNK_SIZE: int = 500
+
+# Attempts per recipient on network errors (flood-waits don't count)
+MAX_ATTEMPTS: int = 3
+
+# broadcast_id -> task running it in this process
+_running: dict[int, asyncio.Task] = {}
+
+# Broadcasts the admin asked to stop (vs. cancelled by shutdown)
+_stopping: set[int] = set()
+
+
+async def _send_one(bot: Bot, user_id: int, text: str) -> Optional[str]:
+    """
+    Send to one recipient; returns 'sent', 'blocked' or 'failed'.
+
+    None means the send broke for a reason that has nothing to do with the
+    recipient (client closed, a bug); they stay pending for resume.
+    """
+    attempt = 0
+    while True:
+        try:
+            await bot.send_message(
+                chat_id=user_id, text=text, parse_mode="HTML", rate_limit_args=Priority.BULK
+            )
+            return "sent"
+        except RetryAfter:
+            # The limiter has already paused every send for the flood-wait
+            continue
+        except Forbidden:
+            return "blocked"
+        except BadRequest as e:
+            if "chat not found" in str(e).lower():
+                return "blocked"
+            logger.debug("Broadcast to %s rejected: %s", user_id, e)
+            return "failed"
+        except NetworkError as e:
+            attempt += 1
+            if attempt >= MAX_ATTEMPTS:
+                logger.debug("Broadcast to %s failed: %s", user_id, e)
+                return "failed"
+            await asyncio.sleep(2 ** attempt)
+        except TelegramError as e:
+            logger.debug("Broadcast to %s rejected: %s", user_id, e)
+            return "failed"
+        except Exception as e:
+            logger.warning("Broadcast to %s not sent, left pending: %s", user_id, e)
+            return None
+
+
+def _progress_text(title: str, counts: dict, total: int, started: float, sent_now: int) -> str:
+    done = counts["sent"] + counts["blocked"] + counts["failed"]
+    pct = done * 100 // total if total else 100
+    elapsed = max(time.monotonic() - started, 1e-6)
+    return (
+        f"📣 <b>{title}</b>\n{separator()}\n\n"
+        f"✅ Sent: <b>{counts['sent']}</b>\n"
+        f"🚫 Blocked: <b>{counts['blocked']}</b>\n"
+        f"❌ Failed: <b>{counts['failed']}</b>\n"
+        f"📊 Progress: {done}/{total} ({pct}%)\n"
+        f"⚡ Rate: {sent_now / elapsed:.1f} msg/s"
+    )
+
+
+async def _edit_admin_message(bot: Bot, bc: dict, text: str, reply_markup) -> None:
+    if not bc["admin_chat_id"] or not bc["admin_message_id"]:
+        return
+    try:
+        await bot.edit_message_text(
+            chat_id=bc["admin_chat_id"],
+            message_id=bc["admin_message_id"],
+            text=text,
+            parse_mode="HTML",
+            reply_markup=reply_markup,
+        )
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            logger.debug("Broadcast %s progress edit failed: %s", bc["id"], e)
+    except Exception as e:
+        logger.debug("Broadcast %s progress edit failed: %s", bc["id"], e)
+
+
+async def _run(bot: Bot, broadcast_id: int) -> None:
+    bc = await get_broadcast(broadcast_id)
+    if not bc or bc["status"] != "running":
+        return
+
+    total = bc["total"]
+    counts = {"sent": bc["sent"], "blocked": bc["blocked"], "failed": bc["failed"]}
+    pending: list[tuple[int, str]] = []
+    queue: asyncio.Queue = asyncio.Queue(maxsize=BROADCAST_CONCURRENCY * 4)
+    started = time.monotonic()
+    handled = 0
+    unsent = 0
+
+    async def flush() -> None:
+        batch = pending[:]
+        del pending[:]
+        if batch:
+            try:
+                await record_broadcast_results(broadcast_id, batch)
+            except Exception as e:
+                # Recipients stay 'pending' and are retried on resume
+                logger.error("Broadcast %s: saving %d results failed: %s",
+                             broadcast_id, len(batch), e)
+
+    async def feed() -> None:
+        after = 0
+        while True:
+            user_ids = await get_broadcast_pending(broadcast_id, after, CHUNK_SIZE)
+            if not user_ids:
+                break
+            for uid in user_ids:
+                await queue.put(uid)
+            after = user_ids[-1]
+        for _ in range(BROADCAST_CONCURRENCY):
+            await queue.put(None)
+
+    async def work() -> None:
+        nonlocal handled, unsent
+        while (uid := await queue.get()) is not None:
+            status = await _send_one(bot, uid, bc["text"])
+            if status is None:
+                unsent += 1
+                continue
+            counts[status] += 1
+            handled += 1
+            pending.append((uid, status))
+            if len(pending) >= FLUSH_SIZE:
+                await flush()
+
+    async def report() -> None:
+        kb = admin_broadcast_progress_kb(broadcast_id)
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            await flush()
+            text = _progress_text("Broadcasting…", counts, total, started, handled)
+            await _edit_admin_message(bot, bc, text, kb)
+
+    logger.info("Broadcast %s: %d of %d recipients left",
+                broadcast_id, total - sum(counts.values()), total)
+    helpers = [asyncio.create_task(report())]
+    helpers += [asyncio.create_task(work()) for _ in range(BROADCAST_CONCURRENCY)]
+    status = "done"
+    try:
+        await feed()
+        await asyncio.gather(*helpers[1:])
+    except asyncio.CancelledError:
+        if broadcast_id not in _stopping:
+            # Shutdown: stays 'running' and resumes on the next start
+            raise
+        status = "cancelled"
+    finally:
+        for task in helpers:
+            task.cancel()
+        await asyncio.gather(*helpers, return_exceptions=True)
+        await flush()
+        _stopping.discard(broadcast_id)
+
+    if status == "done" and unsent:
+        # Stays 'running' so resume_broadcasts() retries them on the next start
+        logger.warning("Broadcast %s: %d recipient(s) left pending", broadcast_id, unsent)
+        return
+
+    await finish_broadcast(broadcast_id, status)
+    title = "Broadcast Complete!" if status == "done" else "Broadcast Stopped"
+    text = _progress_text(title, counts, total, started, handled)
+    await _edit_admin_message(bot, bc, text, back_kb("admin"))
+    await add_action_log(
+        "broadcast", ADMIN_ID,
+        f"#{broadcast_id} {status} — Sent: {counts['sent']}, "
+        f"Blocked: {counts['blocked']}, Failed: {counts['failed']}",
+    )
+    logger.info("Broadcast %s %s: %s", broadcast_id, status, counts)
+
+
+def _spawn(bot: Bot, broadcast_id: int) -> None:
+    task = asyncio.create_task(_run(bot, broadcast_id), name=f"broadcast-{broadcast_id}")
+    _running[broadcast_id] = task
+
+    def _done(t: asyncio.Task) -> None:
+        _running.pop(broadcast_id, None)
+        if not t.cancelled() and t.exception():
+            logger.error("Broadcast %s crashed", broadcast_id, exc_info=t.exception())
+
+    task.add_done_callback(_done)
+
+
+async def start_broadcast(
+    bot: Bot, text: str, admin_chat_id: int, admin_message_id: int
+) -> int:
+    """Create a broadcast and start sending it in the background. Returns its ID."""
+    broadcast_id = await create_broadcast(text, admin_chat_id, admin_message_id)
+    _spawn(bot, broadcast_id)
+    return broadcast_id
+
+
+async def stop_broadcast(broadcast_id: int) -> bool:
+    """Stop a broadcast. Returns False if it had already finished."""
+    task = _running.get(broadcast_id)
+    if task is not None:
+        _stopping.add(broadcast_id)
+        task.cancel()
+        return True
+    bc = await get_broadcast(broadcast_id)
+    if bc and bc["status"] == "running":
+        await finish_broadcast(broadcast_id, "cancelled")
+        return True
+    return False
+
+
+async def resume_broadcasts(application: Application) -> None:
+    """Restart broadcasts interrupted by a shutdown. Called from post_init."""
+    for bc in await get_running_broadcasts():
+        if bc["id"] not in _running:
+            logger.info("Resuming broadcast %s", bc["id"])
+            _spawn(application.bot, bc["id"])
+
+
+async def shutdown_broadcasts() -> None:
+    """Cancel running broadcasts, saving their progress. Called from post_stop."""
+    tasks = list(_running.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
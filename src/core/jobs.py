@@ -0,0 +1,107 @@
+"""NanoStore background jobs — scheduled on the application's JobQueue.
+
+Needs the job-queue extra (python-telegram-bot[job-queue]); without it the
+bot runs normally and these jobs are skipped with a warning.
+"""
+
+import logging
+from datetime import time as dt_time, timezone
+
+from telegram.ext import Application, ContextTypes
+
+from config import (
+    ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL_HOURS, BACKUP_INTERVAL_HOURS, MAINTENANCE_HOUR,
+)
+from database import archive_old_rows, backup_database, run_maintenance
+from utils import notify_log_channel
+
+logger = logging.getLogger(__name__)
+
+
+async def archive_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Move aged action_logs / points_history rows into the archive DB."""
+    try:
+        moved = await archive_old_rows()
+    except Exception as e:
+        logger.error("Archive job failed: %s", e, exc_info=True)
+        return
+    if any(moved.values()):
+        logger.info(
+            "Archive job moved %s (older than %d days)",
+            ", ".join(f"{n} {t}" for t, n in moved.items()), ARCHIVE_AFTER_DAYS,
+        )
+
+
+async def backup_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Take a compressed online snapshot of the databases and rotate old ones."""
+    try:
+        await backup_database()
+    except Exception as e:
+        logger.error("Backup job failed: %s", e, exc_info=True)
+
+
+def _fmt_size(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+async def maintenance_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Checkpoint the WAL, refresh planner statistics and reclaim free pages."""
+    try:
+        result = await run_maintenance()
+    except Exception as e:
+        logger.error("Maintenance job failed: %s", e, exc_info=True)
+        await notify_log_channel(context.bot, f"⚠️ <b>DB maintenance failed</b>\n{e}")
+        return
+    if not result:
+        return
+
+    before, after, ms = result["before"], result["after"], result["ms"]
+    vacuum = "full VACUUM (switched to incremental)" if result["converted"] else "vacuum"
+    text = (
+        f"🧹 <b>DB maintenance</b>\n"
+        f"DB: {_fmt_size(before['db'])} → {_fmt_size(after['db'])}"
+        f" | WAL: {_fmt_size(before['wal'])} → {_fmt_size(after['wal'])}\n"
+        f"ANALYZE {ms['analyze']:.0f} ms · {vacuum} {ms['vacuum']:.0f} ms"
+        f" ({result['freed_pages']} pages freed) · checkpoint {ms['checkpoint']:.0f} ms"
+    )
+    if result["checkpoint_busy"]:
+        text += "\n⚠️ Checkpoint incomplete: readers were busy"
+    await notify_log_channel(context.bot, text)
+
+
+def schedule_jobs(application: Application) -> None:
+    """Register all recurring jobs. Called from post_init."""
+    job_queue = application.job_queue
+    if job_queue is None:
+        logger.warning(
+            "JobQueue unavailable (install python-telegram-bot[job-queue]); "
+            "background jobs are disabled"
+        )
+        return
+
+    if ARCHIVE_INTERVAL_HOURS > 0:
+        job_queue.run_repeating(
+            archive_job,
+            interval=ARCHIVE_INTERVAL_HOURS * 3600,
+            first=600,  # stay out of the way of the startup burst
+            name="archive",
+        )
+
+    if BACKUP_INTERVAL_HOURS > 0:
+        job_queue.run_repeating(
+            backup_job,
+            interval=BACKUP_INTERVAL_HOURS * 3600,
+            first=300,
+            name="backup",
+        )
+
+    if MAINTENANCE_HOUR >= 0:
+        job_queue.run_daily(
+            maintenance_job,
+            time=dt_time(hour=MAINTENANCE_HOUR, tzinfo=timezone.utc),  # quiet hour
+            name="maintenance",
+        )
@@ -1,25 +1,32 @@
 """Database module."""
 from .database import *
+from .profiling import get_query_stats, reset_query_stats, query_stats_since
+from .backup import backup_database
+from .maintenance import run_maintenance
 
 __all__ = [
-    'init_db', 'get_db',
-    'ensure_user', 'get_user', 'get_all_users', 'get_user_count', 'is_user_banned', 'ban_user', 'unban_user',
+    'init_db', 'get_db', 'get_backend', 'Page', 'get_read_db', 'close_db', 'transaction',
+    'ensure_user', 'get_user', 'get_all_users', 'get_users_page', 'get_user_count', 'is_user_banned', 'ban_user', 'unban_user',
     'get_user_balance', 'update_user_balance', 'get_all_user_ids',
     'get_active_categories', 'get_all_categories', 'get_category', 'add_category', 'update_category', 'delete_category',
     'get_product_count_in_category', 'get_products_by_category', 'get_product', 'add_product', 'update_product',
-    'delete_product', 'search_products', 'decrement_stock',
+    'delete_product', 'get_products_page', 'get_catalog', 'get_catalog_version', 'get_stock_overview', 'search_products', 'decrement_stock',
     'get_product_faqs', 'add_product_faq', 'delete_product_faq',
     'get_product_media', 'add_product_media', 'delete_product_media',
     'get_cart', 'get_cart_count', 'get_cart_total', 'get_cart_item', 'add_to_cart', 'update_cart_qty',
     'remove_from_cart_by_id', 'clear_cart',
-    'create_order', 'get_order', 'get_user_orders', 'get_user_order_count', 'get_all_orders', 'update_order',
+    'create_order', 'get_order', 'get_order_items', 'get_products_by_ids', 'get_user_orders', 'get_user_orders_page', 'get_user_order_count', 'get_all_orders', 'get_orders_page', 'update_order',
     'validate_coupon', 'use_coupon', 'get_all_coupons', 'create_coupon', 'delete_coupon', 'toggle_coupon',
     'get_payment_methods', 'get_all_payment_methods', 'get_payment_method', 'add_payment_method', 'delete_payment_method',
     'create_payment_proof', 'get_payment_proof', 'get_pending_proofs', 'get_pending_proof_count', 'update_proof',
-    'get_setting', 'set_setting', 'get_all_settings',
+    'get_setting', 'get_settings', 'set_setting', 'get_all_settings', 'get_settings_version',
     'get_force_join_channels', 'add_force_join_channel', 'delete_force_join_channel',
-    'create_ticket', 'get_ticket', 'get_user_tickets', 'get_open_tickets', 'get_all_tickets',
+    'create_ticket', 'get_ticket', 'get_user_tickets', 'get_open_tickets', 'get_all_tickets', 'get_tickets_page',
     'get_open_ticket_count', 'close_ticket', 'reopen_ticket', 'add_ticket_reply', 'get_ticket_replies',
-    'add_action_log', 'get_dashboard_stats',
-    'create_topup', 'get_topup', 'get_user_topups', 'get_pending_topups', 'get_pending_topup_count', 'update_topup',
+    'add_action_log', 'get_dashboard_stats', 'rebuild_stats_counters', 'get_user_profile', 'UserProfile',
+    'get_broadcast_audience_count', 'create_broadcast', 'get_broadcast', 'get_running_broadcasts',
+    'get_broadcast_pending', 'record_broadcast_results', 'finish_broadcast',
+    'archive_old_rows', 'backup_database', 'run_maintenance',
+    'get_query_stats', 'reset_query_stats', 'query_stats_since',
+    'create_topup', 'get_topup', 'get_user_topups', 'get_user_topups_page', 'get_pending_topups', 'get_pending_topup_count', 'update_topup',
 ]
@@ -0,0 +1,20 @@
+"""Storage backends — where database.py gets its connections from."""
+from .base import StorageBackend
+
+__all__ = ['StorageBackend', 'create_backend']
+
+
+def create_backend(name: str, **options) -> StorageBackend:
+    """
+    Build the backend selected by DB_BACKEND.
+
+    Backends are imported lazily so SQLite installs never need asyncpg.
+    """
+    name = (name or "sqlite").lower()
+    if name == "sqlite":
+        from .sqlite import SqliteBackend
+        return SqliteBackend(options["path"])
+    if name in ("postgres", "postgresql"):
+        from .postgres import PostgresBackend
+        return PostgresBackend(options["dsn"], max_size=options.get("pool_size", 10))
+    raise ValueError(f"Unknown DB_BACKEND: {name!r} (expected 'sqlite' or 'postgres')")
@@ -0,0 +1,60 @@
+"""Storage backend interface.
+
+database.py keeps every query function; a backend only decides where the
+connections come from and how the schema is created. Connections follow
+the aiosqlite surface the query functions already use:
+
+    cur = await conn.execute(sql, params)   # '?' placeholders
+    row = await cur.fetchone() / rows = await cur.fetchall()
+    cur.lastrowid, cur.rowcount
+    await conn.executemany(sql, seq) / conn.commit() / conn.rollback()
+    conn.in_transaction, await conn.close()
+
+Rows support row["col"], row[0] and dict(row).
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+
+class StorageBackend(ABC):
+    """Where database.py gets its writer, reader and transaction connections."""
+
+    name: str = ""
+
+    # Optional features; database.py falls back when a backend lacks one
+    supports_fts: bool = False        # FTS5 product search (else LIKE)
+    supports_archive: bool = False    # ATTACHed cold-storage file
+    supports_backup: bool = False     # sqlite3 online backup API
+    supports_maintenance: bool = False  # checkpoint / ANALYZE / incremental vacuum job
+
+    @abstractmethod
+    async def open_writer(self) -> Any:
+        """Shared writer: implicit transaction on first write, ended by commit()."""
+
+    @abstractmethod
+    async def open_reader(self) -> Any:
+        """Connection for SELECT-only work (kept in database.py's reader pool)."""
+
+    @abstractmethod
+    async def open_autocommit(self) -> Any:
+        """Private connection with no implicit transactions; the caller issues BEGIN."""
+
+    @abstractmethod
+    async def init_schema(self, writer: Any) -> int:
+        """Create or upgrade the schema; returns the schema version."""
+
+    async def fts_ready(self, writer: Any) -> bool:
+        """Whether the product full-text index exists."""
+        return False
+
+    async def data_version(self, conn: Any) -> Optional[int]:
+        """
+        Counter that changes when another connection commits, or None if
+        the backend can't tell (callers then check their own version row
+        every time).
+        """
+        return None
+
+    async def close(self) -> None:
+        """Release backend-wide resources (pools). Connections are closed by their owners."""
@@ -0,0 +1,59 @@
+"""SQLite backend (default) — aiosqlite on one WAL-mode file."""
+
+from pathlib import Path
+from typing import Optional
+
+import aiosqlite
+
+from ..migrations import run_migrations
+from .base import StorageBackend
+
+
+class SqliteBackend(StorageBackend):
+    name = "sqlite"
+    supports_fts = True
+    supports_archive = True
+    supports_backup = True
+    supports_maintenance = True
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    async def _connect(self, **kwargs) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.path, timeout=10.0, **kwargs)  # 10 second timeout
+        conn.row_factory = aiosqlite.Row
+        return conn
+
+    async def open_writer(self) -> aiosqlite.Connection:
+        # Ensure data directory exists
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = await self._connect()
+        # Only takes effect on a new, empty file (see maintenance.py for older ones)
+        await conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    async def open_reader(self) -> aiosqlite.Connection:
+        conn = await self._connect()
+        await conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    async def open_autocommit(self) -> aiosqlite.Connection:
+        conn = await self._connect(isolation_level=None)
+        await conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    async def init_schema(self, writer: aiosqlite.Connection) -> int:
+        return await run_migrations(writer)
+
+    async def fts_ready(self, writer: aiosqlite.Connection) -> bool:
+        cur = await writer.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+        )
+        return await cur.fetchone() is not None
+
+    async def data_version(self, conn: aiosqlite.Connection) -> Optional[int]:
+        cur = await conn.execute("PRAGMA data_version")
+        row = await cur.fetchone()
+        return row[0] if row else None
@@ -0,0 +1,147 @@
+"""NanoStore online backups — SQLite backup API, copied in small page steps.
+
+The source connection holds one read transaction for the whole copy, so
+under WAL the snapshot is consistent and writers are never blocked (and
+the backup never restarts because of them). Pages are copied a few
+hundred at a time on the connection's worker thread, sleeping between
+steps, so neither the event loop nor checkout writes wait on it.
+
+Snapshots are gzip-compressed into BACKUP_DIR and rotated to BACKUP_KEEP.
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import aiosqlite
+
+from config import ARCHIVE_DB_PATH, BACKUP_DIR, BACKUP_KEEP, DB_BACKEND, DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# Pages copied per backup step, and the pause between steps (seconds)
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.005
+
+
+async def _copy_online(src_path: str, dest_path: str) -> int:
+    """Copy a live database into dest_path page-step by page-step; returns page count."""
+    pages_total = 0
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        nonlocal pages_total
+        pages_total = total
+
+    src = await aiosqlite.connect(src_path, timeout=10.0, isolation_level=None)
+    # check_same_thread=False: the copy runs on the source connection's thread
+    dest = await aiosqlite.connect(dest_path, check_same_thread=False)
+    try:
+        # Pin one snapshot for the whole copy
+        await src.execute("BEGIN")
+        await src.execute("SELECT COUNT(*) FROM sqlite_master")
+        await src.backup(dest, pages=PAGES_PER_STEP, progress=progress, sleep=STEP_SLEEP)
+        await src.execute("COMMIT")
+
+        cur = await dest.execute("PRAGMA quick_check")
+        row = await cur.fetchone()
+        if row[0] != "ok":
+            raise RuntimeError(f"Backup of {src_path} failed quick_check: {row[0]}")
+        # Self-contained file: no -wal needed to restore it
+        await dest.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        await dest.close()
+        await src.close()
+    return pages_total
+
+
+def _gzip_file(src: str, dest: str) -> None:
+    with open(src, "rb") as f_in, gzip.open(dest, "wb", compresslevel=6) as f_out:
+        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+
+
+def _rotate(dest_dir: Path, prefix: str, keep: int) -> list[str]:
+    """Delete all but the newest ``keep`` snapshots for ``prefix``."""
+    snapshots = sorted(dest_dir.glob(f"{prefix}-*.db.gz"))
+    removed = []
+    for old in snapshots[:-keep] if keep > 0 else []:
+        old.unlink(missing_ok=True)
+        removed.append(old.name)
+    return removed
+
+
+async def snapshot(
+    src_path: str, dest_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP
+) -> dict:
+    """
+    Take one compressed snapshot of ``src_path`` and rotate old ones.
+
+    Returns:
+        dict with path, pages, size (compressed bytes), seconds, removed
+    """
+    started = time.perf_counter()
+    out_dir = Path(dest_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    prefix = Path(src_path).stem
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    tmp_path = out_dir / f".{prefix}-{stamp}.db.tmp"
+    final_path = out_dir / f"{prefix}-{stamp}.db.gz"
+
+    try:
+        pages = await _copy_online(src_path, str(tmp_path))
+        await asyncio.to_thread(_gzip_file, str(tmp_path), str(final_path))
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    removed = await asyncio.to_thread(_rotate, out_dir, prefix, keep)
+    return {
+        "path": str(final_path),
+        "pages": pages,
+        "size": final_path.stat().st_size,
+        "seconds": round(time.perf_counter() - started, 2),
+        "removed": removed,
+    }
+
+
+async def backup_database(
+    dest_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP
+) -> list[dict]:
+    """Snapshot the main database and, if it exists, the archive database."""
+    if DB_BACKEND.lower() != "sqlite":
+        logger.warning("Backups skipped: DB_BACKEND=%s (use pg_dump for Postgres)", DB_BACKEND)
+        return []
+    results = []
+    for path in (DB_PATH, ARCHIVE_DB_PATH):
+        if not os.path.exists(path):
+            continue
+        result = await snapshot(path, dest_dir, keep)
+        logger.info(
+            "Backup %s: %d pages, %.1f KB in %.2fs (rotated %d)",
+            os.path.basename(result["path"]), result["pages"],
+            result["size"] / 1024, result["seconds"], len(result["removed"]),
+        )
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """CLI: take a backup now (see backup.py in the project root)."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Online backup of the NanoStore database")
+    parser.add_argument("--dest", default=BACKUP_DIR, help="directory for snapshots")
+    parser.add_argument("--keep", type=int, default=BACKUP_KEEP, help="snapshots to keep")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    results = asyncio.run(backup_database(args.dest, args.keep))
+    if not results:
+        raise SystemExit(f"No database found at {DB_PATH}")
+    for r in results:
+        print(f"{r['path']}  {r['size'] / 1024:.1f} KB  {r['seconds']}s")
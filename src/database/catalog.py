@@ -0,0 +1,132 @@
+"""NanoStore catalog snapshot — the whole browsable catalog, read-only, in memory.
+
+database.get_catalog() builds one from four queries and keeps it until the
+catalog version moves (any category / product / FAQ / media write or stock
+change in this process). A new snapshot is built off to the side and then
+swapped in, so handlers never see a half-updated catalog.
+
+Rows are read-only mappings (row["name"], row.get("stock")); call dict(row)
+for a mutable copy. Every category and product row also carries
+"name_html" (and categories "title_html": emoji + name) already escaped
+for HTML messages. Products leave out delivery_data — auto-delivery
+payloads are read from the database when an order is approved.
+"""
+
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional
+
+Row = Mapping[str, object]
+
+# Not shown while browsing; never cached
+_PRIVATE_PRODUCT_FIELDS = ("delivery_data",)
+
+
+def _escape(text: object) -> str:
+    """Same escaping as utils.html_escape (database/ doesn't import utils)."""
+    if not text:
+        return ""
+    return (
+        str(text)
+        .replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+    )
+
+
+def _freeze(row: Mapping, **extra) -> Row:
+    return MappingProxyType({**row, **extra})
+
+
+def _group(rows: Iterable[Row], key: str) -> dict[int, tuple]:
+    grouped: dict[int, list] = {}
+    for row in rows:
+        grouped.setdefault(row[key], []).append(row)
+    return {k: tuple(v) for k, v in grouped.items()}
+
+
+class CatalogSnapshot:
+    """Immutable view of the catalog at one catalog version."""
+
+    __slots__ = (
+        "version", "categories", "_categories_by_id", "_products_by_id",
+        "_active_by_category", "_counts", "_faqs", "_media",
+    )
+
+    def __init__(
+        self,
+        version: int,
+        categories: Iterable[Mapping],
+        products: Iterable[Mapping],
+        faqs: Iterable[Mapping] = (),
+        media: Iterable[Mapping] = (),
+    ) -> None:
+        cats = [
+            _freeze(
+                c,
+                name_html=_escape(c["name"]),
+                title_html=_escape(f"{c['emoji'] or ''} {c['name']}".strip()),
+            )
+            for c in map(dict, categories)
+        ]
+        prods = [
+            _freeze(
+                {k: v for k, v in p.items() if k not in _PRIVATE_PRODUCT_FIELDS},
+                name_html=_escape(p["name"]),
+            )
+            for p in map(dict, products)
+        ]
+
+        cats.sort(key=lambda c: (c["sort_order"], c["id"]))
+        prods.sort(key=lambda p: p["id"])
+
+        self.version = version
+        #: Active categories in menu order
+        self.categories: tuple[Row, ...] = tuple(c for c in cats if c["active"])
+        self._categories_by_id = MappingProxyType({c["id"]: c for c in cats})
+        self._products_by_id = MappingProxyType({p["id"]: p for p in prods})
+        self._active_by_category = MappingProxyType(
+            _group((p for p in prods if p["active"]), "category_id")
+        )
+        counts: dict[int, int] = {}
+        for p in prods:
+            counts[p["category_id"]] = counts.get(p["category_id"], 0) + 1
+        self._counts = MappingProxyType(counts)
+        self._faqs = MappingProxyType(_group(map(_freeze, map(dict, faqs)), "product_id"))
+        self._media = MappingProxyType(_group(map(_freeze, map(dict, media)), "product_id"))
+
+    def category(self, cat_id: int) -> Optional[Row]:
+        """Any category by id (active or not)."""
+        return self._categories_by_id.get(cat_id)
+
+    def products_in(self, cat_id: int) -> tuple[Row, ...]:
+        """Active products of a category, by id."""
+        return self._active_by_category.get(cat_id, ())
+
+    def product_count(self, cat_id: int) -> int:
+        """All products in a category, active or not."""
+        return self._counts.get(cat_id, 0)
+
+    def product(self, prod_id: int) -> Optional[Row]:
+        """Any product by id (active or not)."""
+        return self._products_by_id.get(prod_id)
+
+    def stock_overview(self) -> list[tuple[Row, Row]]:
+        """(category, product) for every active product, in menu order."""
+        return [
+            (cat, product)
+            for cat in self.categories
+            for product in self.products_in(cat["id"])
+        ]
+
+    def faqs(self, prod_id: int) -> tuple[Row, ...]:
+        return self._faqs.get(prod_id, ())
+
+    def media(self, prod_id: int) -> tuple[Row, ...]:
+        return self._media.get(prod_id, ())
+
+    def __repr__(self) -> str:
+        return (
+            f"<CatalogSnapshot v{self.version}: {len(self._categories_by_id)} categories, "
+            f"{len(self._products_by_id)} products>"
+        )
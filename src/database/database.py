@@ -1,36 +1,303 @@
-"""NanoStore database module — aiosqlite, all tables, all queries."""
+"""NanoStore database module — all tables, all queries (SQLite by default, see backends/)."""
 
-import json
+import asyncio
 import logging
-from datetime import datetime
-from typing import Any, Optional
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Iterable, Mapping, Optional, TypedDict, Union,
+)
 
 import aiosqlite
 
-from config import DB_PATH
+from config import (
+    ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_DB_PATH, CATALOG_CACHE_TTL, DATABASE_URL,
+    DB_BACKEND, DB_PATH, DB_PG_POOL_SIZE, DB_READ_POOL_SIZE, SETTINGS_CACHE_TTL,
+    WRITE_BATCH_MAX, WRITE_BATCH_WINDOW_MS,
+)
+
+from .backends import StorageBackend, create_backend
+from .catalog import CatalogSnapshot
+from .migrations import STATS_COUNTER_QUERIES
+from .profiling import profiled, reset_write_owner, set_write_owner, write_owner
 
 logger = logging.getLogger(__name__)
 
+# Storage backend (DB_BACKEND) — supplies every connection below.
+_backend: Optional[StorageBackend] = None
+
+# Single writer connection — every INSERT/UPDATE/DELETE goes through it.
 _db: Optional[aiosqlite.Connection] = None
 
+# Pool of read-only connections for SELECT-only queries. WAL lets these
+# read the last committed snapshot while the writer is busy committing.
+_read_pool: Optional[asyncio.Queue] = None
+_read_conns: list[aiosqlite.Connection] = []
+_read_pool_lock = asyncio.Lock()
+
+# Group-commit writer: small writes are queued and applied by one task in
+# a shared transaction, so a burst of cart clicks costs one fsync.
+_write_queue: Optional[asyncio.Queue] = None
+_write_task: Optional[asyncio.Task] = None
+
+
+def get_backend() -> StorageBackend:
+    """The configured storage backend (created on first use)."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend(
+            DB_BACKEND, path=DB_PATH, dsn=DATABASE_URL, pool_size=DB_PG_POOL_SIZE
+        )
+        logger.info("Storage backend: %s", _backend.name)
+    return _backend
+
 
 async def get_db() -> aiosqlite.Connection:
-    """Get or create DB connection with timeout."""
+    """Get or create the writer DB connection."""
     global _db
     if _db is None:
-        # Ensure data directory exists
-        import os
-        from pathlib import Path
-        db_dir = Path(DB_PATH).parent
-        db_dir.mkdir(parents=True, exist_ok=True)
-        
-        _db = await aiosqlite.connect(DB_PATH, timeout=10.0)  # 10 second timeout
-        _db.row_factory = aiosqlite.Row
-        await _db.execute("PRAGMA journal_mode=WAL")
-        await _db.execute("PRAGMA foreign_keys=ON")
+        _db = profiled(await get_backend().open_writer())
     return _db
 
 
+async def _open_reader() -> aiosqlite.Connection:
+    """Open one read-only connection for the reader pool."""
+    return profiled(await get_backend().open_reader())
+
+
+@asynccontextmanager
+async def get_read_db() -> AsyncIterator[aiosqlite.Connection]:
+    """
+    Borrow a read-only connection from the reader pool.
+
+    Falls back to the writer connection when DB_READ_POOL_SIZE is 0.
+
+    Usage:
+        async with get_read_db() as db:
+            cur = await db.execute("SELECT ...")
+    """
+    global _read_pool
+    if DB_READ_POOL_SIZE <= 0:
+        yield await get_db()
+        return
+
+    if _read_pool is None:
+        async with _read_pool_lock:
+            if _read_pool is None:
+                # Writer first: creates the file and switches it to WAL
+                await get_db()
+                pool: asyncio.Queue = asyncio.Queue()
+                for _ in range(DB_READ_POOL_SIZE):
+                    conn = await _open_reader()
+                    _read_conns.append(conn)
+                    pool.put_nowait(conn)
+                _read_pool = pool
+                logger.info("DB reader pool ready (%d connections)", DB_READ_POOL_SIZE)
+
+    conn = await _read_pool.get()
+    try:
+        yield conn
+    finally:
+        _read_pool.put_nowait(conn)
+
+
+async def _open_batch_conn() -> aiosqlite.Connection:
+    """Open the group-commit connection (autocommit, explicit BEGIN)."""
+    await get_db()  # make sure the file exists and is in WAL mode
+    return profiled(await get_backend().open_autocommit())
+
+
+async def _apply_write_batch(conn: aiosqlite.Connection, batch: list) -> None:
+    """
+    Run a batch of queued writes in one transaction and resolve their futures.
+
+    Each write gets its own SAVEPOINT, so a failing one is rolled back and
+    reported to its caller without taking the rest of the batch down.
+    Futures resolve only after COMMIT — awaiting one means the write is durable.
+    """
+    done: list[tuple[asyncio.Future, Any, Optional[BaseException]]] = []
+    try:
+        await conn.execute("BEGIN IMMEDIATE")
+        for op, fut, owner in batch:
+            if fut.done():  # caller was cancelled before we got to it
+                continue
+            await conn.execute("SAVEPOINT write_op")
+            token = set_write_owner(owner)
+            try:
+                result = await op(conn)
+            except Exception as e:
+                reset_write_owner(token)
+                await conn.execute("ROLLBACK TO write_op")
+                await conn.execute("RELEASE write_op")
+                done.append((fut, None, e))
+            else:
+                reset_write_owner(token)
+                await conn.execute("RELEASE write_op")
+                done.append((fut, result, None))
+        await conn.commit()
+    except Exception as e:
+        logger.error("Group commit of %d writes failed: %s", len(batch), e)
+        if conn.in_transaction:
+            await conn.rollback()
+        for _, fut, _ in batch:
+            if not fut.done():
+                fut.set_exception(e)
+        return
+
+    for fut, result, error in done:
+        if fut.done():
+            continue
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+
+
+async def _write_worker(queue: asyncio.Queue) -> None:
+    """Collect queued writes for up to WRITE_BATCH_WINDOW_MS and commit them together."""
+    loop = asyncio.get_running_loop()
+    window = WRITE_BATCH_WINDOW_MS / 1000
+    conn: Optional[aiosqlite.Connection] = None
+    stopping = False
+    try:
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + window
+            while len(batch) < WRITE_BATCH_MAX:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                if conn is None:
+                    conn = await _open_batch_conn()
+            except Exception as e:
+                logger.error("Group-commit writer could not connect: %s", e)
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            await _apply_write_batch(conn, batch)
+    finally:
+        if conn is not None:
+            await conn.close()
+
+
+async def _queue_write(op: Callable[[aiosqlite.Connection], Awaitable[Any]]) -> Any:
+    """
+    Queue a small write for the group-commit writer and wait until it is committed.
+
+    ``op`` receives the writer connection and must not commit; its return
+    value (e.g. a lastrowid) is handed back once the batch is durable.
+    With WRITE_BATCH_MAX = 0 the write runs and commits on the shared writer.
+    """
+    global _write_queue, _write_task
+    if WRITE_BATCH_MAX <= 0:
+        db = await get_db()
+        result = await op(db)
+        await db.commit()
+        return result
+
+    if _write_task is None or _write_task.done():
+        _write_queue = asyncio.Queue()
+        _write_task = asyncio.create_task(_write_worker(_write_queue))
+
+    fut = asyncio.get_running_loop().create_future()
+    _write_queue.put_nowait((op, fut, write_owner()))
+    return await fut
+
+
+async def _queue_execute(sql: str, params: tuple = ()) -> int:
+    """Queue a single statement; returns its lastrowid once committed."""
+    async def op(conn: aiosqlite.Connection) -> int:
+        cur = await conn.execute(sql, params)
+        return cur.lastrowid
+
+    return await _queue_write(op)
+
+
+async def close_db() -> None:
+    """Flush queued writes, then close the writer and all pooled reader connections."""
+    global _backend, _db, _read_pool, _write_queue, _write_task
+    if _write_task is not None:
+        if not _write_task.done():
+            _write_queue.put_nowait(None)
+            try:
+                await _write_task
+            except Exception as e:
+                logger.warning("Group-commit writer stopped with error: %s", e)
+        _write_task = None
+        _write_queue = None
+
+    for conn in _read_conns:
+        try:
+            await conn.close()
+        except Exception as e:
+            logger.warning("Failed to close reader connection: %s", e)
+    _read_conns.clear()
+    _read_pool = None
+
+    if _db is not None:
+        await _db.close()
+        _db = None
+
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator[aiosqlite.Connection]:
+    """
+    Run several writes atomically on a dedicated connection.
+
+    Opens a private connection and takes the write lock up front with
+    BEGIN IMMEDIATE, so commits from other coroutines on the shared writer
+    can never land in the middle of the transaction. Commits on clean exit,
+    rolls back if the block raises.
+
+    Usage:
+        async with transaction() as conn:
+            await update_user_balance(user_id, -amount, conn=conn)
+            await decrement_stock(product_id, qty, conn=conn)
+    """
+    await get_db()  # make sure the file exists and is in WAL mode
+    conn = await get_backend().open_autocommit()
+    try:
+        await conn.execute("BEGIN IMMEDIATE")
+        tx = profiled(conn)
+        try:
+            yield tx
+        except BaseException:
+            await conn.rollback()
+            raise
+        else:
+            await conn.commit()
+            if id(tx) in _catalog_dirty:
+                _bump_catalog_version()
+        finally:
+            _catalog_dirty.discard(id(tx))
+    finally:
+        await conn.close()
+
+
 def _row_to_dict(row) -> dict:
     """Convert aiosqlite.Row to dict."""
     if row is None:
@@ -43,313 +310,157 @@ def _rows_to_list(rows) -> list:
     return [dict(r) for r in rows]
 
 
+# ======================== KEYSET PAGINATION ========================
+
+class Page(TypedDict):
+    """One page of a newest-first listing plus cursors for its neighbours."""
+    items: list
+    prev: Optional[str]   # cursor for newer rows, None on the first page
+    next: Optional[str]   # cursor for older rows, None on the last page
+
+
+# Cursor = direction + created_at digits + id, e.g. "n20261018025123.42".
+# Compact and ':'-free so it fits in callback_data next to a prefix.
+_CURSOR_RE = re.compile(r"^([np])(\d{14})\.(\d+)$")
+
+
+def _encode_cursor(direction: str, ts: str, row_id: int) -> str:
+    digits = re.sub(r"\D", "", ts or "")[:14].ljust(14, "0")
+    return f"{direction}{digits}.{row_id}"
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[tuple[str, str, int]]:
+    """Return (direction, 'YYYY-MM-DD HH:MM:SS', id), or None for a missing/bad cursor."""
+    m = _CURSOR_RE.match(cursor or "")
+    if not m:
+        return None
+    d = m.group(2)
+    ts = f"{d[0:4]}-{d[4:6]}-{d[6:8]} {d[8:10]}:{d[10:12]}:{d[12:14]}"
+    return m.group(1), ts, int(m.group(3))
+
+
+async def _keyset_page(
+    table: str, ts_col: str, id_col: str,
+    where: str = "", params: tuple = (),
+    limit: int = 10, cursor: Optional[str] = None,
+) -> Page:
+    """
+    Fetch one page of ``table`` ordered by (ts_col, id_col) newest first.
+
+    Seeks straight to the cursor position with a row-value comparison
+    instead of OFFSET, so every page costs the same however deep it is.
+    Reads limit + 1 rows to know whether another page exists.
+    """
+    decoded = _decode_cursor(cursor)
+    conds = [where] if where else []
+    args = list(params)
+    backwards = False
+    if decoded:
+        direction, ts, row_id = decoded
+        backwards = direction == "p"
+        conds.append(f"({ts_col}, {id_col}) {'>' if backwards else '<'} (?, ?)")
+        args += [ts, row_id]
+    order = "ASC" if backwards else "DESC"
+    sql = f"SELECT * FROM {table}"
+    if conds:
+        sql += " WHERE " + " AND ".join(f"({c})" for c in conds)
+    sql += f" ORDER BY {ts_col} {order}, {id_col} {order} LIMIT ?"
+    args.append(limit + 1)
+
+    async with get_read_db() as db:
+        cur = await db.execute(sql, args)
+        rows = _rows_to_list(await cur.fetchall())
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+        has_newer, has_older = more, True
+    else:
+        has_newer, has_older = decoded is not None, more
+
+    page: Page = {"items": rows, "prev": None, "next": None}
+    if rows and has_newer:
+        page["prev"] = _encode_cursor("p", rows[0][ts_col], rows[0][id_col])
+    if rows and has_older:
+        page["next"] = _encode_cursor("n", rows[-1][ts_col], rows[-1][id_col])
+    return page
+
+
 # ======================== INIT ========================
 
 async def init_db() -> None:
-    """Create all tables."""
+    """Bring the schema up to date and warm the in-memory caches."""
+    global _fts_enabled, _archive_ready
+    backend = get_backend()
     db = await get_db()
+    version = await backend.init_schema(db)
 
-    await db.executescript("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id     INTEGER PRIMARY KEY,
-            full_name   TEXT DEFAULT '',
-            username    TEXT DEFAULT '',
-            balance     REAL DEFAULT 0.0,
-            points      INTEGER DEFAULT 0,
-            currency    TEXT DEFAULT 'PKR',
-            banned      INTEGER DEFAULT 0,
-            joined_at   TEXT DEFAULT (datetime('now')),
-            last_spin   TEXT DEFAULT NULL,
-            referrer_id INTEGER DEFAULT NULL,
-            total_spent REAL DEFAULT 0.0,
-            total_deposited REAL DEFAULT 0.0
-        );
-
-        CREATE TABLE IF NOT EXISTS categories (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            name        TEXT NOT NULL,
-            emoji       TEXT DEFAULT '',
-            image_id    TEXT DEFAULT NULL,
-            sort_order  INTEGER DEFAULT 0,
-            active      INTEGER DEFAULT 1,
-            created_at  TEXT DEFAULT (datetime('now'))
-        );
-
-        CREATE TABLE IF NOT EXISTS products (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            category_id INTEGER NOT NULL,
-            name        TEXT NOT NULL,
-            description TEXT DEFAULT '',
-            price       REAL NOT NULL DEFAULT 0,
-            stock       INTEGER DEFAULT -1,
-            image_id    TEXT DEFAULT NULL,
-            active      INTEGER DEFAULT 1,
-            created_at  TEXT DEFAULT (datetime('now')),
-            FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE CASCADE
-        );
-
-        CREATE TABLE IF NOT EXISTS product_faqs (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id  INTEGER NOT NULL,
-            question    TEXT NOT NULL,
-            answer      TEXT NOT NULL,
-            FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
-        );
-
-        CREATE TABLE IF NOT EXISTS product_media (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id  INTEGER NOT NULL,
-            media_type  TEXT NOT NULL DEFAULT 'file',
-            file_id     TEXT NOT NULL,
-            FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
-        );
-
-        CREATE TABLE IF NOT EXISTS cart (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id     INTEGER NOT NULL,
-            product_id  INTEGER NOT NULL,
-            quantity    INTEGER DEFAULT 1,
-            added_at    TEXT DEFAULT (datetime('now')),
-            FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
-            UNIQUE(user_id, product_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS orders (
-            id              INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id         INTEGER NOT NULL,
-            items_json      TEXT DEFAULT '[]',
-            total           REAL DEFAULT 0,
-            status          TEXT DEFAULT 'pending',
-            payment_status  TEXT DEFAULT 'unpaid',
-            payment_method_id INTEGER DEFAULT NULL,
-            payment_proof_id  INTEGER DEFAULT NULL,
-            coupon_code     TEXT DEFAULT NULL,
-            created_at      TEXT DEFAULT (datetime('now'))
-        );
-
-        CREATE TABLE IF NOT EXISTS payment_methods (
-            id      INTEGER PRIMARY KEY AUTOINCREMENT,
-            name    TEXT NOT NULL,
-            details TEXT DEFAULT '',
-            emoji   TEXT DEFAULT '',
-            active  INTEGER DEFAULT 1
-        );
-
-        CREATE TABLE IF NOT EXISTS payment_proofs (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id     INTEGER NOT NULL,
-            order_id    INTEGER NOT NULL,
-            method_id   INTEGER DEFAULT 0,
-            file_id     TEXT NOT NULL,
-            status      TEXT DEFAULT 'pending_review',
-            reviewed_by INTEGER DEFAULT NULL,
-            admin_note  TEXT DEFAULT NULL,
-            created_at  TEXT DEFAULT (datetime('now'))
-        );
-
-        CREATE TABLE IF NOT EXISTS coupons (
-            code            TEXT PRIMARY KEY,
-            discount_percent INTEGER DEFAULT 0,
-            max_uses        INTEGER DEFAULT 0,
-            used_count      INTEGER DEFAULT 0,
-            active          INTEGER DEFAULT 1,
-            created_at      TEXT DEFAULT (datetime('now'))
-        );
-
-        CREATE TABLE IF NOT EXISTS settings (
-            key     TEXT PRIMARY KEY,
-            value   TEXT DEFAULT ''
-        );
-
-        CREATE TABLE IF NOT EXISTS force_join_channels (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            channel_id  TEXT NOT NULL,
-            name        TEXT NOT NULL,
-            invite_link TEXT NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS tickets (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id     INTEGER NOT NULL,
-            subject     TEXT NOT NULL,
-            message     TEXT DEFAULT '',
-            status      TEXT DEFAULT 'open',
-            created_at  TEXT DEFAULT (datetime('now'))
-        );
-
-        CREATE TABLE IF NOT EXISTS ticket_replies (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            ticket_id   INTEGER NOT NULL,
-            sender      TEXT DEFAULT 'user',
-            message     TEXT NOT NULL,
-            created_at  TEXT DEFAULT (datetime('now')),
-            FOREIGN KEY (ticket_id) REFERENCES tickets(id) ON DELETE CASCADE
-        );
-
-        CREATE TABLE IF NOT EXISTS action_logs (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            action      TEXT NOT NULL,
-            user_id     INTEGER DEFAULT 0,
-            details     TEXT DEFAULT '',
-            created_at  TEXT DEFAULT (datetime('now'))
-        );
-
-        CREATE TABLE IF NOT EXISTS wallet_topups (
-            id              INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id         INTEGER NOT NULL,
-            amount          REAL NOT NULL,
-            method_id       INTEGER DEFAULT NULL,
-            proof_file_id   TEXT DEFAULT NULL,
-            status          TEXT DEFAULT 'pending',
-            admin_note      TEXT DEFAULT NULL,
-            reviewed_by     INTEGER DEFAULT NULL,
-            created_at      TEXT DEFAULT (datetime('now'))
-        );
-
-        CREATE TABLE IF NOT EXISTS points_history (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id     INTEGER NOT NULL,
-            amount      INTEGER NOT NULL,
-            reason      TEXT NOT NULL,
-            created_at  TEXT DEFAULT (datetime('now'))
-        );
-
-        CREATE TABLE IF NOT EXISTS referrals (
-            id              INTEGER PRIMARY KEY AUTOINCREMENT,
-            referrer_id     INTEGER NOT NULL,
-            referred_id     INTEGER NOT NULL,
-            created_at      TEXT DEFAULT (datetime('now')),
-            UNIQUE(referred_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS currency_rates (
-            currency    TEXT PRIMARY KEY,
-            rate_vs_pkr REAL NOT NULL,
-            updated_at  TEXT DEFAULT (datetime('now'))
-        );
-        
-        -- Performance indexes
-        CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders(user_id);
-        CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
-        CREATE INDEX IF NOT EXISTS idx_orders_payment_status ON orders(payment_status);
-        CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at DESC);
-        CREATE INDEX IF NOT EXISTS idx_orders_user_status ON orders(user_id, status, created_at DESC);
-        
-        CREATE INDEX IF NOT EXISTS idx_cart_user_id ON cart(user_id);
-        CREATE INDEX IF NOT EXISTS idx_cart_product_id ON cart(product_id);
-        
-        CREATE INDEX IF NOT EXISTS idx_payment_proofs_status ON payment_proofs(status);
-        CREATE INDEX IF NOT EXISTS idx_payment_proofs_order_id ON payment_proofs(order_id);
-        CREATE INDEX IF NOT EXISTS idx_payment_proofs_user_id ON payment_proofs(user_id);
-        
-        CREATE INDEX IF NOT EXISTS idx_tickets_user_id ON tickets(user_id);
-        CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status);
-        CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON tickets(created_at DESC);
-        
-        CREATE INDEX IF NOT EXISTS idx_products_category_id ON products(category_id);
-        CREATE INDEX IF NOT EXISTS idx_products_active ON products(active);
-        
-        CREATE INDEX IF NOT EXISTS idx_wallet_topups_user_id ON wallet_topups(user_id);
-        CREATE INDEX IF NOT EXISTS idx_wallet_topups_status ON wallet_topups(status);
-        
-        CREATE INDEX IF NOT EXISTS idx_points_history_user_id ON points_history(user_id);
-        CREATE INDEX IF NOT EXISTS idx_referrals_referrer_id ON referrals(referrer_id);
-    """)
-
-    # Default settings
-    defaults = {
-        "currency": "Rs",
-        "bot_name": "NanoStore",
-        "welcome_text": "Welcome to NanoStore!",
-        "use_global_image": "on",
-        "global_ui_image_id": "",
-        "welcome_image_id": "",
-        "ui_images_enabled": "on",
-        "shop_image_id": "",
-        "shop_text": "",
-        "cart_image_id": "",
-        "cart_text": "",
-        "orders_image_id": "",
-        "orders_text": "",
-        "wallet_image_id": "",
-        "wallet_text": "",
-        "support_image_id": "",
-        "support_text": "",
-        "admin_panel_image_id": "",
-        "admin_panel_text": "",
-        "global_banner_image_id": "",
-        "min_order": "0",
-        "topup_enabled": "on",
-        "topup_min_amount": "100",
-        "topup_max_amount": "10000",
-        "topup_bonus_percent": "0",
-        "auto_delete": "0",
-        "restart_notify_users": "off",
-        "last_restart_at": "",
-    }
-    for key, value in defaults.items():
-        await db.execute(
-            "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
-            (key, value),
-        )
+    _fts_enabled = backend.supports_fts and await backend.fts_ready(db)
+    _archive_ready = backend.supports_archive and os.path.exists(ARCHIVE_DB_PATH)
 
-    await db.commit()
-    logger.info("Database initialized with all tables.")
+    await _load_settings()
+    await get_catalog()
+    logger.info("Database initialized (%s, schema v%d).", backend.name, version)
 
 
 # ======================== USERS ========================
 
 async def ensure_user(user_id: int, full_name: str = "", username: str = "") -> None:
-    db = await get_db()
-    await db.execute(
+    await _queue_execute(
         """INSERT INTO users (user_id, full_name, username)
            VALUES (?, ?, ?)
            ON CONFLICT(user_id) DO UPDATE SET
              full_name = excluded.full_name,
-             username  = excluded.username""",
+             username  = excluded.username,
+             blocked   = 0""",
         (user_id, full_name, username),
     )
-    await db.commit()
 
 
 async def get_user(user_id: int) -> Optional[dict]:
-    db = await get_db()
-    cur = await db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
-    return _row_to_dict(await cur.fetchone())
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
+        return _row_to_dict(await cur.fetchone())
 
 
 async def get_all_users(limit: int = 20) -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM users ORDER BY joined_at DESC LIMIT ?", (limit,)
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM users ORDER BY joined_at DESC LIMIT ?", (limit,)
+        )
+        return _rows_to_list(await cur.fetchall())
+
+
+async def get_users_page(cursor: Optional[str] = None, limit: int = 20) -> Page:
+    """Newest users first, keyset-paginated on (joined_at, user_id)."""
+    return await _keyset_page("users", "joined_at", "user_id", limit=limit, cursor=cursor)
 
 
 async def get_all_user_ids() -> list[int]:
-    """Return IDs of all non-banned users for broadcast, etc."""
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT user_id FROM users WHERE banned = 0 ORDER BY joined_at DESC"
-    )
-    rows = await cur.fetchall()
-    return [row["user_id"] for row in rows]
+    """Return IDs of all non-banned users that haven't blocked the bot."""
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT user_id FROM users WHERE banned = 0 AND blocked = 0 ORDER BY joined_at DESC"
+        )
+        rows = await cur.fetchall()
+        return [row["user_id"] for row in rows]
 
 
 async def get_user_count() -> int:
-    db = await get_db()
-    cur = await db.execute("SELECT COUNT(*) as cnt FROM users")
-    row = await cur.fetchone()
-    return row["cnt"] if row else 0
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT COUNT(*) as cnt FROM users")
+        row = await cur.fetchone()
+        return row["cnt"] if row else 0
 
 
 async def is_user_banned(user_id: int) -> bool:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT banned FROM users WHERE user_id = ?", (user_id,)
-    )
-    row = await cur.fetchone()
-    return bool(row["banned"]) if row else False
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT banned FROM users WHERE user_id = ?", (user_id,)
+        )
+        row = await cur.fetchone()
+        return bool(row["banned"]) if row else False
 
 
 async def ban_user(user_id: int) -> None:
@@ -365,15 +476,18 @@ async def unban_user(user_id: int) -> None:
 
 
 async def get_user_balance(user_id: int) -> float:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT balance FROM users WHERE user_id = ?", (user_id,)
-    )
-    row = await cur.fetchone()
-    return row["balance"] if row else 0.0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT balance FROM users WHERE user_id = ?", (user_id,)
+        )
+        row = await cur.fetchone()
+        return row["balance"] if row else 0.0
 
 
-async def update_user_balance(user_id: int, amount: float, commit: bool = True) -> bool:
+async def update_user_balance(
+    user_id: int, amount: float, commit: bool = True,
+    conn: Optional[aiosqlite.Connection] = None,
+) -> bool:
     """
     Atomically update user balance. Returns True if successful, False if insufficient balance.
     For negative amounts (deductions), validates balance is sufficient.
@@ -382,8 +496,10 @@ async def update_user_balance(user_id: int, amount: float, commit: bool = True)
         user_id: User ID to update
         amount: Amount to add (positive) or deduct (negative)
         commit: Whether to commit the transaction (default True)
+        conn: Connection from transaction(); the caller's block commits it
     """
-    db = await get_db()
+    db = conn or await get_db()
+    commit = commit and conn is None
     
     if amount < 0:
         # Deduction - check balance is sufficient
@@ -409,26 +525,125 @@ async def update_user_balance(user_id: int, amount: float, commit: bool = True)
         return True
 
 
+# ======================== STORED VERSIONS ========================
+
+async def _stored_version(db: aiosqlite.Connection, name: str) -> Optional[float]:
+    """
+    A trigger-maintained version row in stats_counters ('settings_version',
+    'catalog_version', 'force_join_version'); it moves on every write to the tables it covers,
+    whichever process made it.
+    """
+    cur = await db.execute("SELECT value FROM stats_counters WHERE name = ?", (name,))
+    row = await cur.fetchone()
+    return row[0] if row else None
+
+
+# ======================== CATALOG SNAPSHOT ========================
+
+# Bumped after every committed catalog write in this process (categories,
+# products, FAQs, media, stock). get_catalog() rebuilds when it moves.
+# Writes by other workers sharing the database are picked up by comparing
+# the stored 'catalog_version' at most every CATALOG_CACHE_TTL seconds.
+_catalog_version: int = 0
+_catalog: Optional[CatalogSnapshot] = None
+_catalog_lock = asyncio.Lock()
+_catalog_stored_version: Optional[float] = None
+_catalog_checked_at: float = 0.0
+
+# transaction() connections that changed stock; bumped once they commit
+_catalog_dirty: set[int] = set()
+
+
+def _bump_catalog_version() -> None:
+    global _catalog_version
+    _catalog_version += 1
+
+
+def get_catalog_version() -> int:
+    """Current catalog version; use it to key caches derived from the catalog."""
+    return _catalog_version
+
+
+async def _check_catalog_version() -> None:
+    """Bump the local catalog version if another process changed the catalog."""
+    global _catalog_checked_at
+    if CATALOG_CACHE_TTL <= 0 or _catalog is None:
+        return
+    now = time.monotonic()
+    if now - _catalog_checked_at < CATALOG_CACHE_TTL:
+        return
+    _catalog_checked_at = now
+    async with get_read_db() as db:
+        stored = await _stored_version(db, "catalog_version")
+    # The snapshot records the stored version it was built at, so our own
+    # writes (already bumped locally and rebuilt) don't count twice
+    if stored is None or stored != _catalog_stored_version:
+        _bump_catalog_version()
+
+
+async def get_catalog() -> CatalogSnapshot:
+    """
+    The current catalog snapshot, rebuilt only after a catalog write.
+
+    Browsing handlers read everything from here. A write committed while
+    a rebuild is running bumps the version again, so that snapshot is
+    replaced on the next call rather than served as current.
+    """
+    global _catalog, _catalog_stored_version
+    await _check_catalog_version()
+    snap = _catalog
+    if snap is not None and snap.version == _catalog_version:
+        return snap
+
+    async with _catalog_lock:
+        if _catalog is not None and _catalog.version == _catalog_version:
+            return _catalog
+        version = _catalog_version
+        async with get_read_db() as db:
+            # Read first: a write landing mid-rebuild only costs another rebuild
+            stored = await _stored_version(db, "catalog_version")
+            cur = await db.execute("SELECT * FROM categories")
+            categories = await cur.fetchall()
+            cur = await db.execute("SELECT * FROM products")
+            products = await cur.fetchall()
+            cur = await db.execute("SELECT * FROM product_faqs ORDER BY id")
+            faqs = await cur.fetchall()
+            cur = await db.execute("SELECT * FROM product_media ORDER BY id")
+            media = await cur.fetchall()
+        _catalog = CatalogSnapshot(version, categories, products, faqs, media)
+        _catalog_stored_version = stored
+        return _catalog
+
+
+async def get_stock_overview() -> list[tuple[Mapping, Mapping]]:
+    """
+    Every active product paired with its active category, in menu order
+    (category sort_order, category id, product id) — one ordered pass with
+    no per-category queries and no per-category cap.
+    """
+    return (await get_catalog()).stock_overview()
+
+
 # ======================== CATEGORIES ========================
 
 async def get_active_categories() -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM categories WHERE active = 1 ORDER BY sort_order, id"
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM categories WHERE active = 1 ORDER BY sort_order, id"
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 async def get_all_categories() -> list:
-    db = await get_db()
-    cur = await db.execute("SELECT * FROM categories ORDER BY sort_order, id")
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT * FROM categories ORDER BY sort_order, id")
+        return _rows_to_list(await cur.fetchall())
 
 
 async def get_category(cat_id: int) -> Optional[dict]:
-    db = await get_db()
-    cur = await db.execute("SELECT * FROM categories WHERE id = ?", (cat_id,))
-    return _row_to_dict(await cur.fetchone())
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT * FROM categories WHERE id = ?", (cat_id,))
+        return _row_to_dict(await cur.fetchone())
 
 
 async def add_category(name: str, emoji: str = "", sort_order: int = 0) -> int:
@@ -438,6 +653,7 @@ async def add_category(name: str, emoji: str = "", sort_order: int = 0) -> int:
         (name, emoji, sort_order),
     )
     await db.commit()
+    _bump_catalog_version()
     return cur.lastrowid
 
 
@@ -455,21 +671,46 @@ async def update_category(cat_id: int, **kwargs) -> None:
         f"UPDATE categories SET {', '.join(fields)} WHERE id = ?", values
     )
     await db.commit()
+    _bump_catalog_version()
 
 
 async def delete_category(cat_id: int) -> None:
     db = await get_db()
     await db.execute("DELETE FROM categories WHERE id = ?", (cat_id,))
     await db.commit()
+    _bump_catalog_version()
 
 
-async def get_product_count_in_category(cat_id: int) -> int:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT COUNT(*) as cnt FROM products WHERE category_id = ?", (cat_id,)
-    )
-    row = await cur.fetchone()
-    return row["cnt"] if row else 0
+# Per-category product counts, valid for one catalog version
+_category_counts: dict[tuple[int, bool], int] = {}
+_category_counts_version: int = -1
+
+
+async def get_product_count_in_category(cat_id: int, active_only: bool = False) -> int:
+    """
+    Products in a category; cached until the next catalog write.
+
+    active_only=True counts what get_products_page() lists.
+    """
+    global _category_counts_version
+    await _check_catalog_version()
+    if _category_counts_version != _catalog_version:
+        _category_counts.clear()
+        _category_counts_version = _catalog_version
+    key = (cat_id, active_only)
+    if key in _category_counts:
+        return _category_counts[key]
+    version = _catalog_version
+    sql = "SELECT COUNT(*) as cnt FROM products WHERE category_id = ?"
+    if active_only:
+        sql += " AND active = 1"
+    async with get_read_db() as db:
+        cur = await db.execute(sql, (cat_id,))
+        row = await cur.fetchone()
+    count = row["cnt"] if row else 0
+    if version == _catalog_version:
+        _category_counts[key] = count
+    return count
 
 
 # ======================== PRODUCTS ========================
@@ -477,20 +718,75 @@ async def get_product_count_in_category(cat_id: int) -> int:
 async def get_products_by_category(
     cat_id: int, limit: int = 100, offset: int = 0
 ) -> list:
-    db = await get_db()
-    cur = await db.execute(
-        """SELECT * FROM products
-           WHERE category_id = ? AND active = 1
-           ORDER BY id LIMIT ? OFFSET ?""",
-        (cat_id, limit, offset),
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            """SELECT * FROM products
+               WHERE category_id = ? AND active = 1
+               ORDER BY id LIMIT ? OFFSET ?""",
+            (cat_id, limit, offset),
+        )
+        return _rows_to_list(await cur.fetchall())
+
+
+_PRODUCT_CURSOR_RE = re.compile(r"^([np])(\d+)$")
+
+
+async def get_products_page(
+    cat_id: int, cursor: Optional[str] = None, limit: int = 20
+) -> Page:
+    """
+    One page of a category's active products in id order.
+
+    Keyset on the primary key: reads limit + 1 rows through the
+    category index, so page 500 costs the same as page 1. Cursors are
+    "n<id>" (page after id) and "p<id>" (page before id).
+    """
+    m = _PRODUCT_CURSOR_RE.match(cursor or "")
+    backwards = bool(m) and m.group(1) == "p"
+    anchor = int(m.group(2)) if m else 0
+    order = "DESC" if backwards else "ASC"
+    async with get_read_db() as db:
+        cur = await db.execute(
+            f"""SELECT * FROM products
+                WHERE category_id = ? AND active = 1 AND id {'<' if backwards else '>'} ?
+                ORDER BY id {order} LIMIT ?""",
+            (cat_id, anchor, limit + 1),
+        )
+        rows = _rows_to_list(await cur.fetchall())
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = m is not None, more
+
+    page: Page = {"items": rows, "prev": None, "next": None}
+    if rows and has_prev:
+        page["prev"] = f"p{rows[0]['id']}"
+    if rows and has_next:
+        page["next"] = f"n{rows[-1]['id']}"
+    return page
+
+
+async def get_products_by_ids(prod_ids: Iterable[int]) -> dict[int, dict]:
+    """Fetch several products in one query. Returns {product_id: product}."""
+    ids = list(dict.fromkeys(prod_ids))
+    if not ids:
+        return {}
+    placeholders = ", ".join("?" * len(ids))
+    async with get_read_db() as db:
+        cur = await db.execute(
+            f"SELECT * FROM products WHERE id IN ({placeholders})", ids,
+        )
+        return {r["id"]: dict(r) for r in await cur.fetchall()}
 
 
 async def get_product(prod_id: int) -> Optional[dict]:
-    db = await get_db()
-    cur = await db.execute("SELECT * FROM products WHERE id = ?", (prod_id,))
-    return _row_to_dict(await cur.fetchone())
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT * FROM products WHERE id = ?", (prod_id,))
+        return _row_to_dict(await cur.fetchone())
 
 
 async def add_product(
@@ -504,6 +800,7 @@ async def add_product(
         (cat_id, name, description, price, stock),
     )
     await db.commit()
+    _bump_catalog_version()
     return cur.lastrowid
 
 
@@ -521,27 +818,64 @@ async def update_product(prod_id: int, **kwargs) -> None:
         f"UPDATE products SET {', '.join(fields)} WHERE id = ?", values
     )
     await db.commit()
+    _bump_catalog_version()
 
 
 async def delete_product(prod_id: int) -> None:
     db = await get_db()
     await db.execute("DELETE FROM products WHERE id = ?", (prod_id,))
     await db.commit()
+    _bump_catalog_version()
 
 
-async def search_products(query: str) -> list:
-    db = await get_db()
-    pattern = f"%{query}%"
-    cur = await db.execute(
-        """SELECT * FROM products
-           WHERE active = 1 AND (name LIKE ? OR description LIKE ?)
-           ORDER BY name LIMIT 50""",
-        (pattern, pattern),
-    )
-    return _rows_to_list(await cur.fetchall())
+# Set by init_db: False when this SQLite build has no FTS5
+_fts_enabled: bool = False
+
+
+def _fts_query(query: str) -> str:
+    """Turn user input into an FTS5 query: every word must match as a prefix."""
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{w}"*' for w in words)
+
+
+async def search_products(query: str, limit: int = 50, offset: int = 0) -> list:
+    """
+    Search active products by name and description.
+
+    Uses the FTS5 index with prefix matching, ranked by bm25 (name hits
+    weigh more than description hits). Falls back to LIKE when FTS5 is
+    not available.
+    """
+    if _fts_enabled:
+        match = _fts_query(query)
+        if not match:
+            return []
+        async with get_read_db() as db:
+            cur = await db.execute(
+                """SELECT p.* FROM products_fts f
+                   JOIN products p ON p.id = f.rowid
+                   WHERE products_fts MATCH ? AND p.active = 1
+                   ORDER BY bm25(products_fts, 10.0, 1.0), p.id
+                   LIMIT ? OFFSET ?""",
+                (match, limit, offset),
+            )
+            return _rows_to_list(await cur.fetchall())
+
+    async with get_read_db() as db:
+        pattern = f"%{query}%"
+        cur = await db.execute(
+            """SELECT * FROM products
+               WHERE active = 1 AND (name LIKE ? OR description LIKE ?)
+               ORDER BY name LIMIT ? OFFSET ?""",
+            (pattern, pattern, limit, offset),
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
-async def decrement_stock(product_id: int, quantity: int, commit: bool = True) -> bool:
+async def decrement_stock(
+    product_id: int, quantity: int, commit: bool = True,
+    conn: Optional[aiosqlite.Connection] = None,
+) -> bool:
     """
     Atomically decrement stock. Returns True if successful, False if insufficient stock.
     
@@ -549,8 +883,10 @@ async def decrement_stock(product_id: int, quantity: int, commit: bool = True) -
         product_id: Product ID to decrement
         quantity: Quantity to decrement
         commit: Whether to commit the transaction (default True)
+        conn: Connection from transaction(); the caller's block commits it
     """
-    db = await get_db()
+    db = conn or await get_db()
+    commit = commit and conn is None
     cur = await db.execute(
         """UPDATE products SET stock = stock - ?
            WHERE id = ? AND stock >= ?
@@ -558,19 +894,23 @@ async def decrement_stock(product_id: int, quantity: int, commit: bool = True) -
         (quantity, product_id, quantity),
     )
     row = await cur.fetchone()
-    if commit:
-        await db.commit()
+    if conn is not None:
+        _catalog_dirty.add(id(conn))  # bumped when transaction() commits
+    else:
+        if commit:
+            await db.commit()
+        _bump_catalog_version()
     return row is not None
 
 
 # ======================== PRODUCT FAQ & MEDIA ========================
 
 async def get_product_faqs(prod_id: int) -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM product_faqs WHERE product_id = ?", (prod_id,)
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM product_faqs WHERE product_id = ?", (prod_id,)
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 async def add_product_faq(prod_id: int, question: str, answer: str) -> int:
@@ -580,6 +920,7 @@ async def add_product_faq(prod_id: int, question: str, answer: str) -> int:
         (prod_id, question, answer),
     )
     await db.commit()
+    _bump_catalog_version()
     return cur.lastrowid
 
 
@@ -587,14 +928,15 @@ async def delete_product_faq(faq_id: int) -> None:
     db = await get_db()
     await db.execute("DELETE FROM product_faqs WHERE id = ?", (faq_id,))
     await db.commit()
+    _bump_catalog_version()
 
 
 async def get_product_media(prod_id: int) -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM product_media WHERE product_id = ?", (prod_id,)
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM product_media WHERE product_id = ?", (prod_id,)
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 async def add_product_media(prod_id: int, media_type: str, file_id: str) -> int:
@@ -604,6 +946,7 @@ async def add_product_media(prod_id: int, media_type: str, file_id: str) -> int:
         (prod_id, media_type, file_id),
     )
     await db.commit()
+    _bump_catalog_version()
     return cur.lastrowid
 
 
@@ -611,158 +954,206 @@ async def delete_product_media(mid: int) -> None:
     db = await get_db()
     await db.execute("DELETE FROM product_media WHERE id = ?", (mid,))
     await db.commit()
+    _bump_catalog_version()
 
 
 # ======================== CART ========================
 
 async def get_cart(user_id: int) -> list:
     """Get cart items with product details."""
-    db = await get_db()
-    cur = await db.execute(
-        """SELECT c.id as cart_id, c.product_id, c.quantity,
-                  p.name, p.price, p.stock, p.image_id
-           FROM cart c JOIN products p ON c.product_id = p.id
-           WHERE c.user_id = ?
-           ORDER BY c.added_at""",
-        (user_id,),
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            """SELECT c.id as cart_id, c.product_id, c.quantity,
+                      p.name, p.price, p.stock, p.image_id
+               FROM cart c JOIN products p ON c.product_id = p.id
+               WHERE c.user_id = ?
+               ORDER BY c.added_at""",
+            (user_id,),
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 async def get_cart_count(user_id: int) -> int:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT COALESCE(SUM(quantity), 0) as cnt FROM cart WHERE user_id = ?",
-        (user_id,),
-    )
-    row = await cur.fetchone()
-    return row["cnt"] if row else 0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT COALESCE(SUM(quantity), 0) as cnt FROM cart WHERE user_id = ?",
+            (user_id,),
+        )
+        row = await cur.fetchone()
+        return row["cnt"] if row else 0
 
 
 async def get_cart_total(user_id: int) -> float:
-    db = await get_db()
-    cur = await db.execute(
-        """SELECT COALESCE(SUM(c.quantity * p.price), 0) as total
-           FROM cart c JOIN products p ON c.product_id = p.id
-           WHERE c.user_id = ?""",
-        (user_id,),
-    )
-    row = await cur.fetchone()
-    return row["total"] if row else 0.0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            """SELECT COALESCE(SUM(c.quantity * p.price), 0) as total
+               FROM cart c JOIN products p ON c.product_id = p.id
+               WHERE c.user_id = ?""",
+            (user_id,),
+        )
+        row = await cur.fetchone()
+        return row["total"] if row else 0.0
 
 
 async def get_cart_item(cart_id: int) -> Optional[dict]:
     """Get a single cart item with product info."""
-    db = await get_db()
-    cur = await db.execute(
-        """SELECT c.id as cart_id, c.product_id, c.quantity,
-                  p.name, p.price, p.stock
-           FROM cart c JOIN products p ON c.product_id = p.id
-           WHERE c.id = ?""",
-        (cart_id,),
-    )
-    return _row_to_dict(await cur.fetchone())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            """SELECT c.id as cart_id, c.product_id, c.quantity,
+                      p.name, p.price, p.stock
+               FROM cart c JOIN products p ON c.product_id = p.id
+               WHERE c.id = ?""",
+            (cart_id,),
+        )
+        return _row_to_dict(await cur.fetchone())
 
 
 async def add_to_cart(user_id: int, product_id: int, quantity: int = 1) -> int:
     """Add product to cart or increment quantity."""
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT id, quantity FROM cart WHERE user_id = ? AND product_id = ?",
-        (user_id, product_id),
-    )
-    existing = await cur.fetchone()
-
-    if existing:
-        new_qty = existing["quantity"] + quantity
-        await db.execute(
-            "UPDATE cart SET quantity = ? WHERE id = ?",
-            (new_qty, existing["id"]),
+    async def op(db: aiosqlite.Connection) -> int:
+        cur = await db.execute(
+            "SELECT id, quantity FROM cart WHERE user_id = ? AND product_id = ?",
+            (user_id, product_id),
         )
-        await db.commit()
-        return existing["id"]
-    else:
+        existing = await cur.fetchone()
+
+        if existing:
+            new_qty = existing["quantity"] + quantity
+            await db.execute(
+                "UPDATE cart SET quantity = ? WHERE id = ?",
+                (new_qty, existing["id"]),
+            )
+            return existing["id"]
         cur = await db.execute(
             "INSERT INTO cart (user_id, product_id, quantity) VALUES (?, ?, ?)",
             (user_id, product_id, quantity),
         )
-        await db.commit()
         return cur.lastrowid
 
+    return await _queue_write(op)
+
 
 async def update_cart_qty(cart_id: int, quantity: int) -> None:
-    db = await get_db()
     if quantity <= 0:
-        await db.execute("DELETE FROM cart WHERE id = ?", (cart_id,))
+        await _queue_execute("DELETE FROM cart WHERE id = ?", (cart_id,))
     else:
-        await db.execute(
+        await _queue_execute(
             "UPDATE cart SET quantity = ? WHERE id = ?", (quantity, cart_id)
         )
-    await db.commit()
 
 
 async def remove_from_cart_by_id(cart_id: int) -> None:
-    db = await get_db()
-    await db.execute("DELETE FROM cart WHERE id = ?", (cart_id,))
-    await db.commit()
+    await _queue_execute("DELETE FROM cart WHERE id = ?", (cart_id,))
 
 
-async def clear_cart(user_id: int) -> None:
-    db = await get_db()
-    await db.execute("DELETE FROM cart WHERE user_id = ?", (user_id,))
-    await db.commit()
+async def clear_cart(
+    user_id: int, conn: Optional[aiosqlite.Connection] = None
+) -> None:
+    if conn is None:
+        await _queue_execute("DELETE FROM cart WHERE user_id = ?", (user_id,))
+        return
+    await conn.execute("DELETE FROM cart WHERE user_id = ?", (user_id,))
 
 
 # ======================== ORDERS ========================
 
 async def create_order(user_id: int, items: list, total: float) -> int:
+    """
+    Create an order with its line items.
+
+    Args:
+        user_id: Buyer
+        items: [{"product_id", "name", "price", "quantity"}, ...]
+        total: Order total before discounts
+    """
     db = await get_db()
     cur = await db.execute(
-        """INSERT INTO orders (user_id, items_json, total)
-           VALUES (?, ?, ?)""",
-        (user_id, json.dumps(items), total),
+        "INSERT INTO orders (user_id, total) VALUES (?, ?)",
+        (user_id, total),
+    )
+    order_id = cur.lastrowid
+    await db.executemany(
+        """INSERT INTO order_items (order_id, product_id, name, unit_price, quantity)
+           VALUES (?, ?, ?, ?, ?)""",
+        [
+            (order_id, i["product_id"], i.get("name", ""), i.get("price", 0), i.get("quantity", 1))
+            for i in items
+        ],
     )
     await db.commit()
-    return cur.lastrowid
+    return order_id
+
+
+async def get_order_items(order_id: int) -> list:
+    """
+    Get an order's line items.
+
+    Returns:
+        [{"product_id", "name", "price", "quantity", "subtotal"}, ...]
+    """
+    async with get_read_db() as db:
+        cur = await db.execute(
+            """SELECT product_id, name, unit_price AS price, quantity,
+                      unit_price * quantity AS subtotal
+               FROM order_items WHERE order_id = ? ORDER BY id""",
+            (order_id,),
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 async def get_order(order_id: int) -> Optional[dict]:
-    db = await get_db()
-    cur = await db.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
-    return _row_to_dict(await cur.fetchone())
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
+        return _row_to_dict(await cur.fetchone())
 
 
 async def get_user_orders(
     user_id: int, limit: int = 10, offset: int = 0
 ) -> list:
-    db = await get_db()
-    cur = await db.execute(
-        """SELECT * FROM orders WHERE user_id = ?
-           ORDER BY created_at DESC LIMIT ? OFFSET ?""",
-        (user_id, limit, offset),
+    async with get_read_db() as db:
+        cur = await db.execute(
+            """SELECT * FROM orders WHERE user_id = ?
+               ORDER BY created_at DESC LIMIT ? OFFSET ?""",
+            (user_id, limit, offset),
+        )
+        return _rows_to_list(await cur.fetchall())
+
+
+async def get_user_orders_page(
+    user_id: int, cursor: Optional[str] = None, limit: int = 10
+) -> Page:
+    """A user's orders newest first, keyset-paginated on (created_at, id)."""
+    return await _keyset_page(
+        "orders", "created_at", "id", "user_id = ?", (user_id,), limit, cursor
     )
-    return _rows_to_list(await cur.fetchall())
 
 
 async def get_user_order_count(user_id: int) -> int:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT COUNT(*) as cnt FROM orders WHERE user_id = ?", (user_id,)
-    )
-    row = await cur.fetchone()
-    return row["cnt"] if row else 0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT COUNT(*) as cnt FROM orders WHERE user_id = ?", (user_id,)
+        )
+        row = await cur.fetchone()
+        return row["cnt"] if row else 0
 
 
 async def get_all_orders(limit: int = 20) -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM orders ORDER BY created_at DESC LIMIT ?", (limit,)
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM orders ORDER BY created_at DESC LIMIT ?", (limit,)
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
-async def update_order(order_id: int, **kwargs) -> None:
-    db = await get_db()
+async def get_orders_page(cursor: Optional[str] = None, limit: int = 20) -> Page:
+    """All orders newest first, keyset-paginated on (created_at, id)."""
+    return await _keyset_page("orders", "created_at", "id", limit=limit, cursor=cursor)
+
+
+async def update_order(
+    order_id: int, conn: Optional[aiosqlite.Connection] = None, **kwargs
+) -> None:
+    db = conn or await get_db()
     fields = []
     values = []
     for k, v in kwargs.items():
@@ -774,31 +1165,37 @@ async def update_order(order_id: int, **kwargs) -> None:
     await db.execute(
         f"UPDATE orders SET {', '.join(fields)} WHERE id = ?", values
     )
-    await db.commit()
+    if conn is None:
+        await db.commit()
 
 
 # ======================== COUPONS ========================
 
 async def validate_coupon(code: str) -> Optional[dict]:
-    db = await get_db()
-    cur = await db.execute(
-        """SELECT * FROM coupons
-           WHERE code = ? AND active = 1
-             AND (max_uses = 0 OR used_count < max_uses)""",
-        (code,),
-    )
-    return _row_to_dict(await cur.fetchone())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            """SELECT * FROM coupons
+               WHERE code = ? AND active = 1
+                 AND (max_uses = 0 OR used_count < max_uses)""",
+            (code,),
+        )
+        return _row_to_dict(await cur.fetchone())
 
 
-async def use_coupon(code: str, commit: bool = True) -> bool:
+async def use_coupon(
+    code: str, commit: bool = True,
+    conn: Optional[aiosqlite.Connection] = None,
+) -> bool:
     """
     Atomically increment coupon usage. Returns True if successful, False if max uses reached.
     
     Args:
         code: Coupon code to use
         commit: Whether to commit the transaction (default True)
+        conn: Connection from transaction(); the caller's block commits it
     """
-    db = await get_db()
+    db = conn or await get_db()
+    commit = commit and conn is None
     cur = await db.execute(
         """UPDATE coupons 
            SET used_count = used_count + 1 
@@ -815,9 +1212,9 @@ async def use_coupon(code: str, commit: bool = True) -> bool:
 
 
 async def get_all_coupons() -> list:
-    db = await get_db()
-    cur = await db.execute("SELECT * FROM coupons ORDER BY created_at DESC")
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT * FROM coupons ORDER BY created_at DESC")
+        return _rows_to_list(await cur.fetchall())
 
 
 async def create_coupon(
@@ -850,25 +1247,25 @@ async def toggle_coupon(code: str) -> None:
 # ======================== PAYMENT METHODS ========================
 
 async def get_payment_methods() -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM payment_methods WHERE active = 1 ORDER BY id"
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM payment_methods WHERE active = 1 ORDER BY id"
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 async def get_all_payment_methods() -> list:
-    db = await get_db()
-    cur = await db.execute("SELECT * FROM payment_methods ORDER BY id")
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT * FROM payment_methods ORDER BY id")
+        return _rows_to_list(await cur.fetchall())
 
 
 async def get_payment_method(method_id: int) -> Optional[dict]:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM payment_methods WHERE id = ?", (method_id,)
-    )
-    return _row_to_dict(await cur.fetchone())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM payment_methods WHERE id = ?", (method_id,)
+        )
+        return _row_to_dict(await cur.fetchone())
 
 
 async def add_payment_method(
@@ -905,30 +1302,30 @@ async def create_payment_proof(
 
 
 async def get_payment_proof(proof_id: int) -> Optional[dict]:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM payment_proofs WHERE id = ?", (proof_id,)
-    )
-    return _row_to_dict(await cur.fetchone())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM payment_proofs WHERE id = ?", (proof_id,)
+        )
+        return _row_to_dict(await cur.fetchone())
 
 
 async def get_pending_proofs() -> list:
-    db = await get_db()
-    cur = await db.execute(
-        """SELECT * FROM payment_proofs
-           WHERE status = 'pending_review'
-           ORDER BY created_at DESC"""
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            """SELECT * FROM payment_proofs
+               WHERE status = 'pending_review'
+               ORDER BY created_at DESC"""
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 async def get_pending_proof_count() -> int:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT COUNT(*) as cnt FROM payment_proofs WHERE status = 'pending_review'"
-    )
-    row = await cur.fetchone()
-    return row["cnt"] if row else 0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT COUNT(*) as cnt FROM payment_proofs WHERE status = 'pending_review'"
+        )
+        row = await cur.fetchone()
+        return row["cnt"] if row else 0
 
 
 async def update_proof(proof_id: int, **kwargs) -> None:
@@ -949,25 +1346,119 @@ async def update_proof(proof_id: int, **kwargs) -> None:
 
 # ======================== SETTINGS ========================
 
-async def get_setting(key: str, default: str = "") -> str:
+# Warm copy of the settings table. Loaded by init_db and updated
+# write-through by set_setting. Triggers bump the 'settings_version' row in
+# stats_counters on every settings write; set_setting remembers the version
+# its own write produced, so only a change made by another process makes
+# the stored version differ and forces a reload (checked at most every
+# SETTINGS_CACHE_TTL seconds).
+_settings_cache: dict[str, str] = {}
+_settings_loaded: bool = False
+_settings_version: int = 0
+_settings_stored_version: Optional[float] = None
+_settings_data_version: Optional[int] = None
+_settings_checked_at: float = 0.0
+
+
+async def _load_settings() -> None:
+    """(Re)load the whole settings table into the in-memory cache."""
+    global _settings_loaded, _settings_version, _settings_stored_version
+    global _settings_data_version, _settings_checked_at
+    db = await get_db()
+    _settings_data_version = await get_backend().data_version(db)
+    # Read before the rows: a write landing in between only costs a reload
+    _settings_stored_version = await _stored_version(db, "settings_version")
+    cur = await db.execute("SELECT key, value FROM settings")
+    fresh = {r["key"]: r["value"] for r in await cur.fetchall()}
+    if not _settings_loaded or fresh != _settings_cache:
+        _settings_cache.clear()
+        _settings_cache.update(fresh)
+        _settings_version += 1
+    _settings_loaded = True
+    _settings_checked_at = time.monotonic()
+
+
+async def _ensure_settings_fresh() -> None:
+    """
+    Load the cache on first use and pick up settings changed by other processes.
+
+    The bot's own writes never trigger a reload: set_setting keeps the cache
+    and the stored settings version in step. On SQLite, PRAGMA data_version
+    is read first only as a cheap filter — it moves on any commit from
+    another connection, including this process's group-commit writer and
+    transaction() connections, so a change there just means the stored
+    version is worth comparing.
+    """
+    global _settings_checked_at, _settings_data_version
+    if not _settings_loaded:
+        await _load_settings()
+        return
+    if SETTINGS_CACHE_TTL <= 0:
+        return
+    now = time.monotonic()
+    if now - _settings_checked_at < SETTINGS_CACHE_TTL:
+        return
+    _settings_checked_at = now
     db = await get_db()
-    cur = await db.execute(
-        "SELECT value FROM settings WHERE key = ?", (key,),
-    )
-    row = await cur.fetchone()
-    return row["value"] if row else default
+    data_version = await get_backend().data_version(db)
+    if data_version is not None and data_version == _settings_data_version:
+        return
+    _settings_data_version = data_version
+    stored = await _stored_version(db, "settings_version")
+    if stored is None or stored != _settings_stored_version:
+        await _load_settings()
+
+
+def get_settings_version() -> int:
+    """Counter bumped on every settings change; use it to invalidate derived caches."""
+    return _settings_version
+
+
+async def get_setting(key: str, default: str = "") -> str:
+    await _ensure_settings_fresh()
+    return _settings_cache.get(key, default)
+
+
+async def get_settings(
+    keys: Union[Iterable[str], Mapping[str, str]], default: str = ""
+) -> dict[str, str]:
+    """
+    Fetch several settings in one call.
+
+    Args:
+        keys: Setting keys, or a {key: default} mapping for per-key defaults
+        default: Fallback for keys given as a plain iterable
+
+    Returns:
+        {key: value} for every requested key
+    """
+    await _ensure_settings_fresh()
+    if isinstance(keys, Mapping):
+        return {k: _settings_cache.get(k, d) for k, d in keys.items()}
+    return {k: _settings_cache.get(k, default) for k in keys}
 
 
 async def set_setting(key: str, value: str) -> None:
+    global _settings_version, _settings_stored_version
+    await _ensure_settings_fresh()
     # Get old value for logging
-    old_value = await get_setting(key, None)
-    
-    db = await get_db()
-    await db.execute(
-        "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-        (key, value),
-    )
-    await db.commit()
+    old_value = _settings_cache.get(key)
+
+    async def op(db: aiosqlite.Connection) -> Optional[float]:
+        before = await _stored_version(db, "settings_version")
+        await db.execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+            (key, value),
+        )
+        return before
+
+    before = await _queue_write(op)
+    _settings_cache[key] = value
+    _settings_version += 1
+    # Our write bumped the stored version by one. If it had already moved
+    # past what the cache reflects, leave the mismatch for the next check.
+    if before is not None and before == _settings_stored_version:
+        _settings_stored_version = before + 1
     
     # Log the setting update with special attention to global image
     from utils.activity_logger import log_db_action
@@ -979,35 +1470,65 @@ async def set_setting(key: str, value: str) -> None:
 
 
 async def get_all_settings() -> list:
-    db = await get_db()
-    cur = await db.execute("SELECT * FROM settings ORDER BY key")
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT * FROM settings ORDER BY key")
+        return _rows_to_list(await cur.fetchall())
 
 
 # ======================== FORCE JOIN ========================
 
+# Checked on every update by the membership middleware, so the list is kept
+# in memory. It is reloaded after add/delete_force_join_channel, and when
+# the stored 'force_join_version' shows another worker changed it (checked
+# at most every CATALOG_CACHE_TTL seconds).
+_force_join_channels: Optional[list] = None
+_force_join_stored_version: Optional[float] = None
+_force_join_checked_at: float = 0.0
+
+
 async def get_force_join_channels() -> list:
-    db = await get_db()
-    cur = await db.execute("SELECT * FROM force_join_channels ORDER BY id")
-    return _rows_to_list(await cur.fetchall())
+    global _force_join_channels, _force_join_stored_version, _force_join_checked_at
+    now = time.monotonic()
+    if (
+        _force_join_channels is not None
+        and CATALOG_CACHE_TTL > 0
+        and now - _force_join_checked_at >= CATALOG_CACHE_TTL
+    ):
+        _force_join_checked_at = now
+        async with get_read_db() as db:
+            stored = await _stored_version(db, "force_join_version")
+        if stored is None or stored != _force_join_stored_version:
+            _force_join_channels = None
+    if _force_join_channels is None:
+        async with get_read_db() as db:
+            stored = await _stored_version(db, "force_join_version")
+            cur = await db.execute("SELECT * FROM force_join_channels ORDER BY id")
+            _force_join_channels = _rows_to_list(await cur.fetchall())
+        _force_join_stored_version = stored
+        _force_join_checked_at = now
+    return list(_force_join_channels)
 
 
 async def add_force_join_channel(
     channel_id: str, name: str, invite_link: str
 ) -> int:
+    global _force_join_channels
     db = await get_db()
     cur = await db.execute(
         "INSERT INTO force_join_channels (channel_id, name, invite_link) VALUES (?, ?, ?)",
         (channel_id, name, invite_link),
     )
     await db.commit()
+    _force_join_channels = None
     return cur.lastrowid
 
 
 async def delete_force_join_channel(fj_id: int) -> None:
+    global _force_join_channels
     db = await get_db()
     await db.execute("DELETE FROM force_join_channels WHERE id = ?", (fj_id,))
     await db.commit()
+    _force_join_channels = None
 
 
 # ======================== TICKETS ========================
@@ -1025,44 +1546,49 @@ async def create_ticket(
 
 
 async def get_ticket(ticket_id: int) -> Optional[dict]:
-    db = await get_db()
-    cur = await db.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,))
-    return _row_to_dict(await cur.fetchone())
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,))
+        return _row_to_dict(await cur.fetchone())
 
 
 async def get_user_tickets(user_id: int, limit: int = 20) -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM tickets WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
-        (user_id, limit),
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM tickets WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, limit),
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 async def get_open_tickets(limit: int = 20) -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM tickets WHERE status = 'open' ORDER BY created_at DESC LIMIT ?",
-        (limit,),
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM tickets WHERE status = 'open' ORDER BY created_at DESC LIMIT ?",
+            (limit,),
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 async def get_all_tickets(limit: int = 30) -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM tickets ORDER BY created_at DESC LIMIT ?", (limit,),
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM tickets ORDER BY created_at DESC LIMIT ?", (limit,),
+        )
+        return _rows_to_list(await cur.fetchall())
+
+
+async def get_tickets_page(cursor: Optional[str] = None, limit: int = 20) -> Page:
+    """All tickets newest first, keyset-paginated on (created_at, id)."""
+    return await _keyset_page("tickets", "created_at", "id", limit=limit, cursor=cursor)
 
 
 async def get_open_ticket_count() -> int:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT COUNT(*) as cnt FROM tickets WHERE status = 'open'",
-    )
-    row = await cur.fetchone()
-    return row["cnt"] if row else 0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT COUNT(*) as cnt FROM tickets WHERE status = 'open'",
+        )
+        row = await cur.fetchone()
+        return row["cnt"] if row else 0
 
 
 async def close_ticket(ticket_id: int) -> None:
@@ -1094,12 +1620,12 @@ async def add_ticket_reply(
 
 
 async def get_ticket_replies(ticket_id: int) -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM ticket_replies WHERE ticket_id = ? ORDER BY created_at",
-        (ticket_id,),
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM ticket_replies WHERE ticket_id = ? ORDER BY created_at",
+            (ticket_id,),
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 # ======================== ACTION LOGS ========================
@@ -1107,11 +1633,111 @@ async def get_ticket_replies(ticket_id: int) -> list:
 async def add_action_log(
     action: str, user_id: int = 0, details: str = ""
 ) -> None:
-    db = await get_db()
-    await db.execute(
+    await _queue_execute(
         "INSERT INTO action_logs (action, user_id, details) VALUES (?, ?, ?)",
         (action, user_id, details),
     )
+
+
+# ======================== BROADCASTS ========================
+
+async def get_broadcast_audience_count() -> int:
+    """Users a new broadcast would reach (not banned, bot not blocked)."""
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT COUNT(*) FROM users WHERE banned = 0 AND blocked = 0"
+        )
+        row = await cur.fetchone()
+        return row[0] if row else 0
+
+
+async def create_broadcast(text: str, admin_chat_id: int, admin_message_id: int) -> int:
+    """Create a broadcast and snapshot its recipients. Returns the broadcast ID."""
+    async with transaction() as conn:
+        cur = await conn.execute(
+            """INSERT INTO broadcasts (text, admin_chat_id, admin_message_id)
+               VALUES (?, ?, ?)""",
+            (text, admin_chat_id, admin_message_id),
+        )
+        broadcast_id = cur.lastrowid
+        cur = await conn.execute(
+            """INSERT INTO broadcast_recipients (broadcast_id, user_id)
+               SELECT ?, user_id FROM users WHERE banned = 0 AND blocked = 0""",
+            (broadcast_id,),
+        )
+        await conn.execute(
+            "UPDATE broadcasts SET total = ? WHERE id = ?", (cur.rowcount, broadcast_id)
+        )
+    return broadcast_id
+
+
+async def get_broadcast(broadcast_id: int) -> Optional[dict]:
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT * FROM broadcasts WHERE id = ?", (broadcast_id,))
+        return _row_to_dict(await cur.fetchone())
+
+
+async def get_running_broadcasts() -> list:
+    """Broadcasts interrupted by a restart (or still running)."""
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT * FROM broadcasts WHERE status = 'running' ORDER BY id")
+        return _rows_to_list(await cur.fetchall())
+
+
+async def get_broadcast_pending(
+    broadcast_id: int, after_user_id: int = 0, limit: int = 500
+) -> list[int]:
+    """Next chunk of recipients still to send to, by user_id (keyset)."""
+    async with get_read_db() as db:
+        cur = await db.execute(
+            """SELECT user_id FROM broadcast_recipients
+               WHERE broadcast_id = ? AND user_id > ? AND status = 'pending'
+               ORDER BY user_id LIMIT ?""",
+            (broadcast_id, after_user_id, limit),
+        )
+        return [row[0] for row in await cur.fetchall()]
+
+
+async def record_broadcast_results(
+    broadcast_id: int, results: Iterable[tuple[int, str]]
+) -> None:
+    """
+    Persist a batch of (user_id, status) outcomes in one transaction.
+
+    status is 'sent', 'failed' or 'blocked'; blocked users are also
+    flagged in users so later broadcasts skip them.
+    """
+    results = list(results)
+    if not results:
+        return
+    counts = {"sent": 0, "failed": 0, "blocked": 0}
+    for _, status in results:
+        counts[status] += 1
+    async with transaction() as conn:
+        await conn.executemany(
+            """UPDATE broadcast_recipients SET status = ?
+               WHERE broadcast_id = ? AND user_id = ?""",
+            [(status, broadcast_id, uid) for uid, status in results],
+        )
+        await conn.execute(
+            """UPDATE broadcasts
+               SET sent = sent + ?, failed = failed + ?, blocked = blocked + ?
+               WHERE id = ?""",
+            (counts["sent"], counts["failed"], counts["blocked"], broadcast_id),
+        )
+        blocked = [(uid,) for uid, status in results if status == "blocked"]
+        if blocked:
+            await conn.executemany("UPDATE users SET blocked = 1 WHERE user_id = ?", blocked)
+
+
+async def finish_broadcast(broadcast_id: int, status: str = "done") -> None:
+    """Mark a broadcast done or cancelled."""
+    db = await get_db()
+    await db.execute(
+        """UPDATE broadcasts SET status = ?, finished_at = ?
+           WHERE id = ? AND status = 'running'""",
+        (status, datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"), broadcast_id),
+    )
     await db.commit()
 
 
@@ -1128,28 +1754,37 @@ async def create_topup(user_id: int, amount: float, method_id: int) -> int:
 
 
 async def get_topup(topup_id: int) -> Optional[dict]:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM wallet_topups WHERE id = ?", (topup_id,)
-    )
-    return _row_to_dict(await cur.fetchone())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM wallet_topups WHERE id = ?", (topup_id,)
+        )
+        return _row_to_dict(await cur.fetchone())
 
 
 async def get_pending_topups() -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM wallet_topups WHERE status = 'pending' ORDER BY created_at DESC"
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM wallet_topups WHERE status = 'pending' ORDER BY created_at DESC"
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 async def get_user_topups(user_id: int, limit: int = 10) -> list:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM wallet_topups WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
-        (user_id, limit),
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT * FROM wallet_topups WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, limit),
+        )
+        return _rows_to_list(await cur.fetchall())
+
+
+async def get_user_topups_page(
+    user_id: int, cursor: Optional[str] = None, limit: int = 10
+) -> Page:
+    """A user's top-ups newest first, keyset-paginated on (created_at, id)."""
+    return await _keyset_page(
+        "wallet_topups", "created_at", "id", "user_id = ?", (user_id,), limit, cursor
     )
-    return _rows_to_list(await cur.fetchall())
 
 
 async def update_topup(topup_id: int, **kwargs) -> None:
@@ -1169,87 +1804,73 @@ async def update_topup(topup_id: int, **kwargs) -> None:
 
 
 async def get_pending_topup_count() -> int:
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT COUNT(*) as cnt FROM wallet_topups WHERE status = 'pending'"
-    )
-    row = await cur.fetchone()
-    return row["cnt"] if row else 0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT COUNT(*) as cnt FROM wallet_topups WHERE status = 'pending'"
+        )
+        row = await cur.fetchone()
+        return row["cnt"] if row else 0
 
 
 # ======================== DASHBOARD STATS ========================
 
-async def get_dashboard_stats() -> dict:
-    db = await get_db()
-
-    users = await db.execute("SELECT COUNT(*) as c FROM users")
-    users_row = await users.fetchone()
-
-    cats = await db.execute("SELECT COUNT(*) as c FROM categories")
-    cats_row = await cats.fetchone()
-
-    prods = await db.execute("SELECT COUNT(*) as c FROM products")
-    prods_row = await prods.fetchone()
-
-    orders = await db.execute("SELECT COUNT(*) as c FROM orders")
-    orders_row = await orders.fetchone()
+async def rebuild_stats_counters() -> dict:
+    """
+    Recompute every dashboard counter from the base tables.
 
-    revenue = await db.execute(
-        "SELECT COALESCE(SUM(total), 0) as r FROM orders WHERE payment_status = 'paid'",
-    )
-    rev_row = await revenue.fetchone()
+    Runs in one transaction, so triggers can't interleave with the rebuild.
+    Use it to repair drift (e.g. after editing the DB by hand).
 
-    proofs = await db.execute(
-        "SELECT COUNT(*) as c FROM payment_proofs WHERE status = 'pending_review'",
-    )
-    proofs_row = await proofs.fetchone()
+    Returns:
+        The rebuilt counters, same shape as get_dashboard_stats()
+    """
+    async with transaction() as conn:
+        for name, sql in STATS_COUNTER_QUERIES.items():
+            await conn.execute(
+                f"INSERT OR REPLACE INTO stats_counters (name, value) VALUES (?, ({sql}))",
+                (name,),
+            )
+    logger.info("Dashboard stats counters rebuilt")
+    return await get_dashboard_stats()
 
-    tickets = await db.execute(
-        "SELECT COUNT(*) as c FROM tickets WHERE status = 'open'",
-    )
-    tickets_row = await tickets.fetchone()
 
-    topups = await db.execute(
-        "SELECT COUNT(*) as c FROM wallet_topups WHERE status = 'pending'",
-    )
-    topups_row = await topups.fetchone()
+async def get_dashboard_stats() -> dict:
+    async with get_read_db() as db:
+        cur = await db.execute("SELECT name, value FROM stats_counters")
+        rows = await cur.fetchall()
 
-    return {
-        "users": users_row["c"],
-        "categories": cats_row["c"],
-        "products": prods_row["c"],
-        "orders": orders_row["c"],
-        "revenue": rev_row["r"],
-        "pending_proofs": proofs_row["c"],
-        "open_tickets": tickets_row["c"],
-        "pending_topups": topups_row["c"],
-    }
+    counters = {r["name"]: r["value"] for r in rows}
+    stats = {name: int(counters.get(name, 0)) for name in STATS_COUNTER_QUERIES}
+    revenue = counters.get("revenue", 0)
+    stats["revenue"] = round(revenue, 2)
+    return stats
 
 
 # ======================== POINTS SYSTEM ========================
 
 async def get_user_points(user_id: int) -> int:
     """Get user's current points balance."""
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT points FROM users WHERE user_id = ?", (user_id,)
-    )
-    row = await cur.fetchone()
-    return row["points"] if row else 0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT points FROM users WHERE user_id = ?", (user_id,)
+        )
+        row = await cur.fetchone()
+        return row["points"] if row else 0
 
 
 async def add_points(user_id: int, amount: int, reason: str) -> None:
     """Add points to user and log the transaction."""
-    db = await get_db()
-    await db.execute(
-        "UPDATE users SET points = points + ? WHERE user_id = ?",
-        (amount, user_id),
-    )
-    await db.execute(
-        "INSERT INTO points_history (user_id, amount, reason) VALUES (?, ?, ?)",
-        (user_id, amount, reason),
-    )
-    await db.commit()
+    async def op(db: aiosqlite.Connection) -> None:
+        await db.execute(
+            "UPDATE users SET points = points + ? WHERE user_id = ?",
+            (amount, user_id),
+        )
+        await db.execute(
+            "INSERT INTO points_history (user_id, amount, reason) VALUES (?, ?, ?)",
+            (user_id, amount, reason),
+        )
+
+    await _queue_write(op)
 
 
 async def deduct_points(user_id: int, amount: int) -> bool:
@@ -1275,13 +1896,151 @@ async def deduct_points(user_id: int, amount: int) -> bool:
 
 
 async def get_points_history(user_id: int, limit: int = 20) -> list:
-    """Get user's points transaction history."""
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT * FROM points_history WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
-        (user_id, limit),
-    )
-    return _rows_to_list(await cur.fetchall())
+    """
+    Get user's points transaction history, newest first.
+
+    Served from the hot table; archived rows are pulled in only when the
+    hot table has fewer than ``limit`` entries for this user.
+    """
+    async with get_read_db() as db:
+        cur = await db.execute(
+            """SELECT * FROM points_history WHERE user_id = ?
+               ORDER BY created_at DESC, id DESC LIMIT ?""",
+            (user_id, limit),
+        )
+        rows = _rows_to_list(await cur.fetchall())
+        if len(rows) >= limit or not _archive_ready or not await _attach_archive(db):
+            return rows
+
+        # UNION (not ALL) also hides rows caught between copy and delete
+        cur = await db.execute(
+            """SELECT * FROM main.points_history WHERE user_id = ?
+               UNION
+               SELECT * FROM archive.points_history WHERE user_id = ?
+               ORDER BY created_at DESC, id DESC LIMIT ?""",
+            (user_id, user_id, limit),
+        )
+        return _rows_to_list(await cur.fetchall())
+
+
+# ======================== ARCHIVE ========================
+
+# Append-only tables that move to cold storage once they age out. The
+# archive keeps the original ids, so re-running a batch is idempotent.
+ARCHIVED_TABLES = ("action_logs", "points_history")
+
+ARCHIVE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS archive.action_logs (
+        id          INTEGER PRIMARY KEY,
+        action      TEXT NOT NULL,
+        user_id     INTEGER DEFAULT 0,
+        details     TEXT DEFAULT '',
+        created_at  TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS archive.points_history (
+        id          INTEGER PRIMARY KEY,
+        user_id     INTEGER NOT NULL,
+        amount      INTEGER NOT NULL,
+        reason      TEXT NOT NULL,
+        created_at  TEXT
+    );
+
+    CREATE INDEX IF NOT EXISTS archive.idx_points_history_user
+        ON points_history(user_id, created_at);
+"""
+
+# Set by init_db / archive_old_rows once the archive file exists
+_archive_ready: bool = False
+
+
+async def _attach_archive(db: aiosqlite.Connection) -> bool:
+    """ATTACH the archive file to ``db`` as ``archive`` if it isn't already."""
+    try:
+        cur = await db.execute(
+            "SELECT 1 FROM pragma_database_list WHERE name = 'archive'"
+        )
+        if await cur.fetchone() is None:
+            await db.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DB_PATH,))
+        return True
+    except aiosqlite.OperationalError as e:
+        # e.g. the shared writer is mid-transaction — serve hot rows only
+        logger.warning("Could not attach archive DB: %s", e)
+        return False
+
+
+async def archive_old_rows(
+    days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE
+) -> dict[str, int]:
+    """
+    Move action_logs / points_history rows older than ``days`` into the archive DB.
+
+    Works in chunks of ``batch_size`` rows on a private connection: each
+    chunk is copied into the archive and committed, then deleted from the
+    hot table in a short write transaction, so checkout traffic never
+    waits long for the write lock. A crash between the two steps leaves a
+    duplicate, never a loss — the next run skips it on copy and deletes it.
+
+    Returns:
+        Rows moved per table
+    """
+    global _archive_ready
+    cutoff = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    moved = {table: 0 for table in ARCHIVED_TABLES}
+    if not get_backend().supports_archive:
+        logger.info("Archiving skipped: not supported by the %s backend", get_backend().name)
+        return moved
+
+    await get_db()  # make sure the hot file exists and is in WAL mode
+    conn = await get_backend().open_autocommit()
+    try:
+        await conn.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DB_PATH,))
+        await conn.execute("PRAGMA archive.journal_mode=WAL")
+        await conn.executescript(ARCHIVE_SCHEMA)
+        _archive_ready = True
+
+        for table in ARCHIVED_TABLES:
+            while True:
+                cur = await conn.execute(
+                    f"""SELECT MAX(id) FROM (
+                            SELECT id FROM main.{table} WHERE created_at < ?
+                            ORDER BY id LIMIT ?
+                        )""",
+                    (cutoff, batch_size),
+                )
+                max_id = (await cur.fetchone())[0]
+                if max_id is None:
+                    break
+
+                await conn.execute("BEGIN")
+                await conn.execute(
+                    f"""INSERT OR IGNORE INTO archive.{table}
+                        SELECT * FROM main.{table} WHERE created_at < ? AND id <= ?""",
+                    (cutoff, max_id),
+                )
+                await conn.commit()
+
+                await conn.execute("BEGIN IMMEDIATE")
+                cur = await conn.execute(
+                    f"""DELETE FROM main.{table}
+                        WHERE created_at < ? AND id <= ?
+                          AND id IN (SELECT id FROM archive.{table})""",
+                    (cutoff, max_id),
+                )
+                moved[table] += cur.rowcount
+                await conn.commit()
+
+                await asyncio.sleep(0.05)  # let queued writes in between chunks
+    except Exception:
+        if conn.in_transaction:
+            await conn.rollback()
+        raise
+    finally:
+        await conn.close()
+
+    if any(moved.values()):
+        logger.info("Archived rows older than %d days: %s", days, moved)
+    return moved
 
 
 # ======================== DAILY SPIN ========================
@@ -1289,14 +2048,14 @@ async def get_points_history(user_id: int, limit: int = 20) -> list:
 async def can_spin(user_id: int) -> bool:
     """Check if user can spin (24 hours since last spin)."""
     from datetime import datetime, timedelta
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT last_spin FROM users WHERE user_id = ?", (user_id,)
-    )
-    row = await cur.fetchone()
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT last_spin FROM users WHERE user_id = ?", (user_id,)
+        )
+        row = await cur.fetchone()
     if not row or not row["last_spin"]:
         return True
-    
+
     try:
         last_spin = datetime.fromisoformat(row["last_spin"])
         now = datetime.utcnow()
@@ -1308,22 +2067,22 @@ async def can_spin(user_id: int) -> bool:
 async def get_next_spin_time(user_id: int) -> Optional[str]:
     """Get time remaining until next spin. Returns None if can spin now."""
     from datetime import datetime, timedelta
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT last_spin FROM users WHERE user_id = ?", (user_id,)
-    )
-    row = await cur.fetchone()
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT last_spin FROM users WHERE user_id = ?", (user_id,)
+        )
+        row = await cur.fetchone()
     if not row or not row["last_spin"]:
         return None
-    
+
     try:
         last_spin = datetime.fromisoformat(row["last_spin"])
         next_spin = last_spin + timedelta(hours=24)
         now = datetime.utcnow()
-        
+
         if now >= next_spin:
             return None
-        
+
         diff = next_spin - now
         hours = int(diff.total_seconds() // 3600)
         minutes = int((diff.total_seconds() % 3600) // 60)
@@ -1367,19 +2126,18 @@ async def create_referral(referrer_id: int, referred_id: int) -> bool:
 
 async def get_referral_stats(user_id: int) -> dict:
     """Get referral statistics for a user."""
-    db = await get_db()
-    
-    # Total referrals
-    cur = await db.execute(
-        "SELECT COUNT(*) as cnt FROM referrals WHERE referrer_id = ?",
-        (user_id,),
-    )
-    row = await cur.fetchone()
+    async with get_read_db() as db:
+        # Total referrals
+        cur = await db.execute(
+            "SELECT COUNT(*) as cnt FROM referrals WHERE referrer_id = ?",
+            (user_id,),
+        )
+        row = await cur.fetchone()
     total = row["cnt"] if row else 0
-    
+
     # Points earned from referrals (1000 per referral)
     points_earned = total * 1000
-    
+
     return {
         "total_referrals": total,
         "points_earned": points_earned,
@@ -1389,39 +2147,39 @@ async def get_referral_stats(user_id: int) -> dict:
 
 async def get_referral_history(user_id: int, limit: int = 20) -> list:
     """Get list of users referred by this user."""
-    db = await get_db()
-    cur = await db.execute(
-        """SELECT r.*, u.full_name, u.username, u.joined_at
-           FROM referrals r
-           JOIN users u ON r.referred_id = u.user_id
-           WHERE r.referrer_id = ?
-           ORDER BY r.created_at DESC LIMIT ?""",
-        (user_id, limit),
-    )
-    return _rows_to_list(await cur.fetchall())
+    async with get_read_db() as db:
+        cur = await db.execute(
+            """SELECT r.*, u.full_name, u.username, u.joined_at
+               FROM referrals r
+               JOIN users u ON r.referred_id = u.user_id
+               WHERE r.referrer_id = ?
+               ORDER BY r.created_at DESC LIMIT ?""",
+            (user_id, limit),
+        )
+        return _rows_to_list(await cur.fetchall())
 
 
 async def get_referrer(user_id: int) -> Optional[int]:
     """Get the user who referred this user."""
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT referrer_id FROM referrals WHERE referred_id = ?",
-        (user_id,),
-    )
-    row = await cur.fetchone()
-    return row["referrer_id"] if row else None
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT referrer_id FROM referrals WHERE referred_id = ?",
+            (user_id,),
+        )
+        row = await cur.fetchone()
+        return row["referrer_id"] if row else None
 
 
 # ======================== MULTI-CURRENCY ========================
 
 async def get_user_currency(user_id: int) -> str:
     """Get user's selected currency (default: PKR)."""
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT currency FROM users WHERE user_id = ?", (user_id,)
-    )
-    row = await cur.fetchone()
-    return row["currency"] if row else "PKR"
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT currency FROM users WHERE user_id = ?", (user_id,)
+        )
+        row = await cur.fetchone()
+        return row["currency"] if row else "PKR"
 
 
 async def set_user_currency(user_id: int, currency_code: str) -> None:
@@ -1436,13 +2194,13 @@ async def set_user_currency(user_id: int, currency_code: str) -> None:
 
 async def get_currency_rate(currency: str) -> float:
     """Get exchange rate for currency vs PKR. Returns 1.0 if not found."""
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT rate_vs_pkr FROM currency_rates WHERE currency = ?",
-        (currency,),
-    )
-    row = await cur.fetchone()
-    return row["rate_vs_pkr"] if row else 1.0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT rate_vs_pkr FROM currency_rates WHERE currency = ?",
+            (currency,),
+        )
+        row = await cur.fetchone()
+        return row["rate_vs_pkr"] if row else 1.0
 
 
 async def update_currency_rate(currency: str, rate_vs_pkr: float) -> None:
@@ -1460,49 +2218,49 @@ async def update_currency_rate(currency: str, rate_vs_pkr: float) -> None:
 
 async def get_user_stats(user_id: int) -> dict:
     """Get comprehensive user statistics for welcome screen."""
-    db = await get_db()
+    async with get_read_db() as db:
     
-    # Get user data
-    cur = await db.execute(
-        "SELECT * FROM users WHERE user_id = ?", (user_id,)
-    )
-    user = await cur.fetchone()
-    if not user:
-        return {}
+        # Get user data
+        cur = await db.execute(
+            "SELECT * FROM users WHERE user_id = ?", (user_id,)
+        )
+        user = await cur.fetchone()
+        if not user:
+            return {}
     
-    # Get order counts
-    cur = await db.execute(
-        """SELECT 
-            COUNT(*) as total,
-            SUM(CASE WHEN status IN ('completed', 'delivered') THEN 1 ELSE 0 END) as completed,
-            SUM(CASE WHEN status IN ('pending', 'confirmed', 'processing', 'shipped') THEN 1 ELSE 0 END) as pending
-           FROM orders WHERE user_id = ?""",
-        (user_id,),
-    )
-    orders = await cur.fetchone()
+        # Get order counts
+        cur = await db.execute(
+            """SELECT 
+                COUNT(*) as total,
+                SUM(CASE WHEN status IN ('completed', 'delivered') THEN 1 ELSE 0 END) as completed,
+                SUM(CASE WHEN status IN ('pending', 'confirmed', 'processing', 'shipped') THEN 1 ELSE 0 END) as pending
+               FROM orders WHERE user_id = ?""",
+            (user_id,),
+        )
+        orders = await cur.fetchone()
     
-    # Get referral count
-    cur = await db.execute(
-        "SELECT COUNT(*) as cnt FROM referrals WHERE referrer_id = ?",
-        (user_id,),
-    )
-    ref_row = await cur.fetchone()
+        # Get referral count
+        cur = await db.execute(
+            "SELECT COUNT(*) as cnt FROM referrals WHERE referrer_id = ?",
+            (user_id,),
+        )
+        ref_row = await cur.fetchone()
     
-    return {
-        "user_id": user["user_id"],
-        "full_name": user["full_name"],
-        "username": user["username"],
-        "balance": user["balance"],
-        "points": user["points"],
-        "currency": user["currency"],
-        "joined_at": user["joined_at"],
-        "total_spent": user["total_spent"],
-        "total_deposited": user["total_deposited"],
-        "total_orders": orders["total"] if orders else 0,
-        "completed_orders": orders["completed"] if orders else 0,
-        "pending_orders": orders["pending"] if orders else 0,
-        "referral_count": ref_row["cnt"] if ref_row else 0,
-    }
+        return {
+            "user_id": user["user_id"],
+            "full_name": user["full_name"],
+            "username": user["username"],
+            "balance": user["balance"],
+            "points": user["points"],
+            "currency": user["currency"],
+            "joined_at": user["joined_at"],
+            "total_spent": user["total_spent"],
+            "total_deposited": user["total_deposited"],
+            "total_orders": orders["total"] if orders else 0,
+            "completed_orders": orders["completed"] if orders else 0,
+            "pending_orders": orders["pending"] if orders else 0,
+            "referral_count": ref_row["cnt"] if ref_row else 0,
+        }
 
 
 
@@ -1531,81 +2289,104 @@ async def update_user_deposited(user_id: int, amount: float) -> None:
 
 async def get_user_total_spent(user_id: int) -> float:
     """Get total amount spent by user on completed orders."""
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT COALESCE(SUM(total), 0) as total FROM orders WHERE user_id = ? AND status = 'completed'",
-        (user_id,)
-    )
-    row = await cur.fetchone()
-    return row["total"] if row else 0.0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT COALESCE(SUM(total), 0) as total FROM orders WHERE user_id = ? AND status = 'completed'",
+            (user_id,)
+        )
+        row = await cur.fetchone()
+        return row["total"] if row else 0.0
 
 
 async def get_user_total_deposited(user_id: int) -> float:
     """Get total amount deposited by user via approved topups."""
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT COALESCE(SUM(amount), 0) as total FROM wallet_topups WHERE user_id = ? AND status = 'approved'",
-        (user_id,)
-    )
-    row = await cur.fetchone()
-    return row["total"] if row else 0.0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT COALESCE(SUM(amount), 0) as total FROM wallet_topups WHERE user_id = ? AND status = 'approved'",
+            (user_id,)
+        )
+        row = await cur.fetchone()
+        return row["total"] if row else 0.0
 
 
-async def get_user_join_date(user_id: int) -> str:
-    """Get user join date formatted as 'Jan 2026'."""
-    from datetime import datetime
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT joined_at FROM users WHERE user_id = ?",
-        (user_id,)
-    )
-    row = await cur.fetchone()
-    if not row or not row["joined_at"]:
+def _format_join_date(joined_at: Optional[str]) -> str:
+    """Format a users.joined_at value as 'Jan 2026'."""
+    if not joined_at:
         return "Unknown"
-    
     try:
-        dt = datetime.fromisoformat(row["joined_at"])
-        return dt.strftime("%b %Y")
+        return datetime.fromisoformat(joined_at).strftime("%b %Y")
     except Exception:
         return "Unknown"
 
 
+async def get_user_join_date(user_id: int) -> str:
+    """Get user join date formatted as 'Jan 2026'."""
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT joined_at FROM users WHERE user_id = ?",
+            (user_id,)
+        )
+        row = await cur.fetchone()
+    return _format_join_date(row["joined_at"] if row else None)
+
+
 async def get_user_pending_orders(user_id: int) -> int:
     """Get count of pending/confirmed/processing orders."""
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT COUNT(*) as cnt FROM orders WHERE user_id = ? AND status IN ('pending', 'confirmed', 'processing')",
-        (user_id,)
-    )
-    row = await cur.fetchone()
-    return row["cnt"] if row else 0
+    async with get_read_db() as db:
+        cur = await db.execute(
+            "SELECT COUNT(*) as cnt FROM orders WHERE user_id = ? AND status IN ('pending', 'confirmed', 'processing')",
+            (user_id,)
+        )
+        row = await cur.fetchone()
+        return row["cnt"] if row else 0
 
 
 async def get_user_completed_orders(user_id: int) -> int:
     """Get count of completed orders."""
-    db = await get_db()
-    cur = await db.execute(
-        "SELECT COUNT(*) as cnt FROM orders WHERE user_id = ? AND status = 'completed'",
-        (user_id,)
-    )
-    row = await cur.fetchone()
-    return row["cnt"] if row else 0
-
-
-async def get_user_referral_count(user_id: int) -> int:
-    """Get count of users referred by this user. Returns 0 if referrals table doesn't exist."""
-    try:
-        db = await get_db()
+    async with get_read_db() as db:
         cur = await db.execute(
-            "SELECT COUNT(*) as cnt FROM referrals WHERE referrer_id = ?",
+            "SELECT COUNT(*) as cnt FROM orders WHERE user_id = ? AND status = 'completed'",
             (user_id,)
         )
         row = await cur.fetchone()
         return row["cnt"] if row else 0
+
+
+async def get_user_referral_count(user_id: int) -> int:
+    """Get count of users referred by this user. Returns 0 if referrals table doesn't exist."""
+    try:
+        async with get_read_db() as db:
+            cur = await db.execute(
+                "SELECT COUNT(*) as cnt FROM referrals WHERE referrer_id = ?",
+                (user_id,)
+            )
+            row = await cur.fetchone()
+            return row["cnt"] if row else 0
     except Exception:
         return 0
 
 
+def _spin_status_from(last_spin: Optional[str]) -> dict:
+    """Compute spin availability from a users.last_spin value."""
+    from datetime import timedelta
+
+    if not last_spin:
+        return {"available": True, "hours_left": 0, "mins_left": 0}
+    try:
+        next_spin = datetime.fromisoformat(last_spin) + timedelta(hours=24)
+    except Exception:
+        return {"available": True, "hours_left": 0, "mins_left": 0}
+
+    now = datetime.utcnow()
+    if now >= next_spin:
+        return {"available": True, "hours_left": 0, "mins_left": 0}
+
+    diff = next_spin - now
+    hours = int(diff.total_seconds() // 3600)
+    mins = int((diff.total_seconds() % 3600) // 60)
+    return {"available": False, "hours_left": hours, "mins_left": mins}
+
+
 async def get_spin_status(user_id: int) -> dict:
     """
     Get daily spin status for user.
@@ -1617,30 +2398,84 @@ async def get_spin_status(user_id: int) -> dict:
             "mins_left": int
         }
     """
-    from datetime import datetime, timedelta
-    
     try:
-        db = await get_db()
+        async with get_read_db() as db:
+            cur = await db.execute(
+                "SELECT last_spin FROM users WHERE user_id = ?",
+                (user_id,)
+            )
+            row = await cur.fetchone()
+        return _spin_status_from(row["last_spin"] if row else None)
+    except Exception:
+        return {"available": True, "hours_left": 0, "mins_left": 0}
+
+
+# ======================== USER PROFILE SNAPSHOT ========================
+
+class UserProfile(TypedDict):
+    """Everything the welcome screen shows about a user, read in one query."""
+    user_id: int
+    full_name: str
+    username: str
+    balance: float
+    points: int
+    join_date: str
+    total_spent: float
+    total_deposited: float
+    total_orders: int
+    completed_orders: int
+    pending_orders: int
+    referral_count: int
+    spin_status: dict
+
+
+async def get_user_profile(user_id: int) -> Optional[UserProfile]:
+    """
+    Get the welcome-screen snapshot for a user with a single query.
+
+    Same numbers as get_user_balance, get_user_total_spent,
+    get_user_total_deposited, get_user_join_date, get_user_order_count,
+    get_user_completed_orders, get_user_pending_orders,
+    get_user_referral_count and get_spin_status combined.
+
+    Returns:
+        UserProfile dict, or None if the user doesn't exist
+    """
+    async with get_read_db() as db:
         cur = await db.execute(
-            "SELECT last_spin FROM users WHERE user_id = ?",
-            (user_id,)
+            """SELECT u.user_id, u.full_name, u.username, u.balance, u.points,
+                      u.joined_at, u.last_spin,
+                      o.total_orders, o.completed_orders, o.pending_orders, o.total_spent,
+                      (SELECT COALESCE(SUM(t.amount), 0) FROM wallet_topups t
+                        WHERE t.user_id = u.user_id AND t.status = 'approved') AS total_deposited,
+                      (SELECT COUNT(*) FROM referrals r
+                        WHERE r.referrer_id = u.user_id) AS referral_count
+               FROM users u,
+                    (SELECT COUNT(*) AS total_orders,
+                            COALESCE(SUM(status = 'completed'), 0) AS completed_orders,
+                            COALESCE(SUM(status IN ('pending', 'confirmed', 'processing')), 0) AS pending_orders,
+                            COALESCE(SUM(CASE WHEN status = 'completed' THEN total END), 0) AS total_spent
+                     FROM orders WHERE user_id = ?) o
+               WHERE u.user_id = ?""",
+            (user_id, user_id),
         )
         row = await cur.fetchone()
-        
-        if not row or not row["last_spin"]:
-            return {"available": True, "hours_left": 0, "mins_left": 0}
-        
-        last_spin = datetime.fromisoformat(row["last_spin"])
-        now = datetime.utcnow()
-        next_spin = last_spin + timedelta(hours=24)
-        
-        if now >= next_spin:
-            return {"available": True, "hours_left": 0, "mins_left": 0}
-        
-        diff = next_spin - now
-        hours = int(diff.total_seconds() // 3600)
-        mins = int((diff.total_seconds() % 3600) // 60)
-        
-        return {"available": False, "hours_left": hours, "mins_left": mins}
-    except Exception:
-        return {"available": True, "hours_left": 0, "mins_left": 0}
+
+    if not row:
+        return None
+
+    return UserProfile(
+        user_id=row["user_id"],
+        full_name=row["full_name"] or "",
+        username=row["username"] or "",
+        balance=row["balance"] or 0.0,
+        points=row["points"] or 0,
+        join_date=_format_join_date(row["joined_at"]),
+        total_spent=row["total_spent"],
+        total_deposited=row["total_deposited"],
+        total_orders=row["total_orders"],
+        completed_orders=row["completed_orders"],
+        pending_orders=row["pending_orders"],
+        referral_count=row["referral_count"],
+        spin_status=_spin_status_from(row["last_spin"]),
+    )
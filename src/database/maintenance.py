@@ -0,0 +1,111 @@
+"""NanoStore SQLite maintenance — statistics, free-page reclaim, WAL checkpoint.
+
+Run once a day at a quiet hour by the maintenance job (core/jobs.py):
+
+1. ANALYZE (bounded by analysis_limit) + PRAGMA optimize, so the planner
+   keeps up with growing tables like orders and action_logs.
+2. PRAGMA incremental_vacuum hands free pages back to the filesystem. New
+   databases are created with auto_vacuum=INCREMENTAL; an older file is
+   converted by one full VACUUM the first time this runs.
+3. PRAGMA wal_checkpoint(TRUNCATE) copies the WAL into the database and
+   resets the -wal file to zero bytes. Runs last so it also covers the
+   pages the vacuum just wrote.
+
+Everything runs on a private autocommit connection; other connections
+only wait for the write lock during the vacuum and checkpoint steps.
+"""
+
+import logging
+import os
+import time
+from typing import Any
+
+from config import MAINTENANCE_VACUUM_PAGES
+
+from .database import get_backend, get_db
+
+logger = logging.getLogger(__name__)
+
+# Rows sampled per index by ANALYZE (keeps it fast on big tables)
+ANALYSIS_LIMIT = 1000
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def _file_sizes(path: str) -> dict[str, int]:
+    sizes = {}
+    for key, suffix in (("db", ""), ("wal", "-wal")):
+        try:
+            sizes[key] = os.path.getsize(path + suffix)
+        except OSError:
+            sizes[key] = 0
+    return sizes
+
+
+async def _pragma_value(conn, pragma: str) -> int:
+    cur = await conn.execute(f"PRAGMA {pragma}")
+    row = await cur.fetchone()
+    return row[0] if row else 0
+
+
+async def run_maintenance(vacuum_pages: int = MAINTENANCE_VACUUM_PAGES) -> dict[str, Any]:
+    """
+    Run ANALYZE, incremental vacuum and a truncating WAL checkpoint.
+
+    Args:
+        vacuum_pages: Max free pages to release (0 = all)
+
+    Returns:
+        {"before": {db, wal}, "after": {db, wal}, "ms": {analyze, vacuum,
+        checkpoint}, "freed_pages", "converted", "checkpoint_busy"};
+        empty if the backend has nothing to maintain
+    """
+    backend = get_backend()
+    if not backend.supports_maintenance:
+        logger.info("Maintenance skipped: not needed for the %s backend", backend.name)
+        return {}
+
+    await get_db()  # make sure the file exists and is in WAL mode
+    before = _file_sizes(backend.path)
+    timings: dict[str, float] = {}
+
+    conn = await backend.open_autocommit()
+    try:
+        t0 = time.perf_counter()
+        await conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+        await conn.execute("ANALYZE")
+        await conn.execute("PRAGMA optimize")
+        timings["analyze"] = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        free_before = await _pragma_value(conn, "freelist_count")
+        converted = await _pragma_value(conn, "auto_vacuum") != AUTO_VACUUM_INCREMENTAL
+        if converted:
+            # auto_vacuum can only change on an empty file or through VACUUM
+            logger.info("Converting database to auto_vacuum=INCREMENTAL (one-time VACUUM)")
+            await conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            await conn.execute("VACUUM")
+        else:
+            # executescript steps the pragma to completion; execute() would
+            # stop after the first page
+            await conn.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+        free_after = await _pragma_value(conn, "freelist_count")
+        timings["vacuum"] = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        cur = await conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        busy = (await cur.fetchone())[0]
+        timings["checkpoint"] = (time.perf_counter() - t0) * 1000
+    finally:
+        await conn.close()
+
+    result = {
+        "before": before,
+        "after": _file_sizes(backend.path),
+        "ms": {k: round(v, 1) for k, v in timings.items()},
+        "freed_pages": max(0, free_before - free_after),
+        "converted": converted,
+        "checkpoint_busy": bool(busy),
+    }
+    logger.info("Maintenance done: %s", result)
+    return result
@@ -0,0 +1,630 @@
+"""NanoStore schema migrations — numbered steps keyed on PRAGMA user_version.
+
+Each step runs once, in its own transaction, and sets user_version as its
+last statement, so a crash mid-step leaves the previous version intact.
+init_db() calls run_migrations(); when the stored version already equals
+SCHEMA_VERSION startup costs a single PRAGMA read.
+
+To change the schema append a new step — never edit one that has shipped.
+"""
+
+import logging
+from typing import Awaitable, Callable, Union
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+
+# ======================== SCHEMA ========================
+
+BASE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id     INTEGER PRIMARY KEY,
+        full_name   TEXT DEFAULT '',
+        username    TEXT DEFAULT '',
+        balance     REAL DEFAULT 0.0,
+        points      INTEGER DEFAULT 0,
+        currency    TEXT DEFAULT 'PKR',
+        banned      INTEGER DEFAULT 0,
+        joined_at   TEXT DEFAULT (datetime('now')),
+        last_spin   TEXT DEFAULT NULL,
+        referrer_id INTEGER DEFAULT NULL,
+        total_spent REAL DEFAULT 0.0,
+        total_deposited REAL DEFAULT 0.0
+    );
+
+    CREATE TABLE IF NOT EXISTS categories (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        name        TEXT NOT NULL,
+        emoji       TEXT DEFAULT '',
+        image_id    TEXT DEFAULT NULL,
+        sort_order  INTEGER DEFAULT 0,
+        active      INTEGER DEFAULT 1,
+        created_at  TEXT DEFAULT (datetime('now'))
+    );
+
+    CREATE TABLE IF NOT EXISTS products (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        category_id INTEGER NOT NULL,
+        name        TEXT NOT NULL,
+        description TEXT DEFAULT '',
+        price       REAL NOT NULL DEFAULT 0,
+        stock       INTEGER DEFAULT -1,
+        image_id    TEXT DEFAULT NULL,
+        active      INTEGER DEFAULT 1,
+        created_at  TEXT DEFAULT (datetime('now')),
+        FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE CASCADE
+    );
+
+    CREATE TABLE IF NOT EXISTS product_faqs (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id  INTEGER NOT NULL,
+        question    TEXT NOT NULL,
+        answer      TEXT NOT NULL,
+        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+    );
+
+    CREATE TABLE IF NOT EXISTS product_media (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id  INTEGER NOT NULL,
+        media_type  TEXT NOT NULL DEFAULT 'file',
+        file_id     TEXT NOT NULL,
+        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+    );
+
+    CREATE TABLE IF NOT EXISTS cart (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id     INTEGER NOT NULL,
+        product_id  INTEGER NOT NULL,
+        quantity    INTEGER DEFAULT 1,
+        added_at    TEXT DEFAULT (datetime('now')),
+        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+        UNIQUE(user_id, product_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS orders (
+        id              INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id         INTEGER NOT NULL,
+        items_json      TEXT DEFAULT '[]',
+        total           REAL DEFAULT 0,
+        status          TEXT DEFAULT 'pending',
+        payment_status  TEXT DEFAULT 'unpaid',
+        payment_method_id INTEGER DEFAULT NULL,
+        payment_proof_id  INTEGER DEFAULT NULL,
+        coupon_code     TEXT DEFAULT NULL,
+        created_at      TEXT DEFAULT (datetime('now'))
+    );
+
+    CREATE TABLE IF NOT EXISTS payment_methods (
+        id      INTEGER PRIMARY KEY AUTOINCREMENT,
+        name    TEXT NOT NULL,
+        details TEXT DEFAULT '',
+        emoji   TEXT DEFAULT '',
+        active  INTEGER DEFAULT 1
+    );
+
+    CREATE TABLE IF NOT EXISTS payment_proofs (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id     INTEGER NOT NULL,
+        order_id    INTEGER NOT NULL,
+        method_id   INTEGER DEFAULT 0,
+        file_id     TEXT NOT NULL,
+        status      TEXT DEFAULT 'pending_review',
+        reviewed_by INTEGER DEFAULT NULL,
+        admin_note  TEXT DEFAULT NULL,
+        created_at  TEXT DEFAULT (datetime('now'))
+    );
+
+    CREATE TABLE IF NOT EXISTS coupons (
+        code            TEXT PRIMARY KEY,
+        discount_percent INTEGER DEFAULT 0,
+        max_uses        INTEGER DEFAULT 0,
+        used_count      INTEGER DEFAULT 0,
+        active          INTEGER DEFAULT 1,
+        created_at      TEXT DEFAULT (datetime('now'))
+    );
+
+    CREATE TABLE IF NOT EXISTS settings (
+        key     TEXT PRIMARY KEY,
+        value   TEXT DEFAULT ''
+    );
+
+    CREATE TABLE IF NOT EXISTS force_join_channels (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel_id  TEXT NOT NULL,
+        name        TEXT NOT NULL,
+        invite_link TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS tickets (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id     INTEGER NOT NULL,
+        subject     TEXT NOT NULL,
+        message     TEXT DEFAULT '',
+        status      TEXT DEFAULT 'open',
+        created_at  TEXT DEFAULT (datetime('now'))
+    );
+
+    CREATE TABLE IF NOT EXISTS ticket_replies (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        ticket_id   INTEGER NOT NULL,
+        sender      TEXT DEFAULT 'user',
+        message     TEXT NOT NULL,
+        created_at  TEXT DEFAULT (datetime('now')),
+        FOREIGN KEY (ticket_id) REFERENCES tickets(id) ON DELETE CASCADE
+    );
+
+    CREATE TABLE IF NOT EXISTS action_logs (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        action      TEXT NOT NULL,
+        user_id     INTEGER DEFAULT 0,
+        details     TEXT DEFAULT '',
+        created_at  TEXT DEFAULT (datetime('now'))
+    );
+
+    CREATE TABLE IF NOT EXISTS wallet_topups (
+        id              INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id         INTEGER NOT NULL,
+        amount          REAL NOT NULL,
+        method_id       INTEGER DEFAULT NULL,
+        proof_file_id   TEXT DEFAULT NULL,
+        status          TEXT DEFAULT 'pending',
+        admin_note      TEXT DEFAULT NULL,
+        reviewed_by     INTEGER DEFAULT NULL,
+        created_at      TEXT DEFAULT (datetime('now'))
+    );
+
+    CREATE TABLE IF NOT EXISTS points_history (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id     INTEGER NOT NULL,
+        amount      INTEGER NOT NULL,
+        reason      TEXT NOT NULL,
+        created_at  TEXT DEFAULT (datetime('now'))
+    );
+
+    CREATE TABLE IF NOT EXISTS referrals (
+        id              INTEGER PRIMARY KEY AUTOINCREMENT,
+        referrer_id     INTEGER NOT NULL,
+        referred_id     INTEGER NOT NULL,
+        created_at      TEXT DEFAULT (datetime('now')),
+        UNIQUE(referred_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS currency_rates (
+        currency    TEXT PRIMARY KEY,
+        rate_vs_pkr REAL NOT NULL,
+        updated_at  TEXT DEFAULT (datetime('now'))
+    );
+
+    -- Performance indexes
+    CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders(user_id);
+    CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
+    CREATE INDEX IF NOT EXISTS idx_orders_payment_status ON orders(payment_status);
+    CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_orders_user_status ON orders(user_id, status, created_at DESC);
+
+    CREATE INDEX IF NOT EXISTS idx_cart_user_id ON cart(user_id);
+    CREATE INDEX IF NOT EXISTS idx_cart_product_id ON cart(product_id);
+
+    CREATE INDEX IF NOT EXISTS idx_payment_proofs_status ON payment_proofs(status);
+    CREATE INDEX IF NOT EXISTS idx_payment_proofs_order_id ON payment_proofs(order_id);
+    CREATE INDEX IF NOT EXISTS idx_payment_proofs_user_id ON payment_proofs(user_id);
+
+    CREATE INDEX IF NOT EXISTS idx_tickets_user_id ON tickets(user_id);
+    CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status);
+    CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON tickets(created_at DESC);
+
+    CREATE INDEX IF NOT EXISTS idx_products_category_id ON products(category_id);
+    CREATE INDEX IF NOT EXISTS idx_products_active ON products(active);
+
+    CREATE INDEX IF NOT EXISTS idx_wallet_topups_user_id ON wallet_topups(user_id);
+    CREATE INDEX IF NOT EXISTS idx_wallet_topups_status ON wallet_topups(status);
+
+    CREATE INDEX IF NOT EXISTS idx_points_history_user_id ON points_history(user_id);
+    CREATE INDEX IF NOT EXISTS idx_referrals_referrer_id ON referrals(referrer_id);
+"""
+
+DEFAULT_SETTINGS = {
+    "currency": "Rs",
+    "bot_name": "NanoStore",
+    "welcome_text": "Welcome to NanoStore!",
+    "use_global_image": "on",
+    "global_ui_image_id": "",
+    "welcome_image_id": "",
+    "ui_images_enabled": "on",
+    "shop_image_id": "",
+    "shop_text": "",
+    "cart_image_id": "",
+    "cart_text": "",
+    "orders_image_id": "",
+    "orders_text": "",
+    "wallet_image_id": "",
+    "wallet_text": "",
+    "support_image_id": "",
+    "support_text": "",
+    "admin_panel_image_id": "",
+    "admin_panel_text": "",
+    "global_banner_image_id": "",
+    "min_order": "0",
+    "topup_enabled": "on",
+    "topup_min_amount": "100",
+    "topup_max_amount": "10000",
+    "topup_bonus_percent": "0",
+    "auto_delete": "0",
+    "restart_notify_users": "off",
+    "last_restart_at": "",
+}
+
+# Dashboard numbers are kept in stats_counters by triggers, so the admin
+# panel reads eight rows instead of scanning orders/users on every open.
+STATS_COUNTERS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name    TEXT PRIMARY KEY,
+        value   REAL NOT NULL DEFAULT 0
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_users_ins AFTER INSERT ON users BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'users';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_users_del AFTER DELETE ON users BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'users';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_categories_ins AFTER INSERT ON categories BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'categories';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_categories_del AFTER DELETE ON categories BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'categories';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_products_ins AFTER INSERT ON products BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'products';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_products_del AFTER DELETE ON products BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'products';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_orders_ins AFTER INSERT ON orders BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'orders';
+        UPDATE stats_counters SET value = value + NEW.total
+         WHERE name = 'revenue' AND NEW.payment_status = 'paid';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_orders_del AFTER DELETE ON orders BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'orders';
+        UPDATE stats_counters SET value = value - OLD.total
+         WHERE name = 'revenue' AND OLD.payment_status = 'paid';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_orders_upd
+    AFTER UPDATE OF total, payment_status ON orders BEGIN
+        UPDATE stats_counters
+           SET value = value
+                     + CASE WHEN NEW.payment_status = 'paid' THEN NEW.total ELSE 0 END
+                     - CASE WHEN OLD.payment_status = 'paid' THEN OLD.total ELSE 0 END
+         WHERE name = 'revenue';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_proofs_ins AFTER INSERT ON payment_proofs BEGIN
+        UPDATE stats_counters SET value = value + (NEW.status = 'pending_review')
+         WHERE name = 'pending_proofs';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_proofs_del AFTER DELETE ON payment_proofs BEGIN
+        UPDATE stats_counters SET value = value - (OLD.status = 'pending_review')
+         WHERE name = 'pending_proofs';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_proofs_upd
+    AFTER UPDATE OF status ON payment_proofs BEGIN
+        UPDATE stats_counters
+           SET value = value + (NEW.status = 'pending_review') - (OLD.status = 'pending_review')
+         WHERE name = 'pending_proofs';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_tickets_ins AFTER INSERT ON tickets BEGIN
+        UPDATE stats_counters SET value = value + (NEW.status = 'open')
+         WHERE name = 'open_tickets';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_tickets_del AFTER DELETE ON tickets BEGIN
+        UPDATE stats_counters SET value = value - (OLD.status = 'open')
+         WHERE name = 'open_tickets';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_tickets_upd
+    AFTER UPDATE OF status ON tickets BEGIN
+        UPDATE stats_counters
+           SET value = value + (NEW.status = 'open') - (OLD.status = 'open')
+         WHERE name = 'open_tickets';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_topups_ins AFTER INSERT ON wallet_topups BEGIN
+        UPDATE stats_counters SET value = value + (NEW.status = 'pending')
+         WHERE name = 'pending_topups';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_topups_del AFTER DELETE ON wallet_topups BEGIN
+        UPDATE stats_counters SET value = value - (OLD.status = 'pending')
+         WHERE name = 'pending_topups';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_topups_upd
+    AFTER UPDATE OF status ON wallet_topups BEGIN
+        UPDATE stats_counters
+           SET value = value + (NEW.status = 'pending') - (OLD.status = 'pending')
+         WHERE name = 'pending_topups';
+    END;
+"""
+
+# Counter name -> aggregate that defines it (seed + rebuild_stats_counters)
+STATS_COUNTER_QUERIES = {
+    "users": "SELECT COUNT(*) FROM users",
+    "categories": "SELECT COUNT(*) FROM categories",
+    "products": "SELECT COUNT(*) FROM products",
+    "orders": "SELECT COUNT(*) FROM orders",
+    "revenue": "SELECT COALESCE(SUM(total), 0) FROM orders WHERE payment_status = 'paid'",
+    "pending_proofs": "SELECT COUNT(*) FROM payment_proofs WHERE status = 'pending_review'",
+    "open_tickets": "SELECT COUNT(*) FROM tickets WHERE status = 'open'",
+    "pending_topups": "SELECT COUNT(*) FROM wallet_topups WHERE status = 'pending'",
+}
+
+# Full-text index over product name/description (external content, so the
+# text lives only in products). Triggers keep it in sync on every write.
+PRODUCTS_FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_products_fts_ins AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, description)
+        VALUES (NEW.id, NEW.name, NEW.description);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_products_fts_del AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description)
+        VALUES ('delete', OLD.id, OLD.name, OLD.description);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_products_fts_upd
+    AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description)
+        VALUES ('delete', OLD.id, OLD.name, OLD.description);
+        INSERT INTO products_fts (rowid, name, description)
+        VALUES (NEW.id, NEW.name, NEW.description);
+    END;
+"""
+
+# Line items, one row per product with a name/price snapshot.
+ORDER_ITEMS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS order_items (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id    INTEGER NOT NULL,
+        product_id  INTEGER NOT NULL,
+        name        TEXT DEFAULT '',
+        unit_price  REAL DEFAULT 0,
+        quantity    INTEGER DEFAULT 1,
+        FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id);
+    CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items(product_id);
+"""
+
+
+# ======================== STEPS ========================
+
+def _quote(value: str) -> str:
+    """SQL string literal for values baked into a migration script."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+async def _m001_base(db: aiosqlite.Connection) -> str:
+    inserts = "\n".join(
+        f"INSERT OR IGNORE INTO settings (key, value) VALUES ({_quote(k)}, {_quote(v)});"
+        for k, v in DEFAULT_SETTINGS.items()
+    )
+    return BASE_SCHEMA + inserts
+
+
+async def _m002_stats_counters(db: aiosqlite.Connection) -> str:
+    seed = "\n".join(
+        f"INSERT OR REPLACE INTO stats_counters (name, value) VALUES ({_quote(name)}, ({sql}));"
+        for name, sql in STATS_COUNTER_QUERIES.items()
+    )
+    return STATS_COUNTERS_SCHEMA + seed
+
+
+async def _m003_product_search(db: aiosqlite.Connection) -> str:
+    try:
+        await db.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+        await db.execute("DROP TABLE temp._fts5_probe")
+    except aiosqlite.OperationalError as e:
+        logger.warning("FTS5 unavailable, product search falls back to LIKE: %s", e)
+        return ""
+    return PRODUCTS_FTS_SCHEMA + "INSERT INTO products_fts (products_fts) VALUES ('rebuild');"
+
+
+async def _m004_order_items(db: aiosqlite.Connection) -> str:
+    # Copy legacy orders.items_json blobs into order_items
+    return ORDER_ITEMS_SCHEMA + """
+    INSERT INTO order_items (order_id, product_id, name, unit_price, quantity)
+    SELECT o.id,
+           json_extract(j.value, '$.product_id'),
+           COALESCE(json_extract(j.value, '$.name'), ''),
+           COALESCE(json_extract(j.value, '$.price'), 0),
+           COALESCE(json_extract(j.value, '$.quantity'), 1)
+    FROM orders o, json_each(o.items_json) j
+    WHERE json_valid(o.items_json)
+      AND json_extract(j.value, '$.product_id') IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM order_items oi WHERE oi.order_id = o.id)
+    ORDER BY o.id, j.key;
+"""
+
+
+async def _m005_product_delivery(db: aiosqlite.Connection) -> str:
+    # Columns the admin delivery screens and proof approval rely on
+    cur = await db.execute("PRAGMA table_info(products)")
+    existing = {row[1] for row in await cur.fetchall()}
+    columns = {
+        "delivery_type": "TEXT DEFAULT 'manual'",
+        "delivery_data": "TEXT DEFAULT ''",
+    }
+    return "\n".join(
+        f"ALTER TABLE products ADD COLUMN {name} {ddl};"
+        for name, ddl in columns.items()
+        if name not in existing
+    )
+
+
+async def _m006_keyset_indexes(db: aiosqlite.Connection) -> str:
+    # (filter, timestamp) indexes for keyset pagination — rowid is the implicit tiebreaker
+    return """
+    CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders(user_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_users_joined_at ON users(joined_at);
+    CREATE INDEX IF NOT EXISTS idx_wallet_topups_user_created ON wallet_topups(user_id, created_at);
+    """
+
+
+# Keyset pages of one category's active products (get_products_page)
+_m007_category_products_index = """
+    CREATE INDEX IF NOT EXISTS idx_products_category_active ON products(category_id, active);
+"""
+
+
+async def _m008_broadcasts(db: aiosqlite.Connection) -> str:
+    # Background broadcasts with per-recipient progress; users.blocked marks
+    # chats that blocked the bot so later broadcasts skip them
+    cur = await db.execute("PRAGMA table_info(users)")
+    existing = {row[1] for row in await cur.fetchall()}
+    add_blocked = (
+        "" if "blocked" in existing
+        else "ALTER TABLE users ADD COLUMN blocked INTEGER DEFAULT 0;"
+    )
+    return add_blocked + """
+    CREATE TABLE IF NOT EXISTS broadcasts (
+        id              INTEGER PRIMARY KEY AUTOINCREMENT,
+        text            TEXT NOT NULL,
+        status          TEXT DEFAULT 'running',
+        admin_chat_id   INTEGER DEFAULT NULL,
+        admin_message_id INTEGER DEFAULT NULL,
+        total           INTEGER DEFAULT 0,
+        sent            INTEGER DEFAULT 0,
+        failed          INTEGER DEFAULT 0,
+        blocked         INTEGER DEFAULT 0,
+        created_at      TEXT DEFAULT (datetime('now')),
+        finished_at     TEXT DEFAULT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS broadcast_recipients (
+        broadcast_id    INTEGER NOT NULL,
+        user_id         INTEGER NOT NULL,
+        status          TEXT DEFAULT 'pending',
+        PRIMARY KEY (broadcast_id, user_id),
+        FOREIGN KEY (broadcast_id) REFERENCES broadcasts(id) ON DELETE CASCADE
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_broadcasts_status ON broadcasts(status);
+    """
+
+
+# Every write to settings bumps this row, so a process can tell whether
+# another one changed its settings without re-reading the table
+_m009_settings_version = """
+    INSERT OR IGNORE INTO stats_counters (name, value) VALUES ('settings_version', 0);
+
+    CREATE TRIGGER IF NOT EXISTS trg_settings_version_ins AFTER INSERT ON settings BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'settings_version';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_settings_version_upd AFTER UPDATE ON settings BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'settings_version';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_settings_version_del AFTER DELETE ON settings BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'settings_version';
+    END;
+"""
+
+
+# Same for everything the catalog snapshot is built from, so workers
+# sharing one database notice each other's catalog and stock changes
+_CATALOG_TABLES = ("categories", "products", "product_faqs", "product_media")
+
+_m010_catalog_version = """
+    INSERT OR IGNORE INTO stats_counters (name, value) VALUES ('catalog_version', 0);
+""" + "".join(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_catalog_version_{table}_{event[:3].lower()}
+    AFTER {event} ON {table} BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'catalog_version';
+    END;"""
+    for table in _CATALOG_TABLES
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+
+# And for the force-join channel list the membership middleware caches
+_m011_force_join_version = """
+    INSERT OR IGNORE INTO stats_counters (name, value) VALUES ('force_join_version', 0);
+""" + "".join(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_force_join_version_{event[:3].lower()}
+    AFTER {event} ON force_join_channels BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'force_join_version';
+    END;"""
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+
+Step = Union[str, Callable[[aiosqlite.Connection], Awaitable[str]]]
+
+# (version, description, SQL or async builder returning SQL)
+MIGRATIONS: list[tuple[int, str, Step]] = [
+    (1, "base schema and default settings", _m001_base),
+    (2, "dashboard stats counters", _m002_stats_counters),
+    (3, "FTS5 product search index", _m003_product_search),
+    (4, "order_items table + items_json backfill", _m004_order_items),
+    (5, "products.delivery_type / delivery_data", _m005_product_delivery),
+    (6, "keyset pagination indexes", _m006_keyset_indexes),
+    (7, "category product page index", _m007_category_products_index),
+    (8, "broadcasts + users.blocked", _m008_broadcasts),
+    (9, "settings version counter", _m009_settings_version),
+    (10, "catalog version counter", _m010_catalog_version),
+    (11, "force-join channels version counter", _m011_force_join_version),
+]
+
+SCHEMA_VERSION: int = MIGRATIONS[-1][0]
+
+
+# ======================== RUNNER ========================
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    """Read the schema version stored in the database header."""
+    cur = await db.execute("PRAGMA user_version")
+    row = await cur.fetchone()
+    return row[0] if row else 0
+
+
+async def run_migrations(db: aiosqlite.Connection) -> int:
+    """
+    Apply every step newer than the stored user_version.
+
+    Returns:
+        The schema version after running
+    """
+    current = await get_schema_version(db)
+    if current == SCHEMA_VERSION:
+        return current
+    if current > SCHEMA_VERSION:
+        logger.warning(
+            "Database schema v%d is newer than this build (v%d)", current, SCHEMA_VERSION
+        )
+        return current
+
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        sql = step if isinstance(step, str) else await step(db)
+        script = f"BEGIN IMMEDIATE;\n{sql}\nPRAGMA user_version = {version};\nCOMMIT;"
+        try:
+            await db.executescript(script)
+        except Exception:
+            if db.in_transaction:
+                await db.rollback()
+            logger.error("Migration %d (%s) failed", version, description, exc_info=True)
+            raise
+        logger.info("Applied migration %d: %s", version, description)
+
+    return SCHEMA_VERSION
@@ -0,0 +1,233 @@
+"""Optional query timing for the database layer.
+
+With DB_PROFILE=true every connection handed out by database.py is wrapped
+in a thin proxy that times execute/fetch calls, counts rows and attributes
+each statement to the database function that issued it. Statements slower
+than DB_SLOW_QUERY_MS are logged with their EXPLAIN QUERY PLAN, and a
+rolling window of samples per function feeds the /dbstats admin command.
+
+When profiling is off, profiled() returns the connection untouched, so the
+hot path pays nothing.
+"""
+
+import logging
+import sys
+import time
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Any, Optional
+
+import aiosqlite
+
+from config import DB_PROFILE, DB_SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+# Samples kept per function for the percentile window
+_WINDOW = 500
+
+# function name -> recent (elapsed_ms, rows) samples
+_samples: dict[str, deque] = {}
+_calls: dict[str, int] = {}
+_started_at = time.time()
+
+# Set while the group-commit writer runs a queued write, so its statements
+# are charged to the function that queued it rather than the writer task
+_owner: ContextVar[Optional[str]] = ContextVar("db_query_owner", default=None)
+
+# Plumbing frames skipped when looking for the function that issued a query
+_PLUMBING = {"_queue_write", "_queue_execute", "_keyset_page", "_attach_archive"}
+
+# Statements whose cost includes fetching rows; everything else is done at execute()
+_READ_VERBS = ("SELECT", "WITH", "PRAGMA", "EXPLAIN")
+
+
+def _caller_name(depth: int) -> str:
+    """Name of the database function that issued the statement."""
+    owner = _owner.get()
+    if owner is not None:
+        return owner
+    frame = sys._getframe(depth)
+    while frame is not None and (
+        frame.f_code.co_filename == __file__ or frame.f_code.co_name in _PLUMBING
+    ):
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    # Closures queued on the group-commit writer report as their owner
+    return frame.f_code.co_qualname.split(".<locals>", 1)[0]
+
+
+def _record(func: str, elapsed_ms: float, rows: int) -> bool:
+    """Add a sample; True when the statement was slow enough to log."""
+    window = _samples.get(func)
+    if window is None:
+        window = _samples[func] = deque(maxlen=_WINDOW)
+    window.append((elapsed_ms, rows))
+    _calls[func] = _calls.get(func, 0) + 1
+    return elapsed_ms >= DB_SLOW_QUERY_MS
+
+
+async def _log_slow(conn: aiosqlite.Connection, func: str, sql: str, params: Any,
+                    elapsed_ms: float, rows: int) -> None:
+    """
+    Log a slow statement with its query plan (SELECTs only — EXPLAIN is side-effect free).
+
+    Awaited inline, so the plan is taken on the unwrapped connection while
+    the caller still holds it: a pooled reader can't have been lent out
+    again and a transaction connection can't have been closed yet.
+    """
+    plan = ""
+    if sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        try:
+            cur = await conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ())
+            plan = "\n".join(f"  {row[-1]}" for row in await cur.fetchall())
+        except Exception as e:
+            plan = f"  (no plan: {e})"
+    logger.warning(
+        "Slow query %.1f ms in %s (%d rows): %s%s",
+        elapsed_ms, func, rows, " ".join(sql.split())[:300], f"\n{plan}" if plan else "",
+    )
+
+
+class _ProfiledCursor:
+    """Cursor proxy that adds fetch time and row count to its statement's sample."""
+
+    def __init__(self, cursor: aiosqlite.Cursor, conn: aiosqlite.Connection,
+                 func: str, sql: str, params: Any, elapsed_ms: float) -> None:
+        self._cursor = cursor
+        self._conn = conn
+        self._func = func
+        self._sql = sql
+        self._params = params
+        self._elapsed_ms = elapsed_ms
+        self._pending = True
+
+    async def _done(self, elapsed_ms: float, rows: int) -> None:
+        if self._pending:
+            self._pending = False
+            elapsed_ms += self._elapsed_ms
+            if _record(self._func, elapsed_ms, rows):
+                await _log_slow(self._conn, self._func, self._sql, self._params,
+                                elapsed_ms, rows)
+
+    async def fetchone(self):
+        start = time.perf_counter()
+        row = await self._cursor.fetchone()
+        await self._done((time.perf_counter() - start) * 1000, 0 if row is None else 1)
+        return row
+
+    async def fetchall(self):
+        start = time.perf_counter()
+        rows = await self._cursor.fetchall()
+        await self._done((time.perf_counter() - start) * 1000, len(rows))
+        return rows
+
+    async def fetchmany(self, size: Optional[int] = None):
+        start = time.perf_counter()
+        rows = await (self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany())
+        await self._done((time.perf_counter() - start) * 1000, len(rows))
+        return rows
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class _ProfiledConnection:
+    """Connection proxy that times execute/executemany; everything else passes through."""
+
+    def __init__(self, conn: aiosqlite.Connection) -> None:
+        self._conn = conn
+
+    async def execute(self, sql: str, parameters: Any = None):
+        func = _caller_name(2)
+        start = time.perf_counter()
+        cursor = await self._conn.execute(sql, parameters)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if sql.lstrip().upper().startswith(_READ_VERBS):
+            return _ProfiledCursor(cursor, self._conn, func, sql, parameters, elapsed_ms)
+        rows = max(cursor.rowcount, 0)
+        if _record(func, elapsed_ms, rows):
+            await _log_slow(self._conn, func, sql, parameters, elapsed_ms, rows)
+        return cursor
+
+    async def executemany(self, sql: str, parameters: Any):
+        func = _caller_name(2)
+        start = time.perf_counter()
+        cursor = await self._conn.executemany(sql, parameters)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        rows = max(cursor.rowcount, 0)
+        if _record(func, elapsed_ms, rows):
+            await _log_slow(self._conn, func, sql, None, elapsed_ms, rows)
+        return cursor
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+def profiled(conn: aiosqlite.Connection) -> aiosqlite.Connection:
+    """Wrap a connection for timing when DB_PROFILE is on; otherwise return it as-is."""
+    if not DB_PROFILE:
+        return conn
+    return _ProfiledConnection(conn)  # type: ignore[return-value]
+
+
+def write_owner() -> Optional[str]:
+    """Name of the function queueing a write (None when profiling is off)."""
+    if not DB_PROFILE:
+        return None
+    return _caller_name(2)
+
+
+def set_write_owner(owner: Optional[str]) -> Token:
+    """Charge the following statements to ``owner``; undo with reset_write_owner()."""
+    return _owner.set(owner)
+
+
+def reset_write_owner(token: Token) -> None:
+    _owner.reset(token)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def get_query_stats() -> list[dict]:
+    """
+    Per-function timing over the recent sample window, slowest total first.
+
+    Returns:
+        List of dicts: func, calls, p50, p95, p99, max (ms), rows_avg, total_ms
+    """
+    stats = []
+    for func, window in _samples.items():
+        times = sorted(s[0] for s in window)
+        rows = [s[1] for s in window]
+        stats.append({
+            "func": func,
+            "calls": _calls.get(func, 0),
+            "p50": _percentile(times, 50),
+            "p95": _percentile(times, 95),
+            "p99": _percentile(times, 99),
+            "max": times[-1] if times else 0.0,
+            "rows_avg": sum(rows) / len(rows) if rows else 0.0,
+            "total_ms": sum(times),
+        })
+    stats.sort(key=lambda s: s["total_ms"], reverse=True)
+    return stats
+
+
+def reset_query_stats() -> None:
+    """Drop all collected samples."""
+    global _started_at
+    _samples.clear()
+    _calls.clear()
+    _started_at = time.time()
+
+
+def query_stats_since() -> float:
+    """Unix time the current sample window started."""
+    return _started_at
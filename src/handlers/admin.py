@@ -9,30 +9,31 @@ Key improvements vs previous version:
 - All handlers use send_typing() for immediate feedback
 """
 
-import asyncio
-import json
 import logging
+import time
 from html import escape as html_escape
 from telegram import Update, InlineKeyboardButton as Btn, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from config import ADMIN_ID, PROOFS_CHANNEL_ID
+from config import ADMIN_ID, PROOFS_CHANNEL_ID, DB_PROFILE, DB_SLOW_QUERY_MS
 from database import (
-    get_dashboard_stats,
+    get_dashboard_stats, rebuild_stats_counters,
     get_all_categories, get_category, add_category, update_category, delete_category,
-    get_products_by_category, get_product_count_in_category,
-    get_product, add_product, update_product, delete_product,
-    get_all_orders, get_order, update_order,
-    get_all_users, get_user, get_user_count, ban_user, unban_user,
-    get_user_order_count, get_user_balance, get_all_user_ids,
+    get_products_page, get_product_count_in_category,
+    get_product, get_products_by_ids, add_product, update_product, delete_product,
+    get_orders_page, get_order, get_order_items, update_order,
+    get_users_page, get_user, get_user_count, ban_user, unban_user,
+    get_user_order_count, get_user_balance,
+    get_broadcast_audience_count,
     get_all_coupons, create_coupon, delete_coupon, toggle_coupon,
     get_all_payment_methods, add_payment_method, delete_payment_method,
     get_pending_proofs, get_pending_proof_count, get_payment_proof,
     update_proof, get_payment_method,
-    get_all_settings, get_setting, set_setting,
+    get_all_settings, get_setting, get_settings, set_setting,
     get_force_join_channels, add_force_join_channel, delete_force_join_channel,
     add_product_faq, delete_product_faq, get_product_faqs,
     add_product_media, delete_product_media, get_product_media,
     add_action_log, search_products, get_open_ticket_count,
+    get_query_stats, reset_query_stats, query_stats_since,
 )
 from utils import (
     safe_edit, separator, send_typing, notify_log_channel,
@@ -47,11 +48,15 @@ from utils import (
     admin_coupons_kb, admin_payments_kb,
     admin_proofs_kb, admin_proof_detail_kb,
     admin_tickets_kb, admin_fj_kb, admin_settings_kb,
-    admin_broadcast_confirm_kb, back_kb,
+    admin_broadcast_confirm_kb, admin_broadcast_progress_kb, back_kb,
 )
+from core.broadcast import start_broadcast, stop_broadcast
 
 logger = logging.getLogger(__name__)
 
+# Products per page in the admin product list
+PRODS_PER_PAGE: int = 20
+
 
 def _is_admin(user_id: int) -> bool:
     return user_id == ADMIN_ID
@@ -138,6 +143,105 @@ async def admin_dashboard_handler(update: Update, context: ContextTypes.DEFAULT_
     await safe_edit(query, text, reply_markup=back_kb("admin"))
 
 
+async def admin_rebuild_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/rebuild_stats — recompute dashboard counters from the base tables."""
+    if not _is_admin(update.effective_user.id):
+        return
+
+    before = await get_dashboard_stats()
+    after = await rebuild_stats_counters()
+
+    drift = [
+        f"• {key}: {before[key]} → {after[key]}"
+        for key in after
+        if before.get(key) != after[key]
+    ]
+    text = f"🔄 <b>Stats Counters Rebuilt</b>\n{separator()}\n\n"
+    text += "\n".join(drift) if drift else "✅ No drift — all counters were correct."
+    await update.message.reply_text(text, parse_mode="HTML")
+    await add_action_log("stats_rebuild", update.effective_user.id, f"{len(drift)} counter(s) corrected")
+
+
+async def admin_dbstats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/dbstats [reset] — per-function query timings collected with DB_PROFILE=true."""
+    if not _is_admin(update.effective_user.id):
+        return
+
+    if not DB_PROFILE:
+        await update.message.reply_text(
+            "⚠️ Query profiling is off. Set <code>DB_PROFILE=true</code> and restart.",
+            parse_mode="HTML",
+        )
+        return
+
+    if context.args and context.args[0].lower() == "reset":
+        reset_query_stats()
+        await update.message.reply_text("✅ Query stats reset.")
+        return
+
+    stats = get_query_stats()
+    minutes = (time.time() - query_stats_since()) / 60
+    text = (
+        f"⏱ <b>Query Timings</b> (last {minutes:.0f} min, slow ≥ {DB_SLOW_QUERY_MS:.0f} ms)\n"
+        f"{separator()}\n<pre>"
+    )
+    if not stats:
+        text += "No queries recorded yet."
+    for s in stats[:25]:
+        line = (
+            f"{s['func'][:24]:<24} n={s['calls']:<6}"
+            f" p50={s['p50']:.1f} p95={s['p95']:.1f} p99={s['p99']:.1f}"
+            f" max={s['max']:.1f} rows={s['rows_avg']:.0f}\n"
+        )
+        if len(text) + len(line) > 4000:
+            break
+        text += html_escape(line)
+    text += "</pre>"
+    await update.message.reply_text(text, parse_mode="HTML")
+
+
+async def admin_sendstats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/sendstats — outbound queue depth and waits per priority, log channel counters."""
+    if not _is_admin(update.effective_user.id):
+        return
+
+    limiter = context.bot.rate_limiter
+    if limiter is None or not hasattr(limiter, "stats"):
+        await update.message.reply_text("⚠️ No outbound rate limiter is configured.")
+        return
+
+    stats = limiter.stats()
+    text = f"📮 <b>Outbound Queue</b>\n{separator()}\n<pre>"
+    for name in stats["queued"]:
+        text += (
+            f"{name:<12} queued={stats['queued'][name]:<5} sent={stats['sent'][name]:<7}"
+            f" max_wait={stats['max_wait_ms'][name]:.0f}ms\n"
+        )
+    text += "</pre>\n"
+    text += f"⏳ Flood-waits: {stats['retry_after']}"
+    if stats["paused_for"]:
+        text += f" (paused {stats['paused_for']:.0f}s)"
+    text += f"\n💬 Chats tracked: {stats['chats']}"
+
+    channel_logger = context.bot_data.get('channel_logger')
+    if channel_logger and channel_logger.enabled:
+        log = channel_logger.stats()
+        text += (
+            f"\n\n📝 <b>Log channel</b>: {log['sent']} events in {log['messages']} posts"
+            f" · queued {log['queued']} · dropped {log['dropped']} · failed {log['failed']}"
+        )
+
+    telegram_handler = context.bot_data.get('telegram_log_handler')
+    if telegram_handler:
+        tl = telegram_handler.stats()
+        text += (
+            f"\n📜 <b>Log stream</b>: {tl['records_sent']} records in {tl['messages_sent']} posts"
+            f" · queued {tl['queued']} · dropped {tl['records_dropped']}"
+            f" · failed posts {tl['messages_failed']}"
+        )
+    await update.message.reply_text(text, parse_mode="HTML")
+
+
 # ════════════════════════ CATEGORIES ════════════════════════
 
 async def admin_cats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -284,19 +388,30 @@ async def admin_prods_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not _is_admin(update.effective_user.id):
         return
 
-    cat_id = int(query.data.split(":")[1])
+    parts = query.data.split(":")
+    cat_id = int(parts[1])
+    cursor = parts[2] if len(parts) > 2 else None
+    await _show_admin_prods(query, cat_id, cursor)
+
+
+async def _show_admin_prods(query, cat_id: int, cursor: str = None) -> None:
+    """Internal: one keyset page of a category's products."""
     cat = await get_category(cat_id)
     if not cat:
         await safe_edit(query, "❌ Category not found.", reply_markup=back_kb("adm_cats"))
         return
 
-    products = await get_products_by_category(cat_id, limit=50)
+    page = await get_products_page(cat_id, cursor, limit=PRODS_PER_PAGE)
+    count = await get_product_count_in_category(cat_id, active_only=True)
     currency = await get_setting("currency", "Rs")
     text = (
         f"📦 <b>{html_escape(cat['emoji'])} {html_escape(cat['name'])}</b>\n"
-        f"{separator()}\n\n📊 {len(products)} products"
+        f"{separator()}\n\n📊 {count} products"
     )
-    await safe_edit(query, text, reply_markup=admin_prods_kb(products, cat_id, currency))
+    await safe_edit(query, text, reply_markup=admin_prods_kb(
+        page["items"], cat_id, currency,
+        prev_cursor=page["prev"], next_cursor=page["next"],
+    ))
 
 
 async def admin_prod_add_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -390,13 +505,7 @@ async def admin_prod_del_handler(update: Update, context: ContextTypes.DEFAULT_T
             await delete_product(prod_id)
             await query.answer(f"✅ '{prod['name']}' deleted!", show_alert=True)
             await add_action_log("prod_deleted", ADMIN_ID, prod["name"])
-            products = await get_products_by_category(cat_id, limit=50)
-            currency = await get_setting("currency", "Rs")
-            await safe_edit(
-                query,
-                f"📦 <b>Products</b>\n{separator()}\n\n📊 {len(products)} products",
-                reply_markup=admin_prods_kb(products, cat_id, currency),
-            )
+            await _show_admin_prods(query, cat_id)
         else:
             await safe_edit(query, "❌ Product not found.", reply_markup=back_kb("adm_cats"))
     else:
@@ -541,12 +650,14 @@ async def admin_orders_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     if not _is_admin(update.effective_user.id):
         return
 
-    orders = await get_all_orders(limit=20)
+    cursor = query.data.split(":", 1)[1] if ":" in query.data else None
+    page = await get_orders_page(cursor=cursor, limit=20)
+    orders = page["items"]
     currency = await get_setting("currency", "Rs")
     await safe_edit(
         query,
-        f"🛒 <b>All Orders</b>\n{separator()}\n\n📊 {len(orders)} recent orders",
-        reply_markup=admin_orders_kb(orders, currency),
+        f"🛒 <b>All Orders</b>\n{separator()}\n\n📊 {len(orders)} orders on this page",
+        reply_markup=admin_orders_kb(orders, currency, page["prev"], page["next"]),
     )
 
 
@@ -563,7 +674,7 @@ async def admin_order_detail_handler(update: Update, context: ContextTypes.DEFAU
         return
 
     currency = await get_setting("currency", "Rs")
-    items = json.loads(order["items_json"]) if order["items_json"] else []
+    items = await get_order_items(order_id)
     user = await get_user(order["user_id"])
     user_name = user["full_name"] if user else str(order["user_id"])
     total = int(order["total"]) if order["total"] == int(order["total"]) else order["total"]
@@ -642,12 +753,13 @@ async def admin_users_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not _is_admin(update.effective_user.id):
         return
 
-    users = await get_all_users(limit=20)
+    cursor = query.data.split(":", 1)[1] if ":" in query.data else None
+    page = await get_users_page(cursor=cursor, limit=20)
     total = await get_user_count()
     await safe_edit(
         query,
         f"👥 <b>All Users</b>\n{separator()}\n\n📊 {total} registered users",
-        reply_markup=admin_users_kb(users),
+        reply_markup=admin_users_kb(page["items"], page["prev"], page["next"]),
     )
 
 
@@ -938,11 +1050,12 @@ async def admin_proof_approve_handler(update: Update, context: ContextTypes.DEFA
     # Auto-delivery: send products that have delivery_type = "auto"
     order = await get_order(proof["order_id"])
     if order:
-        items = json.loads(order["items_json"]) if order["items_json"] else []
+        items = await get_order_items(proof["order_id"])
+        products = await get_products_by_ids(item["product_id"] for item in items)
         auto_delivered = 0
 
         for item in items:
-            prod = await get_product(item["product_id"])
+            prod = products.get(item["product_id"])
             if not prod:
                 continue
 
@@ -1119,14 +1232,24 @@ async def admin_settings_handler(update: Update, context: ContextTypes.DEFAULT_T
         return
 
     # Fetch all current values to display inline
-    currency     = await get_setting("currency", "Rs")
-    min_order    = await get_setting("min_order", "0")
-    daily_reward = await get_setting("daily_reward", "10")
-    maintenance  = await get_setting("maintenance", "off")
-    topup_enabled = await get_setting("topup_enabled", "on")
-    topup_min = await get_setting("topup_min_amount", "100")
-    topup_max = await get_setting("topup_max_amount", "50000")
-    topup_bonus = await get_setting("topup_bonus_percent", "0")
+    s = await get_settings({
+        "currency": "Rs",
+        "min_order": "0",
+        "daily_reward": "10",
+        "maintenance": "off",
+        "topup_enabled": "on",
+        "topup_min_amount": "100",
+        "topup_max_amount": "50000",
+        "topup_bonus_percent": "0",
+    })
+    currency     = s["currency"]
+    min_order    = s["min_order"]
+    daily_reward = s["daily_reward"]
+    maintenance  = s["maintenance"]
+    topup_enabled = s["topup_enabled"]
+    topup_min = s["topup_min_amount"]
+    topup_max = s["topup_max_amount"]
+    topup_bonus = s["topup_bonus_percent"]
 
     maint_badge = "🔴 ON" if maintenance == "on" else "🟢 OFF"
     topup_badge = "🟢 ON" if topup_enabled == "on" else "🔴 OFF"
@@ -1294,10 +1417,6 @@ async def admin_img_panel_handler(update: Update, context: ContextTypes.DEFAULT_
     if not _is_admin(update.effective_user.id):
         return
 
-    # Get status for global image
-    global_image_id = await get_setting("global_ui_image_id", "")
-    use_global = await get_setting("use_global_image", "on")
-    
     # Get status for all image AND text keys
     image_keys = [
         "welcome_image_id",
@@ -1319,20 +1438,23 @@ async def admin_img_panel_handler(update: Update, context: ContextTypes.DEFAULT_
         "admin_panel_text",
     ]
     
+    values = await get_settings({
+        **dict.fromkeys(image_keys + text_keys, ""),
+        "global_ui_image_id": "",
+        "use_global_image": "on",
+        "ui_images_enabled": "on",
+    })
+    use_global = values["use_global_image"]
+    
     statuses = {
-        "global_ui_image_id": bool(global_image_id),
+        "global_ui_image_id": bool(values["global_ui_image_id"]),
         "use_global_image": use_global == "on",
     }
     
-    for key in image_keys:
-        val = await get_setting(key, "")
-        statuses[key] = bool(val)
-    
-    for key in text_keys:
-        val = await get_setting(key, "")
-        statuses[key] = bool(val)
+    for key in image_keys + text_keys:
+        statuses[key] = bool(values[key])
     
-    ui_enabled = await get_setting("ui_images_enabled", "on")
+    ui_enabled = values["ui_images_enabled"]
     toggle_status = "🟢 ON" if ui_enabled == "on" else "🔴 OFF"
     
     mode_desc = "Global image for ALL screens" if use_global == "on" else "Per-screen images"
@@ -1621,7 +1743,7 @@ async def admin_broadcast_handler(update: Update, context: ContextTypes.DEFAULT_
         return
 
     context.user_data["state"] = "adm_broadcast_text"
-    user_count = await get_user_count()
+    user_count = await get_broadcast_audience_count()
     text = (
         f"📣 <b>Broadcast Message</b>\n{separator()}\n\n"
         f"📊 Will reach <b>{user_count}</b> users.\n\n"
@@ -1632,7 +1754,7 @@ async def admin_broadcast_handler(update: Update, context: ContextTypes.DEFAULT_
 
 
 async def admin_broadcast_confirm_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Send the broadcast to all non-banned users with rate limiting."""
+    """Start the broadcast in the background; this message shows its progress."""
     query = update.callback_query
     await query.answer()
     if not _is_admin(update.effective_user.id):
@@ -1646,32 +1768,33 @@ async def admin_broadcast_confirm_handler(update: Update, context: ContextTypes.
     context.user_data.pop("state", None)
     context.user_data.pop("temp", None)
 
-    user_ids = await get_all_user_ids()
-    sent = 0
-    failed = 0
+    broadcast_id = await start_broadcast(
+        context.bot, broadcast_text, query.message.chat_id, query.message.message_id
+    )
+    await safe_edit(
+        query,
+        f"📣 <b>Broadcast #{broadcast_id} started</b>\n{separator()}\n\n"
+        "⏳ Progress updates will appear here.",
+        reply_markup=admin_broadcast_progress_kb(broadcast_id),
+    )
+
+
+async def admin_broadcast_stop_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Stop a running broadcast; recipients already sent to are kept."""
+    query = update.callback_query
+    if not _is_admin(update.effective_user.id):
+        await query.answer()
+        return
 
-    # Rate limit: 25 messages/second (safe margin below Telegram's 30/sec limit)
-    for i, uid in enumerate(user_ids):
+    broadcast_id = int(query.data.split(":")[1])
+    if await stop_broadcast(broadcast_id):
+        await query.answer("⏹ Stopping broadcast…")
+    else:
+        await query.answer("Broadcast already finished.", show_alert=True)
         try:
-            await context.bot.send_message(
-                chat_id=uid, text=broadcast_text, parse_mode="HTML"
-            )
-            sent += 1
-            
-            # Sleep every 25 messages to avoid rate limits
-            if (i + 1) % 25 == 0:
-                await asyncio.sleep(1)
+            await query.edit_message_reply_markup(reply_markup=back_kb("admin"))
         except Exception:
-            failed += 1
-
-    text = (
-        f"📣 <b>Broadcast Complete!</b>\n{separator()}\n\n"
-        f"✅ Sent: <b>{sent}</b>\n"
-        f"❌ Failed: <b>{failed}</b>\n"
-        f"📊 Total: {sent + failed}"
-    )
-    await safe_edit(query, text, reply_markup=back_kb("admin"))
-    await add_action_log("broadcast", ADMIN_ID, f"Sent: {sent}, Failed: {failed}")
+            pass
 
 
 # ════════════════════════ WALLET TOP-UPS ════════════════════════
@@ -2096,8 +2219,9 @@ async def admin_text_router(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if state == "adm_broadcast_text":
         context.user_data["state"] = None
         context.user_data.setdefault("temp", {})["broadcast_text"] = text
-        user_count = await get_user_count()
-        msg = await update.message.reply_text(
+        user_count = await get_broadcast_audience_count()
+        # Kept: once confirmed this message shows the broadcast's progress
+        await update.message.reply_text(
             f"📣 <b>Broadcast Preview</b>\n{separator()}\n\n"
             f"{text}\n\n"
             f"{separator()}\n"
@@ -2105,8 +2229,7 @@ async def admin_text_router(update: Update, context: ContextTypes.DEFAULT_TYPE)
             parse_mode="HTML",
             reply_markup=admin_broadcast_confirm_kb(),
         )
-        await auto_delete(msg)
-        await auto_delete(update.message)
+        await auto_delete(context, update.message.chat_id, update.message.message_id)
         return
 
     # ── Settings: update value ──
@@ -4,7 +4,7 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 from config import ADMIN_ID
-from database import get_setting, set_setting
+from database import get_setting, get_settings, set_setting
 from utils import safe_edit, html_escape, separator, schedule_delete
 from utils import admin_content_kb, admin_content_screen_kb, CONTENT_SCREENS, back_kb
 
@@ -57,8 +57,9 @@ async def admin_content_screen_handler(update: Update, context: ContextTypes.DEF
     image_key = f"{screen_key}_image_id"
     text_key = f"{screen_key}_text"
     
-    image_id = await get_setting(image_key, "")
-    text_content = await get_setting(text_key, "")
+    values = await get_settings([image_key, text_key])
+    image_id = values[image_key]
+    text_content = values[text_key]
     
     img_status = "✅ Set" if image_id else "❌ Not set"
     txt_status = "✅ Set" if text_content else "❌ Using default"
@@ -4,21 +4,17 @@ import logging
 import math
 from telegram import Update
 from telegram.ext import ContextTypes
+from config import SCREEN_CACHE_SIZE
 from database import (
-    get_active_categories,
-    get_category,
-    get_products_by_category,
-    get_product_count_in_category,
-    get_product,
+    get_catalog,
     get_setting,
-    get_product_faqs,
-    get_product_media,
     add_to_cart,
 )
-from utils import safe_edit, format_stock, html_escape, separator
+from utils import safe_edit, format_stock, html_escape, separator, ScreenCache
 from utils import (
     categories_kb,
     products_kb,
+    stock_overview_kb,
     product_detail_kb,
     faq_kb,
     back_kb,
@@ -28,6 +24,27 @@ logger = logging.getLogger(__name__)
 
 PER_PAGE: int = 20
 
+# Body size per stock overview page (Telegram caps messages at 4096 chars)
+STOCK_PAGE_CHARS: int = 3800
+
+# Rendered (text, reply_markup) per (screen, id, page, currency, catalog version)
+_screens = ScreenCache(SCREEN_CACHE_SIZE)
+
+
+def _price_display(price: float):
+    return int(price) if price == int(price) else price
+
+
+def _render_shop(catalog) -> tuple:
+    text = (
+        f"🏠 <b>Shop Categories</b>\n"
+        f"{separator()}\n"
+        f"📂 Browse our collection:"
+    )
+    if not catalog.categories:
+        return text + "\n\n🙅 No categories available yet.", None
+    return text, categories_kb(catalog.categories)
+
 
 async def shop_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show all active categories.
@@ -37,20 +54,15 @@ async def shop_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     query = update.callback_query
     await query.answer()
 
-    cats = await get_active_categories()
-    text = (
-        f"🏠 <b>Shop Categories</b>\n"
-        f"{separator()}\n"
-        f"📂 Browse our collection:"
+    catalog = await get_catalog()
+    text, kb = _screens.get_or_render(
+        ("shop", None, 1, None, catalog.version), lambda: _render_shop(catalog)
     )
 
-    if not cats:
-        text += "\n\n🙅 No categories available yet."
+    if kb is None:
         await safe_edit(query, text, reply_markup=back_kb("main_menu"))
         return
 
-    kb = categories_kb(cats)
-
     # Use render_screen with shop_image_id (NO fallback to welcome)
     from utils import render_screen
     await render_screen(
@@ -63,36 +75,62 @@ async def shop_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     )
 
 
+def _stock_overview_pages(rows: list, currency: str) -> list[str]:
+    """Lay out (category, product) rows as page bodies of at most STOCK_PAGE_CHARS."""
+    pages: list[str] = []
+    lines: list[str] = []
+    size = 0
+    current_cat = None
+    for cat, p in rows:
+        block = [
+            f"• {p['name_html']} — {currency} {_price_display(p['price'])}"
+            f" | {format_stock(p.get('stock', -1))}"
+        ]
+        new_cat = cat["id"] != current_cat
+        if new_cat:
+            block.insert(0, f"📂 <b>{cat['title_html']}</b>")
+        block_size = sum(len(line) + 1 for line in block) + 1
+        if lines and size + block_size > STOCK_PAGE_CHARS:
+            pages.append("\n".join(lines))
+            lines, size = [], 0
+            if not new_cat:
+                block.insert(0, f"📂 <b>{cat['title_html']}</b> (cont.)")
+        if new_cat and lines:
+            block.insert(0, "")
+        lines.extend(block)
+        size += sum(len(line) + 1 for line in block)
+        current_cat = cat["id"]
+    if lines:
+        pages.append("\n".join(lines))
+    return pages
+
+
 async def stock_overview_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Show stock overview for all products across categories."""
+    """Show stock overview for all products across categories, paged to fit a message."""
     query = update.callback_query
     await query.answer()
 
-    cats = await get_active_categories()
-    if not cats:
-        await safe_edit(query, "❌ No categories available.", reply_markup=back_kb("shop"))
+    parts = query.data.split(":")
+    page = int(parts[1]) if len(parts) > 1 else 1
+
+    catalog = await get_catalog()
+    rows = catalog.stock_overview()
+    if not rows:
+        await safe_edit(query, "❌ No products found.", reply_markup=back_kb("shop"))
         return
 
     currency = await get_setting("currency", "Rs")
+    pages = _screens.get_or_render(
+        ("stock", None, None, currency, catalog.version),
+        lambda: _stock_overview_pages(rows, currency),
+    )
+    page = min(max(1, page), len(pages))
 
-    lines = ["📊 <b>Stock Overview</b>", separator(), ""]
-    for cat in cats:
-        cat_name = f"{cat.get('emoji', '📂')} {cat['name']}"
-        products = await get_products_by_category(cat["id"], limit=200)
-        if not products:
-            continue
-        lines.append(f"📂 <b>{html_escape(cat_name)}</b>")
-        for p in products:
-            stock_text = format_stock(p.get("stock", -1))
-            price = p["price"]
-            price_display = int(price) if price == int(price) else price
-            lines.append(
-                f"• {html_escape(p['name'])} — {currency} {price_display} | {stock_text}"
-            )
-        lines.append("")
-
-    text = "\n".join(lines) if lines else "❌ No products found."
-    await safe_edit(query, text, reply_markup=back_kb("shop"))
+    title = "📊 <b>Stock Overview</b>"
+    if len(pages) > 1:
+        title += f" ({page}/{len(pages)})"
+    text = f"{title}\n{separator()}\n\n{pages[page - 1]}"
+    await safe_edit(query, text, reply_markup=stock_overview_kb(page, len(pages)))
 
 
 async def category_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -115,38 +153,45 @@ async def category_page_handler(update: Update, context: ContextTypes.DEFAULT_TY
     await _show_category_page(query, cat_id, page=page)
 
 
+def _render_category_page(catalog, cat_id: int, page: int, currency: str) -> tuple:
+    cat = catalog.category(cat_id)
+    products = catalog.products_in(cat_id)
+    text = (
+        f"📂 <b>{cat['title_html']}</b>\n"
+        f"📦 {catalog.product_count(cat_id)} products:"
+    )
+    if not products:
+        return text + "\n\n🙅 No products in this category yet.", back_kb("shop")
+    return text, products_kb(
+        products=products,
+        cat_id=cat_id,
+        currency=currency,
+        page=page,
+        per_page=PER_PAGE,
+    )
+
+
 async def _show_category_page(query, cat_id: int, page: int = 1) -> None:
     """Internal: render category page with products.
 
     Uses category image as a banner if available.
     """
-    cat = await get_category(cat_id)
+    catalog = await get_catalog()
+    cat = catalog.category(cat_id)
     if not cat:
         await safe_edit(query, "❌ Category not found.", reply_markup=back_kb("shop"))
         return
 
     currency = await get_setting("currency", "Rs")
-    total_count = await get_product_count_in_category(cat_id)
-    products = await get_products_by_category(cat_id, limit=200)
-
-    text = (
-        f"📂 <b>{html_escape(cat['emoji'])} {html_escape(cat['name'])}</b>\n"
-        f"📦 {total_count} products:"
+    text, kb = _screens.get_or_render(
+        ("category", cat_id, page, currency, catalog.version),
+        lambda: _render_category_page(catalog, cat_id, page, currency),
     )
 
-    if not products:
-        text += "\n\n🙅 No products in this category yet."
-        await safe_edit(query, text, reply_markup=back_kb("shop"))
+    if not catalog.products_in(cat_id):
+        await safe_edit(query, text, reply_markup=kb)
         return
 
-    kb = products_kb(
-        products=products,
-        cat_id=cat_id,
-        currency=currency,
-        page=page,
-        per_page=PER_PAGE,
-    )
-
     # If category has an image, use it as banner; otherwise just edit text
     cat_image_id = cat.get("image_id")
     if cat_image_id:
@@ -168,44 +213,46 @@ async def _show_category_page(query, cat_id: int, page: int = 1) -> None:
     await safe_edit(query, text, reply_markup=kb)
 
 
+def _render_product(catalog, product_id: int, currency: str) -> tuple:
+    product = catalog.product(product_id)
+    cat = catalog.category(product["category_id"])
+    cat_name = cat["title_html"] if cat else "Unknown"
+    desc = html_escape(product["description"]) if product["description"] else "No description."
+
+    text = (
+        f"🏷️ <b>{product['name_html']}</b>\n"
+        f"{separator()}\n"
+        f"📝 {desc}\n\n"
+        f"💰 Price: <b>{currency} {_price_display(product['price'])}</b>\n"
+        f"📊 Stock: {format_stock(product['stock'])}\n"
+        f"📂 Category: {cat_name}"
+    )
+    media = catalog.media(product_id)
+    kb = product_detail_kb(
+        product=product,
+        has_faq=bool(catalog.faqs(product_id)),
+        has_media=media if media else None,
+    )
+    return text, kb
+
+
 async def product_detail_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show full product details."""
     query = update.callback_query
     await query.answer()
 
     product_id = int(query.data.split(":")[1])
-    product = await get_product(product_id)
+    catalog = await get_catalog()
+    product = catalog.product(product_id)
 
     if not product:
         await safe_edit(query, "❌ Product not found.", reply_markup=back_kb("shop"))
         return
 
     currency = await get_setting("currency", "Rs")
-    cat = await get_category(product["category_id"])
-    cat_name = f"{cat['emoji']} {cat['name']}" if cat else "Unknown"
-    stock_text = format_stock(product["stock"])
-
-    price = product["price"]
-    price_display = int(price) if price == int(price) else price
-
-    desc = html_escape(product["description"]) if product["description"] else "No description."
-
-    text = (
-        f"🏷️ <b>{html_escape(product['name'])}</b>\n"
-        f"{separator()}\n"
-        f"📝 {desc}\n\n"
-        f"💰 Price: <b>{currency} {price_display}</b>\n"
-        f"📊 Stock: {stock_text}\n"
-        f"📂 Category: {html_escape(cat_name)}"
-    )
-
-    faqs = await get_product_faqs(product_id)
-    media = await get_product_media(product_id)
-
-    kb = product_detail_kb(
-        product=product,
-        has_faq=bool(faqs),
-        has_media=media if media else None,
+    text, kb = _screens.get_or_render(
+        ("product", product_id, None, currency, catalog.version),
+        lambda: _render_product(catalog, product_id, currency),
     )
 
     # Try sending product image if available
@@ -234,16 +281,17 @@ async def product_faq_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer()
 
     product_id = int(query.data.split(":")[1])
-    product = await get_product(product_id)
+    catalog = await get_catalog()
+    product = catalog.product(product_id)
 
     if not product:
         await safe_edit(query, "❌ Product not found.", reply_markup=back_kb("shop"))
         return
 
-    faqs = await get_product_faqs(product_id)
+    faqs = catalog.faqs(product_id)
 
     text = (
-        f"❓ <b>FAQ — {html_escape(product['name'])}</b>\n"
+        f"❓ <b>FAQ — {product['name_html']}</b>\n"
         f"{separator()}\n"
     )
 
@@ -268,12 +316,12 @@ async def product_media_handler(update: Update, context: ContextTypes.DEFAULT_TY
     product_id = int(parts[1])
     media_type = parts[2]
 
-    product = await get_product(product_id)
-    if not product:
+    catalog = await get_catalog()
+    if not catalog.product(product_id):
         await safe_edit(query, "❌ Product not found.", reply_markup=back_kb("shop"))
         return
 
-    media_items = await get_product_media(product_id)
+    media_items = catalog.media(product_id)
     # Filter by type
     media_items = [m for m in media_items if m["media_type"] == media_type]
 
@@ -301,7 +349,7 @@ async def add_to_cart_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     user_id = update.effective_user.id
     product_id = int(query.data.split(":")[1])
-    product = await get_product(product_id)
+    product = (await get_catalog()).product(product_id)
 
     if not product:
         await query.answer("❌ Product not found.", show_alert=True)
@@ -1,6 +1,5 @@
 """NanoStore order handlers — checkout, coupon, balance, payment, proof upload."""
 
-import json
 import logging
 import asyncio
 from telegram import Update, InlineKeyboardButton as Btn, InlineKeyboardMarkup
@@ -14,7 +13,8 @@ from database import (
     get_setting,
     create_order,
     get_order,
-    get_user_orders,
+    get_order_items,
+    get_user_orders_page,
     get_user_order_count,
     update_order,
     get_user_balance,
@@ -26,7 +26,7 @@ from database import (
     create_payment_proof,
     decrement_stock,
     add_action_log,
-    get_db,
+    transaction,
     get_product,
 )
 from utils import (
@@ -50,6 +50,10 @@ logger = logging.getLogger(__name__)
 ORDERS_PER_PAGE: int = 10
 
 
+class _CheckoutRejected(Exception):
+    """Raised inside the checkout transaction to roll back with a user-facing reason."""
+
+
 # ════════════════════════ CHECKOUT ════════════════════════
 
 async def checkout_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -236,7 +240,7 @@ async def apply_balance_handler(update: Update, context: ContextTypes.DEFAULT_TY
     bal_display = int(balance_used) if balance_used == int(balance_used) else f"{balance_used:.2f}"
     await query.answer(f"💳 Balance {currency} {bal_display} applied!", show_alert=True)
 
-    items = json.loads(order["items_json"])
+    items = await get_order_items(order_id)
     await _show_checkout(query, order_id, items, original_total, discount, balance_used, currency, user_id)
 
 
@@ -264,52 +268,42 @@ async def confirm_order_handler(update: Update, context: ContextTypes.DEFAULT_TY
     balance_used = temp.get("balance_used", 0.0)
     coupon_code = temp.get("coupon_code")
 
-    # Wrap all operations in a transaction
-    db = await get_db()
+    items = await get_order_items(order_id)
+
+    # Wrap all operations in a transaction on its own connection
     try:
-        await db.execute("BEGIN TRANSACTION")
-        
-        # Deduct balance if used (don't commit yet)
-        if balance_used > 0:
-            success = await update_user_balance(user_id, -balance_used, commit=False)
-            if not success:
-                await db.execute("ROLLBACK")
-                await query.answer("❌ Insufficient balance. Please try again.", show_alert=True)
-                return
-
-        # Use coupon (don't commit yet)
-        if coupon_code:
-            success = await use_coupon(coupon_code, commit=False)
-            if not success:
-                await db.execute("ROLLBACK")
-                await query.answer("❌ Coupon no longer valid or max uses reached.", show_alert=True)
-                return
-
-        # Decrement stock with validation (don't commit yet)
-        items = json.loads(order["items_json"])
-        for item in items:
-            success = await decrement_stock(item["product_id"], item["quantity"], commit=False)
-            if not success:
-                # Rollback if insufficient stock
-                await db.execute("ROLLBACK")
-                prod = await get_product(item["product_id"])
-                prod_name = prod["name"] if prod else f"Product #{item['product_id']}"
-                await query.answer(f"❌ Insufficient stock for {prod_name}. Please update your cart.", show_alert=True)
-                return
-
-        # Update order total
-        final_total = max(0, order["total"] - discount - balance_used)
-        await update_order(order_id, status="confirmed")
-
-        # Clear cart
-        await clear_cart(user_id)
-        
-        # Commit transaction (all operations succeed together)
-        await db.commit()
-        
+        async with transaction() as conn:
+            # Deduct balance if used
+            if balance_used > 0:
+                if not await update_user_balance(user_id, -balance_used, conn=conn):
+                    raise _CheckoutRejected("❌ Insufficient balance. Please try again.")
+
+            # Use coupon
+            if coupon_code:
+                if not await use_coupon(coupon_code, conn=conn):
+                    raise _CheckoutRejected("❌ Coupon no longer valid or max uses reached.")
+
+            # Decrement stock with validation
+            for item in items:
+                if not await decrement_stock(item["product_id"], item["quantity"], conn=conn):
+                    prod = await get_product(item["product_id"])
+                    prod_name = prod["name"] if prod else f"Product #{item['product_id']}"
+                    raise _CheckoutRejected(
+                        f"❌ Insufficient stock for {prod_name}. Please update your cart."
+                    )
+
+            # Update order total
+            final_total = max(0, order["total"] - discount - balance_used)
+            await update_order(order_id, conn=conn, status="confirmed")
+
+            # Clear cart
+            await clear_cart(user_id, conn=conn)
+            # Leaving the block commits all operations together
+
+    except _CheckoutRejected as e:
+        await query.answer(str(e), show_alert=True)
+        return
     except Exception as e:
-        # Rollback on any error
-        await db.execute("ROLLBACK")
         logger.error(f"Order confirmation failed for order {order_id}: {e}", exc_info=True)
         await query.answer("❌ Order failed. Please try again.", show_alert=True)
         return
@@ -532,7 +526,7 @@ async def my_orders_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.answer()
 
     user_id = update.effective_user.id
-    await _show_orders_page(query, user_id, page=1)
+    await _show_orders_page(query, user_id)
 
 
 async def orders_page_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -541,17 +535,18 @@ async def orders_page_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer()
 
     user_id = update.effective_user.id
-    page = int(query.data.split(":")[1])
-    await _show_orders_page(query, user_id, page=page)
+    cursor = query.data.split(":", 1)[1]
+    await _show_orders_page(query, user_id, cursor=cursor)
 
 
-async def _show_orders_page(query, user_id: int, page: int = 1) -> None:
+async def _show_orders_page(query, user_id: int, cursor: str = None) -> None:
     """Internal: render orders list page.
     
-    Uses render_screen with orders_image_id.
+    Uses render_screen with orders_image_id. ``cursor`` comes from the
+    Prev/Next buttons; unknown or stale cursors fall back to the first page.
     """
-    offset = (page - 1) * ORDERS_PER_PAGE
-    user_orders = await get_user_orders(user_id, limit=ORDERS_PER_PAGE, offset=offset)
+    page = await get_user_orders_page(user_id, cursor=cursor, limit=ORDERS_PER_PAGE)
+    user_orders = page["items"]
     currency = await get_setting("currency", "Rs")
 
     text = f"📦 <b>My Orders</b>\n{separator()}\n"
@@ -571,7 +566,10 @@ async def _show_orders_page(query, user_id: int, page: int = 1) -> None:
         bot=query.message.get_bot(),
         chat_id=query.message.chat_id,
         text=text,
-        reply_markup=orders_kb(user_orders, currency=currency, page=page, per_page=ORDERS_PER_PAGE),
+        reply_markup=orders_kb(
+            user_orders, currency=currency,
+            prev_cursor=page["prev"], next_cursor=page["next"],
+        ),
         image_setting_key="orders_image_id"
     )
 
@@ -589,7 +587,7 @@ async def order_detail_handler(update: Update, context: ContextTypes.DEFAULT_TYP
         return
 
     currency = await get_setting("currency", "Rs")
-    items = json.loads(order["items_json"]) if order["items_json"] else []
+    items = await get_order_items(order_id)
     emoji = status_emoji(order["status"])
     pay_emoji = status_emoji(order["payment_status"])
 
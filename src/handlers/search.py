@@ -47,7 +47,8 @@ async def search_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return
 
-    results = await search_products(query_text)
+    # One extra row tells us whether there are more than we show
+    results = await search_products(query_text, limit=MAX_RESULTS + 1)
     currency = await get_setting("currency", "Rs")
 
     if not results:
@@ -66,10 +67,12 @@ async def search_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     display = results[:MAX_RESULTS]
+    has_more = len(results) > MAX_RESULTS
+    found = f"{MAX_RESULTS}+" if has_more else str(len(results))
     text = (
         f"🔍 <b>Search Results</b>\n"
         f"{separator()}\n"
-        f"📦 Found <b>{len(results)}</b> result(s) for \"<b>{html_escape(query_text)}</b>\":"
+        f"📦 Found <b>{found}</b> result(s) for \"<b>{html_escape(query_text)}</b>\":"
     )
 
     rows = []
@@ -80,8 +83,8 @@ async def search_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
             callback_data=f"prod:{p['id']}",
         )])
 
-    if len(results) > MAX_RESULTS:
-        text += f"\n\n<i>Showing first {MAX_RESULTS} of {len(results)} results.</i>"
+    if has_more:
+        text += f"\n\n<i>Showing the {MAX_RESULTS} best matches. Refine your search to narrow it down.</i>"
 
     rows.append([Btn("🔍 Search Again", callback_data="search")])
     rows.append([Btn("◀️ Main Menu", callback_data="main_menu")])
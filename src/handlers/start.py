@@ -5,11 +5,8 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from config import ADMIN_ID
 from database import (
-    ensure_user, is_user_banned, get_setting, add_action_log,
-    get_user_balance, get_user_total_spent, get_user_total_deposited,
-    get_user_join_date, get_user_pending_orders, get_user_completed_orders,
-    get_user_referral_count, get_spin_status, get_user_order_count,
-    create_referral, add_points
+    ensure_user, is_user_banned, get_setting, get_settings, add_action_log,
+    get_user_profile, create_referral, add_points
 )
 from utils import safe_edit, html_escape, separator, send_typing
 from utils import main_menu_kb, back_kb
@@ -137,19 +134,27 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 async def _build_welcome_text(user, context: ContextTypes.DEFAULT_TYPE) -> str:
     """Build detailed welcome message text with all user stats."""
-    store_name = await get_setting("bot_name", "NanoStore")
-    currency = await get_setting("currency", "Rs")
+    settings = await get_settings({"bot_name": "NanoStore", "currency": "Rs"})
+    store_name = settings["bot_name"]
+    currency = settings["currency"]
     
-    # Get all user stats
-    balance = await get_user_balance(user.id)
-    total_spent = await get_user_total_spent(user.id)
-    total_deposited = await get_user_total_deposited(user.id)
-    join_date = await get_user_join_date(user.id)
-    total_orders = await get_user_order_count(user.id)
-    completed_orders = await get_user_completed_orders(user.id)
-    pending_orders = await get_user_pending_orders(user.id)
-    referral_count = await get_user_referral_count(user.id)
-    spin_status = await get_spin_status(user.id)
+    # Get all user stats in one query
+    profile = await get_user_profile(user.id)
+    if profile:
+        balance = profile["balance"]
+        total_spent = profile["total_spent"]
+        total_deposited = profile["total_deposited"]
+        join_date = profile["join_date"]
+        total_orders = profile["total_orders"]
+        completed_orders = profile["completed_orders"]
+        pending_orders = profile["pending_orders"]
+        referral_count = profile["referral_count"]
+        spin_status = profile["spin_status"]
+    else:
+        balance = total_spent = total_deposited = 0.0
+        join_date = "Unknown"
+        total_orders = completed_orders = pending_orders = referral_count = 0
+        spin_status = {"available": True, "hours_left": 0, "mins_left": 0}
     
     # Format values
     full_name = user.first_name or "User"
@@ -264,7 +269,7 @@ async def verify_join_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     from middleware import check_membership
     
     # Check if user is now a member
-    if await check_membership(update, context):
+    if await check_membership(update, context, fresh=True):
         await query.answer("✅ Verified! Welcome!", show_alert=True)
         
         # Redirect to main menu
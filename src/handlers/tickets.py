@@ -9,7 +9,7 @@ from database import (
     get_ticket,
     get_user_tickets,
     get_open_tickets,
-    get_all_tickets,
+    get_tickets_page,
     add_ticket_reply,
     get_ticket_replies,
     close_ticket,
@@ -18,7 +18,7 @@ from database import (
     add_action_log,
 )
 from utils import safe_edit, html_escape, separator, log_action
-from utils import back_kb
+from utils import back_kb, admin_tickets_kb
 
 logger = logging.getLogger(__name__)
 
@@ -328,21 +328,16 @@ async def admin_tickets_all_handler(update: Update, context: ContextTypes.DEFAUL
     if update.effective_user.id != ADMIN_ID:
         return
 
-    tickets = await get_all_tickets(limit=30)
+    cursor = query.data.split(":", 1)[1] if ":" in query.data else None
+    page = await get_tickets_page(cursor=cursor, limit=30)
+    tickets = page["items"]
 
-    text = f"🎫 <b>All Tickets</b>\n{separator()}\n\n📊 Total: {len(tickets)} tickets"
+    text = f"🎫 <b>All Tickets</b>\n{separator()}\n\n📊 {len(tickets)} tickets on this page"
 
-    rows = []
-    for t in tickets:
-        emoji = "🟢" if t["status"] == "open" else "🔴"
-        rows.append([Btn(
-            f"{emoji} #{t['id']} — {t['subject'][:25]}",
-            callback_data=f"adm_ticket:{t['id']}",
-        )])
-
-    rows.append([Btn("◀️ Tickets", callback_data="adm_tickets")])
-
-    await safe_edit(query, text, reply_markup=InlineKeyboardMarkup(rows))
+    await safe_edit(
+        query, text,
+        reply_markup=admin_tickets_kb(tickets, page["prev"], page["next"], back="adm_tickets"),
+    )
 
 
 async def admin_ticket_detail_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -8,7 +8,7 @@ from database import (
     get_user_balance,
     get_setting,
     create_topup,
-    get_user_topups,
+    get_user_topups_page,
     update_topup,
     get_payment_methods,
     get_payment_method,
@@ -17,6 +17,7 @@ from database import (
 from utils import safe_edit, html_escape, separator, status_emoji
 from utils import (
     wallet_kb,
+    wallet_history_kb,
     wallet_topup_amounts_kb,
     wallet_pay_methods_kb,
     back_kb,
@@ -276,7 +277,9 @@ async def wallet_history_handler(update: Update, context: ContextTypes.DEFAULT_T
     await query.answer()
 
     user_id = update.effective_user.id
-    topups = await get_user_topups(user_id, limit=10)
+    cursor = query.data.split(":", 1)[1] if ":" in query.data else None
+    page = await get_user_topups_page(user_id, cursor=cursor, limit=10)
+    topups = page["items"]
     currency = await get_setting("currency", "Rs")
 
     text = f"📜 <b>Top-Up History</b>\n{separator()}\n"
@@ -292,4 +295,4 @@ async def wallet_history_handler(update: Update, context: ContextTypes.DEFAULT_T
             if t.get("admin_note"):
                 text += f"\n   Note: {html_escape(t['admin_note'])}"
 
-    await safe_edit(query, text, reply_markup=back_kb("wallet"))
+    await safe_edit(query, text, reply_markup=wallet_history_kb(page["prev"], page["next"]))
@@ -1,4 +1,6 @@
 """Middleware module."""
-from .membership_check import check_membership, enforce_membership
+from .membership_check import (
+    check_membership, enforce_membership, invalidate_membership, chat_member_handler,
+)
 
-__all__ = ['check_membership', 'enforce_membership']
+__all__ = ['check_membership', 'enforce_membership', 'invalidate_membership', 'chat_member_handler']
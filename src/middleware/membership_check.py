@@ -1,19 +1,97 @@
-"""Membership verification middleware - Force users to join channel before using bot."""
+"""Membership verification middleware - Force users to join channel before using bot.
 
+Results of get_chat_member are cached per (user_id, channel_id):
+members for FORCE_JOIN_CACHE_TTL seconds, non-members briefly so the
+"I've Joined" button re-checks soon. Channels are checked concurrently.
+A user leaving (or being removed from) a channel the bot administers
+arrives as a chat_member update and drops that user's cached results.
+"""
+
+import asyncio
 import logging
+import time
 from telegram import Update, ChatMember
 from telegram.ext import ContextTypes
 from telegram.error import TelegramError
+from config import FORCE_JOIN_CACHE_TTL
 from database import get_force_join_channels
 from utils import force_join_kb
 
 logger = logging.getLogger(__name__)
 
+# Seconds a "not joined" result is cached
+NOT_MEMBER_TTL: int = 15
+
+# Expired entries are swept once the cache grows past this
+MAX_CACHED: int = 50_000
+
+_NOT_JOINED = (ChatMember.LEFT, ChatMember.BANNED)
+
+# (user_id, channel_id) -> (is_member, expires_at)
+_member_cache: dict[tuple[int, str], tuple[bool, float]] = {}
+
+
+def invalidate_membership(user_id: int) -> None:
+    """Forget cached membership results for a user."""
+    for key in [k for k in _member_cache if k[0] == user_id]:
+        del _member_cache[key]
+
+
+async def _is_member(bot, user_id: int, channel: dict) -> bool:
+    try:
+        member = await bot.get_chat_member(chat_id=channel["channel_id"], user_id=user_id)
+    except TelegramError as e:
+        # If we can't check (privacy settings, bot not admin, etc.), assume not joined
+        logger.warning(f"Failed to check membership for user {user_id} in {channel['name']}: {e}")
+        return False
+
+    # Check if user is actually a member
+    if member.status in _NOT_JOINED:
+        logger.info(f"User {user_id} not member of {channel['name']} (status: {member.status})")
+        return False
+
+    now = time.monotonic()
+    if len(_member_cache) >= MAX_CACHED:
+        for key in [k for k, (_, exp) in _member_cache.items() if exp <= now]:
+            del _member_cache[key]
+    _member_cache[(user_id, channel["channel_id"])] = (True, now + FORCE_JOIN_CACHE_TTL)
+    return True
+
+
+async def _missing_channels(
+    bot, user_id: int, channels: list, fresh: bool = False
+) -> tuple[list, bool]:
+    """
+    Channels the user hasn't joined, and whether Telegram was asked.
+
+    fresh=True ignores cached results (used by the "I've Joined" button).
+    """
+    now = time.monotonic()
+    missing, to_check = [], []
+    for channel in channels:
+        cached = None if fresh else _member_cache.get((user_id, channel["channel_id"]))
+        if cached and cached[1] > now:
+            if not cached[0]:
+                missing.append(channel)
+        else:
+            to_check.append(channel)
+
+    if to_check:
+        results = await asyncio.gather(*(_is_member(bot, user_id, ch) for ch in to_check))
+        expires = time.monotonic() + NOT_MEMBER_TTL
+        for channel, ok in zip(to_check, results):
+            if not ok:
+                missing.append(channel)
+                _member_cache[(user_id, channel["channel_id"])] = (False, expires)
+    return missing, bool(to_check)
+
 
-async def check_membership(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+async def check_membership(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, fresh: bool = False
+) -> bool:
     """
     Check if user is member of all required channels.
-    
+
     Returns:
         True if user is member of all channels (or no channels configured)
         False if user needs to join channels
@@ -21,83 +99,68 @@ async def check_membership(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     user = update.effective_user
     if not user:
         return True
-    
+
     # Get required channels
     channels = await get_force_join_channels()
     if not channels:
         return True  # No channels required
-    
-    # Check membership in each channel
-    not_joined = []
-    for channel in channels:
-        try:
-            member = await context.bot.get_chat_member(
-                chat_id=channel["channel_id"],
-                user_id=user.id
-            )
-            
-            # Check if user is actually a member
-            if member.status in [ChatMember.LEFT, ChatMember.KICKED, ChatMember.BANNED]:
-                not_joined.append(channel)
-                logger.info(f"User {user.id} not member of {channel['name']} (status: {member.status})")
-        
-        except TelegramError as e:
-            # If we can't check (privacy settings, bot not admin, etc.), assume not joined
-            logger.warning(f"Failed to check membership for user {user.id} in {channel['name']}: {e}")
-            not_joined.append(channel)
-    
+
+    not_joined, _ = await _missing_channels(context.bot, user.id, channels, fresh=fresh)
     if not_joined:
         # User needs to join channels
         logger.info(f"User {user.id} needs to join {len(not_joined)} channel(s)")
         return False
-    
+
     return True
 
 
 async def enforce_membership(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """
     Enforce channel membership. If user is not a member, show join prompt.
-    
+
     Returns:
         True if user is member (can proceed)
         False if user needs to join (action blocked)
     """
     user = update.effective_user
-    is_member = await check_membership(update, context)
-    
-    # Log membership check to channel
+    if not user:
+        return True
+
+    channels = await get_force_join_channels()
+    if not channels:
+        return True  # No channels required
+
+    not_joined, checked = await _missing_channels(context.bot, user.id, channels)
+    is_member = not not_joined
+
+    # Log membership check to channel (only when Telegram was actually asked)
     channel_logger = context.bot_data.get('channel_logger')
-    if channel_logger and user:
-        channels = await get_force_join_channels()
-        channel_name = channels[0]["name"] if channels else "Unknown"
+    if channel_logger and checked:
         status = "member" if is_member else "not_member"
-        
+
         await channel_logger.log_membership_check(
             user_id=user.id,
             full_name=user.full_name or "",
             username=user.username or "",
             status=status,
-            channel_name=channel_name
+            channel_name=channels[0]["name"]
         )
-    
+
     if is_member:
         return True
-    
-    # Get channels user needs to join
-    channels = await get_force_join_channels()
-    
+
     # Build message
     text = (
         "📢 <b>Join Required Channels</b>\n\n"
         "To use this bot, you must join our channel(s).\n"
         "Click the button(s) below to join, then click 'I've Joined'."
     )
-    
+
     # Send or edit message with join buttons
     if update.callback_query:
         query = update.callback_query
         await query.answer("⚠️ Please join our channel first!", show_alert=True)
-        
+
         try:
             await query.message.edit_text(
                 text=text,
@@ -111,12 +174,23 @@ async def enforce_membership(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 reply_markup=force_join_kb(channels),
                 parse_mode="HTML"
             )
-    
+
     elif update.message:
         await update.message.reply_text(
             text=text,
             reply_markup=force_join_kb(channels),
             parse_mode="HTML"
         )
-    
+
     return False
+
+
+async def chat_member_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Drop cached membership when a user's status changes in a channel the bot administers."""
+    change = update.chat_member
+    if not change:
+        return
+    user = change.new_chat_member.user
+    invalidate_membership(user.id)
+    if change.new_chat_member.status in _NOT_JOINED:
+        logger.info(f"User {user.id} left {change.chat.title or change.chat.id}")
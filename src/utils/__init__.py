@@ -1,6 +1,8 @@
 """Utilities module."""
 from .helpers import *
 from .keyboards import *
+from .screen_cache import ScreenCache
+from .rate_limiter import OutboundRateLimiter, Priority
 from .activity_logger import (
     log_activity, log_update, log_callback_click, log_command,
     log_db_action, log_setting_update, log_order_action,
@@ -15,14 +17,19 @@ __all__ = [
     'log_action', 'send_typing', 'notify_log_channel', 'auto_delete',
     # From keyboards
     'welcome_kb', 'main_menu_kb', 'home_kb', 'back_home_kb', 'back_kb', 'force_join_kb',
-    'categories_kb', 'products_kb', 'product_detail_kb', 'faq_kb',
+    'categories_kb', 'products_kb', 'stock_overview_kb', 'product_detail_kb', 'faq_kb',
     'cart_kb', 'empty_cart_kb', 'checkout_kb', 'payment_methods_kb',
-    'orders_kb', 'order_detail_kb', 'wallet_kb', 'wallet_topup_amounts_kb', 'wallet_pay_methods_kb',
+    'orders_kb', 'order_detail_kb', 'wallet_kb', 'wallet_history_kb', 'wallet_topup_amounts_kb', 'wallet_pay_methods_kb',
     'admin_kb', 'admin_cats_kb', 'admin_cat_detail_kb', 'admin_prods_kb', 'admin_prod_detail_kb',
     'admin_orders_kb', 'admin_order_detail_kb', 'admin_users_kb', 'admin_user_detail_kb',
     'admin_coupons_kb', 'admin_payments_kb', 'admin_proofs_kb', 'admin_proof_detail_kb',
     'admin_tickets_kb', 'admin_fj_kb', 'admin_settings_kb', 'admin_broadcast_confirm_kb',
+    'admin_broadcast_progress_kb',
     'admin_content_kb', 'admin_content_screen_kb', 'CONTENT_SCREENS',
+    # From screen_cache
+    'ScreenCache',
+    # From rate_limiter
+    'OutboundRateLimiter', 'Priority',
     # From activity_logger
     'log_activity', 'log_update', 'log_callback_click', 'log_command',
     'log_db_action', 'log_setting_update', 'log_order_action',
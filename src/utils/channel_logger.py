@@ -1,44 +1,103 @@
-"""Channel Activity Logger - Post all bot activities to Telegram channel for audit trail."""
+"""Channel Activity Logger - Post all bot activities to Telegram channel for audit trail.
+
+log_* calls never wait on Telegram: events go into a bounded in-memory
+queue and the call returns at once. A background worker (start() / stop())
+packs queued events into as few channel messages as possible, up to
+Telegram's 4096-character limit, and sends when a message is full or
+FLUSH_INTERVAL seconds after the first event arrived. Failed sends are
+retried with backoff. When the queue is full the oldest event of the
+lowest priority is dropped, so clicks go before orders and errors.
+"""
 
 import logging
 import asyncio
+import itertools
+from collections import deque
 from datetime import datetime
-from typing import Optional, Dict, Any
+from html import escape
+from typing import Optional, Dict
 from telegram import Bot
-from telegram.error import TelegramError
+from telegram.error import BadRequest, Forbidden, TelegramError
 import pytz
 
+from .rate_limiter import Priority
+
 logger = logging.getLogger(__name__)
 
 # Timezone for timestamps
 TIMEZONE = pytz.timezone('Asia/Karachi')
 
+# Event priorities: under pressure the lowest-priority events are dropped first
+PRIORITY_LOW = 0      # clicks, messages, navigation, membership checks
+PRIORITY_NORMAL = 1   # starts, orders, top-ups, balances, admin / config actions
+PRIORITY_HIGH = 2     # errors, startup
+
+# Telegram's message size limit; events are packed up to this
+MAX_MESSAGE_CHARS: int = 4096
+EVENT_SEPARATOR: str = "\n\n"
+
+# Events held while waiting to be sent
+QUEUE_SIZE: int = 1000
+
+# Seconds to keep collecting events before sending a partial message
+FLUSH_INTERVAL: float = 3.0
+
+# Send attempts per message (backoff 1s, 2s, 4s, ... capped at 30s)
+MAX_ATTEMPTS: int = 5
+
 
 class ChannelActivityLogger:
     """
     Centralized logger that posts all bot activities to a Telegram channel.
     Provides audit trail for owner to see what happened, when, by whom.
     """
-    
-    def __init__(self, bot: Bot, channel_id: int = None, enabled: bool = True):
+
+    def __init__(
+        self,
+        bot: Bot,
+        channel_id: int = None,
+        enabled: bool = True,
+        queue_size: int = QUEUE_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
         """
         Initialize channel logger.
-        
+
         Args:
             bot: Telegram bot instance
             channel_id: Channel ID to post logs (integer, typically negative for channels)
             enabled: Enable/disable channel logging
+            queue_size: Events held before the lowest-priority ones are dropped
+            flush_interval: Seconds to collect events before sending a partial message
         """
         self.bot = bot
         self.channel_id = channel_id
         self.enabled = enabled and channel_id is not None
-        self.failed_logs = []  # Queue for failed logs to retry
-        
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+
+        # priority -> deque of (seq, text); seq keeps events in order across priorities
+        self._queues: Dict[int, deque] = {
+            p: deque() for p in (PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH)
+        }
+        self._seq = itertools.count()
+        self._size = 0
+        self._chars = 0
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Event counters (`messages` counts channel posts)
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.messages = 0
+
         logger.info(f"🔧 Initializing ChannelActivityLogger:")
         logger.info(f"  - Channel ID: {channel_id} (type: {type(channel_id).__name__})")
         logger.info(f"  - Enabled: {self.enabled}")
         logger.info(f"  - Bot: {bot}")
-        
+
         # Validate channel ID
         if channel_id is None:
             logger.warning(f"⚠️ Channel ID is None - channel logging disabled")
@@ -50,62 +109,152 @@ class ChannelActivityLogger:
             logger.warning(f"⚠️ Channel ID {channel_id} is positive - channels usually have negative IDs")
         else:
             logger.info(f"✅ Channel ID format is valid")
-    
+
     def _get_timestamp(self) -> str:
         """Get current timestamp in Asia/Karachi timezone."""
         return datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S')
-    
+
     def _format_user(self, user_id: int, full_name: str = "", username: str = "") -> str:
         """Format user information."""
         parts = []
         if full_name:
-            parts.append(full_name)
+            parts.append(escape(full_name, quote=False))
         if username:
             parts.append(f"@{username}")
         parts.append(f"ID: {user_id}")
         return " | ".join(parts)
-    
-    async def _send_to_channel(self, message: str, parse_mode: str = "HTML") -> bool:
-        """
-        Send message to channel with retry logic.
-        
-        Returns:
-            True if successful, False otherwise
-        """
-        if not self.enabled:
-            logger.warning(f"Channel logger is DISABLED. enabled={self.enabled}, channel_id={self.channel_id}")
-            return False
-        
-        if self.channel_id is None:
-            logger.warning(f"Channel ID is None - cannot post")
-            return False
-        
-        logger.info(f"Attempting to post to channel {self.channel_id}: {message[:100]}...")
-        
+
+    def start(self) -> None:
+        """Start the background sender. Called from post_init."""
+        if self.enabled and self._worker is None:
+            self._closing = False
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Send what is still queued (for up to `timeout` seconds) and stop the worker."""
+        if self._worker is None:
+            return
+        self._closing = True
+        self._wakeup.set()
         try:
-            result = await self.bot.send_message(
-                chat_id=self.channel_id,
-                text=message,
-                parse_mode=parse_mode
-            )
-            logger.info(f"✅ Successfully posted to channel! Message ID: {result.message_id}")
-            return True
-        
-        except TelegramError as e:
-            logger.error(f"❌ Failed to post to channel {self.channel_id}: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
-            # Store failed log for retry
-            self.failed_logs.append({
-                'message': message,
-                'timestamp': self._get_timestamp(),
-                'error': str(e)
-            })
-            return False
-        
+            await asyncio.wait_for(self._worker, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Channel logger stopped with {self._size} event(s) unsent")
         except Exception as e:
-            logger.error(f"Unexpected error posting to channel: {e}")
-            return False
-    
+            logger.error(f"Channel logger worker failed: {e}")
+        self._worker = None
+
+    def stats(self) -> Dict[str, int]:
+        """Events sent, dropped, failed and queued, plus channel messages posted."""
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queued": self._size,
+            "messages": self.messages,
+        }
+
+    def _enqueue(self, message: str, priority: int = PRIORITY_NORMAL) -> None:
+        """Queue an event for the channel without waiting."""
+        if not self.enabled:
+            return
+
+        if self._size >= self.queue_size:
+            lowest = min(p for p, q in self._queues.items() if q)
+            if priority < lowest:
+                self.dropped += 1
+                return
+            _, old = self._queues[lowest].popleft()
+            self._size -= 1
+            self._chars -= len(old) + len(EVENT_SEPARATOR)
+            self.dropped += 1
+
+        self._queues[priority].append((next(self._seq), message))
+        self._size += 1
+        self._chars += len(message) + len(EVENT_SEPARATOR)
+        self._wakeup.set()
+
+    def _take_batch(self) -> list:
+        """Oldest queued events that fit in one message."""
+        batch, size = [], 0
+        while self._size:
+            queue = min((q for q in self._queues.values() if q), key=lambda q: q[0][0])
+            text = queue[0][1]
+            extra = len(text) + (len(EVENT_SEPARATOR) if batch else 0)
+            if batch and size + extra > MAX_MESSAGE_CHARS:
+                break
+            queue.popleft()
+            self._size -= 1
+            self._chars -= len(text) + len(EVENT_SEPARATOR)
+            batch.append(text)
+            size += extra
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._size:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Collect more events until a message is full or the interval ends
+            deadline = loop.time() + self.flush_interval
+            while not self._closing and self._chars < MAX_MESSAGE_CHARS:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            await self._deliver(self._take_batch())
+
+    async def _deliver(self, batch: list) -> bool:
+        """Post events as one channel message, retrying with backoff."""
+        text = EVENT_SEPARATOR.join(batch)
+        parse_mode = "HTML"
+        if len(text) > MAX_MESSAGE_CHARS:
+            # A single oversized event; cutting it could break its HTML
+            text, parse_mode = text[:MAX_MESSAGE_CHARS - 1] + "…", None
+
+        attempt = 0
+        while attempt < MAX_ATTEMPTS:
+            try:
+                await self.bot.send_message(
+                    chat_id=self.channel_id,
+                    text=text,
+                    parse_mode=parse_mode,
+                    rate_limit_args=Priority.LOG,
+                )
+                self.sent += len(batch)
+                self.messages += 1
+                return True
+            except BadRequest as e:
+                if parse_mode is None:
+                    logger.error(f"❌ Channel log rejected: {e}")
+                    break
+                logger.warning(f"Channel log HTML rejected ({e}); resending as plain text")
+                parse_mode = None
+            except Forbidden as e:
+                logger.error(f"❌ Cannot post to channel {self.channel_id}: {e}")
+                break
+            except TelegramError as e:
+                attempt += 1
+                delay = min(2 ** (attempt - 1), 30)
+                logger.warning(f"Failed to post to channel {self.channel_id} ({e}); retry in {delay}s")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                logger.error(f"Unexpected error posting to channel: {e}")
+                break
+
+        self.failed += len(batch)
+        return False
+
     async def log_user_start(self, user_id: int, full_name: str, username: str, args: list = None):
         """Log /start command."""
         message = (
@@ -118,12 +267,12 @@ class ChannelActivityLogger:
             message += f"🔗 Args: {' '.join(args)}\n"
         message += f"✅ Result: Welcome screen shown"
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_NORMAL)
     
     async def log_message_received(self, user_id: int, full_name: str, username: str, text: str):
         """Log text message received."""
         # Truncate long messages
-        display_text = text[:100] + "..." if len(text) > 100 else text
+        display_text = escape(text[:100] + "..." if len(text) > 100 else text, quote=False)
         
         message = (
             f"💬 <b>EVENT: MESSAGE_RECEIVED</b>\n"
@@ -133,7 +282,7 @@ class ChannelActivityLogger:
             f"✅ Result: Processed"
         )
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_LOW)
     
     async def log_button_click(
         self,
@@ -154,7 +303,7 @@ class ChannelActivityLogger:
             f"✅ Result: {result}"
         )
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_LOW)
     
     async def log_menu_navigation(
         self,
@@ -174,7 +323,7 @@ class ChannelActivityLogger:
             f"✅ Result: Navigation successful"
         )
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_LOW)
     
     async def log_membership_check(
         self,
@@ -196,7 +345,7 @@ class ChannelActivityLogger:
             f"✅ Result: {'Allowed' if status == 'member' else 'Blocked'}"
         )
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_LOW)
     
     async def log_order_event(
         self,
@@ -231,7 +380,7 @@ class ChannelActivityLogger:
             message += f"📝 Details: {details}\n"
         message += f"✅ Result: Order {event_type}"
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_NORMAL)
     
     async def log_topup_event(
         self,
@@ -263,7 +412,7 @@ class ChannelActivityLogger:
             message += f"📝 Details: {details}\n"
         message += f"✅ Result: Top-up {event_type}"
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_NORMAL)
     
     async def log_balance_change(
         self,
@@ -291,7 +440,7 @@ class ChannelActivityLogger:
             message += f"📝 Reason: {reason}\n"
         message += f"✅ Result: Balance updated"
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_NORMAL)
     
     async def log_admin_action(
         self,
@@ -313,7 +462,7 @@ class ChannelActivityLogger:
             message += f"📝 Details: {details}\n"
         message += f"✅ Result: Action completed"
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_NORMAL)
     
     async def log_config_change(
         self,
@@ -337,7 +486,7 @@ class ChannelActivityLogger:
             f"✅ Result: Configuration updated"
         )
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_NORMAL)
     
     async def log_error(
         self,
@@ -359,7 +508,7 @@ class ChannelActivityLogger:
             message += f"📍 Context: {context}\n"
         message += f"⚠️ Result: Error logged"
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_HIGH)
     
     async def log_maintenance_toggle(self, admin_id: int, enabled: bool):
         """Log maintenance mode toggle."""
@@ -374,12 +523,10 @@ class ChannelActivityLogger:
             f"✅ Result: Bot {'stopped' if enabled else 'resumed'}"
         )
         
-        await self._send_to_channel(message)
+        self._enqueue(message, PRIORITY_NORMAL)
     
     async def log_bot_startup(self):
         """Log bot startup."""
-        logger.info("📢 Attempting to log bot startup to channel...")
-        
         message = (
             f"🚀 <b>EVENT: BOT_STARTUP</b>\n"
             f"⏰ Time: {self._get_timestamp()}\n"
@@ -388,11 +535,7 @@ class ChannelActivityLogger:
             f"📍 Channel ID: {self.channel_id}"
         )
         
-        result = await self._send_to_channel(message)
-        if result:
-            logger.info("✅ Bot startup logged to channel successfully")
-        else:
-            logger.error("❌ Failed to log bot startup to channel")
+        self._enqueue(message, PRIORITY_HIGH)
     
     async def test_channel_post(self) -> bool:
         """Test channel posting capability."""
@@ -403,26 +546,10 @@ class ChannelActivityLogger:
             f"📊 Channel ID: {self.channel_id}"
         )
         
-        return await self._send_to_channel(message)
-    
-    async def retry_failed_logs(self):
-        """Retry sending failed logs."""
-        if not self.failed_logs:
-            return
-        
-        logger.info(f"Retrying {len(self.failed_logs)} failed logs...")
-        
-        retry_queue = self.failed_logs.copy()
-        self.failed_logs.clear()
-        
-        for log_entry in retry_queue:
-            success = await self._send_to_channel(log_entry['message'])
-            if not success:
-                # Still failing, keep in queue
-                self.failed_logs.append(log_entry)
-        
-        if self.failed_logs:
-            logger.warning(f"{len(self.failed_logs)} logs still failing after retry")
+        if not self.enabled:
+            return False
+        # Sent directly so the caller gets a real result
+        return await self._deliver([message])
 
 
 # Global instance (initialized in bot.py)
@@ -7,6 +7,8 @@ from telegram import Update, InlineKeyboardMarkup, Message
 from telegram.ext import ContextTypes
 from telegram.error import BadRequest, TelegramError
 
+from .rate_limiter import Priority
+
 logger = logging.getLogger(__name__)
 
 
@@ -169,28 +171,38 @@ async def resolve_image_id(
     
     Args:
         image_setting_key: The specific screen image key (e.g., "shop_image_id")
-        from_database_module: The database module to call get_setting from
+        from_database_module: The database module to call get_settings from
     
     Returns:
         file_id string or None
     """
+    # All tiers in one lookup
+    keys = {
+        "global_banner_image_id": "",
+        "use_global_image": "on",
+        "global_ui_image_id": "",
+    }
+    if image_setting_key:
+        keys[image_setting_key] = ""
+    values = await from_database_module.get_settings(keys)
+
     # Tier 1: Screen-specific image
     if image_setting_key:
-        screen_image = await from_database_module.get_setting(image_setting_key, "")
+        screen_image = values[image_setting_key]
         if screen_image:
             logger.debug(f"Using screen-specific image for {image_setting_key}")
             return screen_image
     
     # Tier 2: Global banner image
-    banner_image = await from_database_module.get_setting("global_banner_image_id", "")
+    banner_image = values["global_banner_image_id"]
     if banner_image:
         logger.debug(f"Using global banner image for {image_setting_key}")
         return banner_image
     
     # Tier 3: Global UI image (ALWAYS CHECK - this is the persistent welcome image)
-    use_global = await from_database_module.get_setting("use_global_image", "on")
+    use_global = values["use_global_image"]
     if use_global.lower() == "on":
-        global_image = await from_database_module.get_setting("global_ui_image_id", "")
+        global_image = values["global_ui_image_id"]
         if global_image:
             logger.debug(f"Using global UI image for {image_setting_key}")
             return global_image
@@ -371,6 +383,7 @@ async def log_action(bot, message: str, log_channel_id: Optional[int] = None) ->
             chat_id=channel,
             text=message,
             parse_mode="HTML",
+            rate_limit_args=Priority.LOG,
         )
     except Exception as e:
         logger.warning(f"Failed to log action: {e}")
@@ -19,6 +19,16 @@ CONTENT_SCREENS = [
 
 # ════════════════════════ COMMON ════════════════════════
 
+def _cursor_nav(prefix: str, prev_cursor: str = None, next_cursor: str = None) -> list:
+    """Prev/Next row for keyset-paginated lists ([] when there is one page)."""
+    nav = []
+    if prev_cursor:
+        nav.append(Btn("◀️ Prev", callback_data=f"{prefix}:{prev_cursor}"))
+    if next_cursor:
+        nav.append(Btn("Next ▶️", callback_data=f"{prefix}:{next_cursor}"))
+    return [nav] if nav else []
+
+
 def back_kb(target: str) -> InlineKeyboardMarkup:
     """Single back button."""
     label_map = {
@@ -143,6 +153,21 @@ def products_kb(
     return InlineKeyboardMarkup(rows)
 
 
+def stock_overview_kb(page: int = 1, total_pages: int = 1) -> InlineKeyboardMarkup:
+    """Stock overview pages."""
+    rows = []
+    if total_pages > 1:
+        nav = []
+        if page > 1:
+            nav.append(Btn("◀️ Prev", callback_data=f"stock_overview:{page - 1}"))
+        nav.append(Btn(f"📄 {page}/{total_pages}", callback_data="noop"))
+        if page < total_pages:
+            nav.append(Btn("Next ▶️", callback_data=f"stock_overview:{page + 1}"))
+        rows.append(nav)
+    rows.append([Btn("◀️ Shop", callback_data="shop")])
+    return InlineKeyboardMarkup(rows)
+
+
 def product_detail_kb(
     product: dict,
     has_faq: bool = False,
@@ -243,7 +268,7 @@ def payment_methods_kb(methods: list, order_id: int) -> InlineKeyboardMarkup:
 
 def orders_kb(
     orders: list, currency: str = "Rs",
-    page: int = 1, per_page: int = 10,
+    prev_cursor: str = None, next_cursor: str = None,
 ) -> InlineKeyboardMarkup:
     """User orders list."""
     rows = []
@@ -256,15 +281,7 @@ def orders_kb(
             callback_data=f"order:{oid}",
         )])
 
-    # Pagination
-    nav = []
-    if page > 1:
-        nav.append(Btn("◀️ Prev", callback_data=f"orders_p:{page - 1}"))
-    if len(orders) >= per_page:
-        nav.append(Btn("Next ▶️", callback_data=f"orders_p:{page + 1}"))
-    if nav:
-        rows.append(nav)
-
+    rows += _cursor_nav("orders_p", prev_cursor, next_cursor)
     rows.append([Btn("◀️ Main Menu", callback_data="main_menu")])
     return InlineKeyboardMarkup(rows)
 
@@ -344,7 +361,10 @@ def admin_cat_detail_kb(cat_id: int) -> InlineKeyboardMarkup:
 
 # ---- Admin: Products ----
 
-def admin_prods_kb(products: list, cat_id: int, currency: str) -> InlineKeyboardMarkup:
+def admin_prods_kb(
+    products: list, cat_id: int, currency: str,
+    prev_cursor: str = None, next_cursor: str = None,
+) -> InlineKeyboardMarkup:
     """Admin product list in category."""
     rows = []
     for p in products:
@@ -353,6 +373,7 @@ def admin_prods_kb(products: list, cat_id: int, currency: str) -> InlineKeyboard
             f"🏷️ {p['name']} — {currency} {price}",
             callback_data=f"adm_prod:{p['id']}",
         )])
+    rows += _cursor_nav(f"adm_prods:{cat_id}", prev_cursor, next_cursor)
     rows.append([Btn("➕ Add Product", callback_data=f"adm_prod_add:{cat_id}")])
     rows.append([Btn("◀️ Category", callback_data=f"adm_cat:{cat_id}")])
     return InlineKeyboardMarkup(rows)
@@ -381,7 +402,10 @@ def admin_prod_detail_kb(prod_id: int) -> InlineKeyboardMarkup:
 
 # ---- Admin: Orders ----
 
-def admin_orders_kb(orders: list, currency: str) -> InlineKeyboardMarkup:
+def admin_orders_kb(
+    orders: list, currency: str,
+    prev_cursor: str = None, next_cursor: str = None,
+) -> InlineKeyboardMarkup:
     """Admin orders list."""
     rows = []
     for o in orders:
@@ -392,6 +416,7 @@ def admin_orders_kb(orders: list, currency: str) -> InlineKeyboardMarkup:
             f"{emoji} #{oid} — {currency} {total} — {o['status']}",
             callback_data=f"adm_ord:{oid}",
         )])
+    rows += _cursor_nav("adm_orders", prev_cursor, next_cursor)
     rows.append([Btn("◀️ Admin Panel", callback_data="admin")])
     return InlineKeyboardMarkup(rows)
 
@@ -419,7 +444,9 @@ def admin_order_detail_kb(order_id: int) -> InlineKeyboardMarkup:
 
 # ---- Admin: Users ----
 
-def admin_users_kb(users: list) -> InlineKeyboardMarkup:
+def admin_users_kb(
+    users: list, prev_cursor: str = None, next_cursor: str = None,
+) -> InlineKeyboardMarkup:
     """Admin user list."""
     rows = []
     for u in users:
@@ -430,6 +457,7 @@ def admin_users_kb(users: list) -> InlineKeyboardMarkup:
             f"{ban_dot} {name[:25]} ({uid})",
             callback_data=f"adm_user:{uid}",
         )])
+    rows += _cursor_nav("adm_users", prev_cursor, next_cursor)
     rows.append([Btn("◀️ Admin Panel", callback_data="admin")])
     return InlineKeyboardMarkup(rows)
 
@@ -514,7 +542,10 @@ def admin_proof_detail_kb(proof_id: int) -> InlineKeyboardMarkup:
 
 # ---- Admin: Tickets ----
 
-def admin_tickets_kb(tickets: list) -> InlineKeyboardMarkup:
+def admin_tickets_kb(
+    tickets: list, prev_cursor: str = None, next_cursor: str = None,
+    back: str = "admin",
+) -> InlineKeyboardMarkup:
     """Admin tickets list."""
     rows = []
     for t in tickets:
@@ -523,7 +554,11 @@ def admin_tickets_kb(tickets: list) -> InlineKeyboardMarkup:
             f"{emoji} #{t['id']} — {t['subject'][:25]}",
             callback_data=f"adm_ticket:{t['id']}",
         )])
-    rows.append([Btn("◀️ Admin Panel", callback_data="admin")])
+    rows += _cursor_nav("adm_tickets_all", prev_cursor, next_cursor)
+    if back == "adm_tickets":
+        rows.append([Btn("◀️ Tickets", callback_data="adm_tickets")])
+    else:
+        rows.append([Btn("◀️ Admin Panel", callback_data="admin")])
     return InlineKeyboardMarkup(rows)
 
 
@@ -705,6 +740,13 @@ def admin_broadcast_confirm_kb() -> InlineKeyboardMarkup:
     ])
 
 
+def admin_broadcast_progress_kb(broadcast_id: int) -> InlineKeyboardMarkup:
+    """Stop button on a running broadcast's progress message."""
+    return InlineKeyboardMarkup([
+        [Btn("⏹ Stop Broadcast", callback_data=f"adm_broadcast_stop:{broadcast_id}")],
+    ])
+
+
 # ════════════════════════ WALLET ════════════════════════
 
 def wallet_kb() -> InlineKeyboardMarkup:
@@ -717,6 +759,13 @@ def wallet_kb() -> InlineKeyboardMarkup:
     ])
 
 
+def wallet_history_kb(prev_cursor: str = None, next_cursor: str = None) -> InlineKeyboardMarkup:
+    """Top-up history pager."""
+    rows = _cursor_nav("wallet_history", prev_cursor, next_cursor)
+    rows.append([Btn("◀️ Wallet", callback_data="wallet")])
+    return InlineKeyboardMarkup(rows)
+
+
 # ════════════════════════ REFERRAL ════════════════════════
 
 def referral_kb(bot_username: str, user_id: int) -> InlineKeyboardMarkup:
@@ -0,0 +1,219 @@
+"""NanoStore outbound rate limiter — one gate in front of every Bot API send.
+
+Plugged into the Application with ApplicationBuilder.rate_limiter(), so
+handlers, broadcasts, log channels and scheduled deletes all share it.
+Message-producing requests (send*, edit*, copy*, forward*) wait for:
+
+1. their chat's slot: RATE_LIMIT_CHAT msg/s in a private chat,
+   RATE_LIMIT_GROUP msg/min in a group or channel (small bursts allowed);
+2. a global slot: RATE_LIMIT_GLOBAL msg/s, handed out by priority.
+
+Priority is chosen per call with ``rate_limit_args``::
+
+    await bot.send_message(chat_id, text, rate_limit_args=Priority.BULK)
+
+Calls without it are INTERACTIVE (handler replies). Other requests
+(answerCallbackQuery, getChatMember, deleteMessage, ...) are not delayed.
+A RetryAfter from Telegram pauses every send for the requested time and
+the request is retried once.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+from enum import IntEnum
+from typing import Any, Callable, Coroutine, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Requests to these endpoints are messages as far as Telegram's limits go
+_LIMITED_PREFIXES = ("send", "edit", "copy", "forward")
+_UNLIMITED = frozenset({"sendChatAction"})
+
+# Per-chat burst before spacing kicks in
+CHAT_BURST: int = 3
+
+# Idle chat slots are dropped once there are more than this many
+MAX_TRACKED_CHATS: int = 10_000
+
+
+class Priority(IntEnum):
+    """Global queue order; lower goes first."""
+
+    INTERACTIVE = 0
+    LOG = 1
+    BULK = 2
+
+
+class _ChatSlot:
+    """GCRA limiter for one chat: reserve() returns how long to wait."""
+
+    __slots__ = ("interval", "tolerance", "tat")
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.interval = 1 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self.tat = 0.0
+
+    def reserve(self, now: float) -> float:
+        tat = max(self.tat, now)
+        self.tat = tat + self.interval
+        return max(0.0, tat - self.tolerance - now)
+
+    def idle(self, now: float) -> bool:
+        return self.tat <= now
+
+
+def _seconds(retry_after) -> float:
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class OutboundRateLimiter(BaseRateLimiter[Priority]):
+    """Global + per-chat + per-group limits with priority classes."""
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        group_per_minute: float = 20.0,
+        max_retries: int = 1,
+    ) -> None:
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.group_rate = group_per_minute / 60
+        self.max_retries = max_retries
+
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: list = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._chats: dict[Union[int, str], _ChatSlot] = {}
+
+        self._queued = {p: 0 for p in Priority}
+        self._sent = {p: 0 for p in Priority}
+        self._max_wait = {p: 0.0 for p in Priority}
+        self._retry_after = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for _, _, fut in self._waiters:
+            fut.cancel()
+        self._waiters.clear()
+
+    # ── global gate ──
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(1.0, self._tokens + (now - self._updated) * self.global_rate)
+        self._updated = now
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill(now)
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.global_rate)
+                continue
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():  # caller gave up
+                continue
+            self._tokens -= 1
+            fut.set_result(None)
+        self._dispatcher = None
+
+    async def _acquire_global(self, priority: Priority) -> None:
+        now = time.monotonic()
+        if not self._waiters and now >= self._paused_until:
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        self._queued[priority] += 1
+        try:
+            await fut
+        finally:
+            self._queued[priority] -= 1
+
+    # ── per-chat slots ──
+
+    def _chat_delay(self, chat_id: Union[int, str], now: float) -> float:
+        slot = self._chats.get(chat_id)
+        if slot is None:
+            if len(self._chats) >= MAX_TRACKED_CHATS:
+                self._chats = {k: v for k, v in self._chats.items() if not v.idle(now)}
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            slot = _ChatSlot(self.group_rate if is_group else self.chat_rate, CHAT_BURST)
+            self._chats[chat_id] = slot
+        return slot.reserve(now)
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, dict, list]]],
+        args: Any,
+        kwargs: dict[str, Any],
+        endpoint: str,
+        data: dict[str, Any],
+        rate_limit_args: Optional[Priority],
+    ) -> Union[bool, dict, list]:
+        if not endpoint.startswith(_LIMITED_PREFIXES) or endpoint in _UNLIMITED:
+            return await callback(*args, **kwargs)
+
+        priority = Priority(rate_limit_args) if rate_limit_args is not None else Priority.INTERACTIVE
+        chat_id = data.get("chat_id")
+        start = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            if chat_id is not None:
+                delay = self._chat_delay(chat_id, time.monotonic())
+                if delay:
+                    await asyncio.sleep(delay)
+            await self._acquire_global(priority)
+            waited = time.monotonic() - start
+            if waited > self._max_wait[priority]:
+                self._max_wait[priority] = waited
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self._retry_after += 1
+                wait = _seconds(e.retry_after)
+                self._paused_until = max(self._paused_until, time.monotonic() + wait + 0.1)
+                logger.warning(
+                    "Flood limit on %s (chat %s): pausing all sends for %.0fs", endpoint, chat_id, wait
+                )
+                if attempt == self.max_retries:
+                    raise
+                continue
+            self._sent[priority] += 1
+            return result
+
+    def stats(self) -> dict:
+        """Queue depth, sends and worst wait (ms) per priority."""
+        return {
+            "queued": {p.name.lower(): n for p, n in self._queued.items()},
+            "sent": {p.name.lower(): n for p, n in self._sent.items()},
+            "max_wait_ms": {p.name.lower(): w * 1000 for p, w in self._max_wait.items()},
+            "retry_after": self._retry_after,
+            "paused_for": max(0.0, self._paused_until - time.monotonic()),
+            "chats": len(self._chats),
+        }
@@ -0,0 +1,59 @@
+"""Rendered-screen cache — bounded LRU of ready-to-send (text, reply_markup) pairs.
+
+Catalog screens are identical for every user at a given catalog version
+and currency, so handlers render each one once and reuse it. Keys carry
+the catalog version, so a catalog write makes old entries unreachable and
+they age out through LRU eviction. InlineKeyboardMarkup objects are
+immutable, which makes sharing them between users safe.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class ScreenCache:
+    """Bounded LRU mapping a screen key to its rendered value."""
+
+    def __init__(self, maxsize: int = 512) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: Hashable, render: Callable[[], T]) -> T:
+        """Return the cached value for ``key``, rendering and storing it on a miss."""
+        if self.maxsize <= 0:
+            return render()
+        try:
+            value = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = render()
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,27 +1,41 @@
 """Telegram Log Channel Handler - Stream logs to Telegram channel with batching and rate limiting."""
 
 import asyncio
+import contextvars
 import logging
 import re
+from collections import deque
 from datetime import datetime
-from queue import Queue
 from typing import Optional
 from telegram import Bot
 from telegram.error import TelegramError
 
+from .rate_limiter import Priority
+
+# Telegram's message size limit
+MAX_MESSAGE_CHARS = 4096
+
+# Set inside the worker task: records logged while sending (httpx, the
+# rate limiter, ...) are not streamed back to the channel
+_sending = contextvars.ContextVar("telegram_log_sending", default=False)
+
 
 class TelegramLogHandler(logging.Handler):
     """
     Custom logging handler that sends logs to a Telegram channel.
-    
+
     Features:
-    - Batches multiple log records into single messages (up to 3500 chars)
-    - Rate limiting: max 1 message/sec
-    - Background worker to avoid blocking
+    - Batches multiple log records into single messages (up to batch_size chars)
+    - Rate limiting: at most one message per rate_limit seconds
+    - Bounded asyncio.Queue on the bot's event loop, fed thread-safely
+      with call_soon_threadsafe; the worker sleeps until a record arrives
+    - Sends through the application's Bot (shared connection pool and
+      outbound rate limiter, at log priority)
+    - Drop policy when the queue is full: discard the oldest or newest record
     - Masks sensitive data (tokens, passwords, etc.)
     - Graceful failure: never crashes the bot
     """
-    
+
     # Secrets to mask in logs
     SECRETS_PATTERNS = [
         (re.compile(r'\d{10}:[A-Za-z0-9_-]{35}'), '[BOT_TOKEN]'),  # Bot tokens
@@ -30,76 +44,107 @@ class TelegramLogHandler(logging.Handler):
         (re.compile(r'api[_-]?key["\']?\s*[:=]\s*["\']?[\w-]+', re.IGNORECASE), 'api_key=[REDACTED]'),
         (re.compile(r'secret["\']?\s*[:=]\s*["\']?[\w-]+', re.IGNORECASE), 'secret=[REDACTED]'),
     ]
-    
+
+    DROP_POLICIES = ("oldest", "newest")
+
     def __init__(
         self,
-        bot_token: str,
-        channel_id: str,
+        channel_id,
         level: int = logging.INFO,
         batch_size: int = 3500,
         rate_limit: float = 1.0,
+        queue_size: int = 1000,
+        drop_policy: str = "oldest",
     ):
         """
         Initialize Telegram log handler.
-        
+
         Args:
-            bot_token: Telegram bot token
             channel_id: Channel ID (must start with -100)
             level: Minimum log level to send to channel
             batch_size: Max characters per message (default: 3500)
             rate_limit: Min seconds between messages (default: 1.0)
+            queue_size: Records held while waiting to be sent (default: 1000)
+            drop_policy: Record discarded when the queue is full: "oldest" or "newest"
         """
         super().__init__(level)
-        
-        self.bot = Bot(token=bot_token)
+
         self.channel_id = channel_id
-        self.batch_size = batch_size
+        self.batch_size = min(batch_size, MAX_MESSAGE_CHARS)
         self.rate_limit = rate_limit
-        
+        self.queue_size = queue_size
+
         # Validate channel ID
-        if not channel_id.startswith('-100'):
+        if not str(channel_id).startswith('-100'):
             raise ValueError(f"Invalid channel ID: {channel_id}. Must start with -100")
-        
-        # Queue for log records
-        self.queue: Queue = Queue()
-        
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(f"Invalid drop policy: {drop_policy}. Use 'oldest' or 'newest'")
+        self.drop_policy = drop_policy
+
+        # Set by start(); records logged before that wait here
+        self.bot: Optional[Bot] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self._early: deque = deque()
+        self._carry: Optional[str] = None
+        self._idle = False
+
         # Background worker
         self.worker_task: Optional[asyncio.Task] = None
         self.running = False
-        
-        # Batching state
-        self.batch_buffer = []
-        self.last_send_time = 0
-        
+
         # Stats
         self.messages_sent = 0
         self.messages_failed = 0
-    
+        self.records_sent = 0
+        self.records_dropped = 0
+
     def emit(self, record: logging.LogRecord) -> None:
-        """Add log record to queue (non-blocking)."""
+        """Hand the record to the event loop (non-blocking, any thread)."""
+        if _sending.get():
+            return
         try:
-            # Format the record
-            msg = self.format(record)
-            
-            # Mask secrets
-            msg = self._mask_secrets(msg)
-            
-            # Add to queue
-            self.queue.put(msg)
+            # Format the record and mask secrets
+            msg = self._mask_secrets(self.format(record))
+
+            if self.loop is None:
+                self._put_early(msg)
+            else:
+                self.loop.call_soon_threadsafe(self._put, msg)
+        except RuntimeError:
+            # Event loop already closed
+            self.records_dropped += 1
         except Exception:
             # Never crash on logging
             self.handleError(record)
-    
+
+    def _put_early(self, msg: str) -> None:
+        if len(self._early) >= self.queue_size:
+            self.records_dropped += 1
+            if self.drop_policy == "newest":
+                return
+            self._early.popleft()
+        self._early.append(msg)
+
+    def _put(self, msg: str) -> None:
+        """Queue a record; runs on the event loop."""
+        if self.queue.full():
+            self.records_dropped += 1
+            if self.drop_policy == "newest":
+                return
+            self.queue.get_nowait()
+        self.queue.put_nowait(msg)
+
     def _mask_secrets(self, text: str) -> str:
         """Mask sensitive data in log messages."""
         for pattern, replacement in self.SECRETS_PATTERNS:
             text = pattern.sub(replacement, text)
         return text
-    
+
     async def _send_message(self, text: str) -> bool:
         """
         Send message to Telegram channel.
-        
+
         Returns:
             True if successful, False otherwise
         """
@@ -108,6 +153,7 @@ class TelegramLogHandler(logging.Handler):
                 chat_id=self.channel_id,
                 text=text,
                 parse_mode=None,  # Plain text to avoid HTML/Markdown issues
+                rate_limit_args=Priority.LOG,
             )
             self.messages_sent += 1
             return True
@@ -120,78 +166,89 @@ class TelegramLogHandler(logging.Handler):
             self.messages_failed += 1
             print(f"[TelegramLogHandler] Unexpected error: {e}")
             return False
-    
+
+    def _take_batch(self, first: str) -> list:
+        """`first` plus whatever else is queued, up to batch_size chars."""
+        batch = [first[:self.batch_size]]
+        length = len(batch[0])
+        while not self.queue.empty():
+            msg = self.queue.get_nowait()
+            if length + len(msg) + 1 > self.batch_size:
+                self._carry = msg  # starts the next batch
+                break
+            batch.append(msg)
+            length += len(msg) + 1
+        return batch
+
     async def _worker(self) -> None:
-        """Background worker that processes log queue and sends batched messages."""
-        while self.running:
+        """Background worker that waits for records and sends batched messages."""
+        _sending.set(True)
+        while self.running or self._carry is not None or not self.queue.empty():
             try:
-                # Collect messages from queue (non-blocking)
-                batch = []
-                batch_length = 0
-                
-                while not self.queue.empty() and batch_length < self.batch_size:
-                    msg = self.queue.get_nowait()
-                    msg_length = len(msg) + 1  # +1 for newline
-                    
-                    # If adding this message exceeds batch size, send current batch first
-                    if batch and batch_length + msg_length > self.batch_size:
-                        break
-                    
-                    batch.append(msg)
-                    batch_length += msg_length
-                
-                # Send batch if we have messages
-                if batch:
-                    # Rate limiting
-                    now = asyncio.get_event_loop().time()
-                    time_since_last = now - self.last_send_time
-                    if time_since_last < self.rate_limit:
-                        await asyncio.sleep(self.rate_limit - time_since_last)
-                    
-                    # Combine batch into single message
-                    combined = '\n'.join(batch)
-                    
-                    # Split if still too long (safety check)
-                    if len(combined) > 4000:
-                        # Split into chunks
-                        chunks = [combined[i:i+3500] for i in range(0, len(combined), 3500)]
-                        for chunk in chunks:
-                            await self._send_message(chunk)
-                            await asyncio.sleep(self.rate_limit)
-                    else:
-                        await self._send_message(combined)
-                    
-                    self.last_send_time = asyncio.get_event_loop().time()
-                
-                # Sleep briefly before next iteration
-                await asyncio.sleep(0.1)
-                
+                if self._carry is not None:
+                    msg, self._carry = self._carry, None
+                else:
+                    self._idle = True
+                    try:
+                        msg = await self.queue.get()
+                    finally:
+                        self._idle = False
+                batch = self._take_batch(msg)
+                if await self._send_message('\n'.join(batch)):
+                    self.records_sent += len(batch)
+
+                # Rate limiting; records arriving meanwhile join the next batch
+                if self.running:
+                    await asyncio.sleep(self.rate_limit)
+
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 print(f"[TelegramLogHandler] Worker error: {e}")
                 await asyncio.sleep(1)
-    
-    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
-        """Start the background worker."""
+
+    def start(self, bot: Bot) -> None:
+        """Start the background worker on the running loop, sending through `bot`."""
         if self.running:
             return
-        
+
+        self.bot = bot
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        while self._early:
+            self._put(self._early.popleft())
         self.running = True
-        
-        if loop is None:
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-        
-        self.worker_task = loop.create_task(self._worker())
-    
+        self.loop = asyncio.get_running_loop()
+        self.worker_task = self.loop.create_task(self._worker())
+
+    async def flush_and_stop(self, timeout: float = 5.0) -> None:
+        """Send what is still queued (for up to `timeout` seconds), then stop."""
+        if not self.worker_task:
+            return
+        self.running = False
+        if self._idle and self.queue.empty():
+            self.worker_task.cancel()
+        try:
+            await asyncio.wait_for(self.worker_task, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        self.worker_task = None
+
     def stop(self) -> None:
         """Stop the background worker."""
         self.running = False
         if self.worker_task:
             self.worker_task.cancel()
-    
+
+    def stats(self) -> dict:
+        """Records sent / dropped / queued and messages sent / failed."""
+        return {
+            "records_sent": self.records_sent,
+            "records_dropped": self.records_dropped,
+            "queued": self.queue.qsize() if self.queue else len(self._early),
+            "messages_sent": self.messages_sent,
+            "messages_failed": self.messages_failed,
+        }
+
     def close(self) -> None:
         """Close the handler and stop worker."""
         self.stop()
@@ -232,23 +289,28 @@ class TelegramLogFormatter(logging.Formatter):
 
 
 def setup_telegram_logging(
-    bot_token: str,
-    channel_id: str,
+    channel_id,
     enabled: bool = True,
     channel_level: str = 'INFO',
     file_level: str = 'DEBUG',
     full_verbose: bool = False,
+    queue_size: int = 1000,
+    drop_policy: str = "oldest",
 ) -> Optional[TelegramLogHandler]:
     """
     Setup logging with Telegram channel streaming.
     
+    The handler starts sending once start(application.bot) is called from
+    post_init; records logged before that are held until then.
+
     Args:
-        bot_token: Telegram bot token
         channel_id: Channel ID for logs
         enabled: Enable Telegram logging
         channel_level: Log level for channel (DEBUG/INFO/WARNING/ERROR)
         file_level: Log level for file/console
         full_verbose: Send all logs to channel (including debug)
+        queue_size: Records held while waiting to be sent
+        drop_policy: Record discarded when the queue is full ("oldest"/"newest")
     
     Returns:
         TelegramLogHandler instance or None if disabled
@@ -274,7 +336,7 @@ def setup_telegram_logging(
     if enabled and channel_id:
         try:
             # Validate channel ID
-            if not channel_id.startswith('-100'):
+            if not str(channel_id).startswith('-100'):
                 print(f"[WARNING] Invalid LOG_CHANNEL_ID: {channel_id}. Must start with -100")
                 return None
             
@@ -286,9 +348,10 @@ def setup_telegram_logging(
             
             # Create handler
             telegram_handler = TelegramLogHandler(
-                bot_token=bot_token,
                 channel_id=channel_id,
                 level=level,
+                queue_size=queue_size,
+                drop_policy=drop_policy,
             )
             
             # Set formatter
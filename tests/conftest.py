@@ -0,0 +1,10 @@
+"""Shared pytest setup: import the bot's packages from src/ like bot.py does."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+# config refuses to import without these
+os.environ.setdefault("BOT_TOKEN", "0:test")
+os.environ.setdefault("ADMIN_ID", "1")